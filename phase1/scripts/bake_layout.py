@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Bake radial layout coordinates into the data files.
+
+Runs the radial_layout engine with App.tsx's default ring configuration and
+writes x/y into every node of v2_1_visualization_final.json, plus the
+configuration and computed ring radii under metadata.layout so a client can
+tell whether the baked positions match its own settings. Each precompute
+variant gets x/y for its display bands the same way.
+
+--check runs src/layouts/RadialLayout.ts under node on fixtures (the real
+data and seeded synthetic hierarchies, with fixed and auto radii) and fails
+if any position differs from the engine. It transpiles with the frontend's
+TypeScript when the dev dependencies are installed (npm install) and
+otherwise lets node strip the types itself (node 22.18+ or 23.6+); set NODE
+to pick the binary. --write-fixture saves RadialLayout.ts's output on the
+small synthetic fixtures to tests/fixtures/radial_layout_ts.json, which
+tests/test_layout_parity.py checks the engine against on every run; the
+live comparison there skips without a TypeScript runner, except under CI.
+
+Usage:
+    python scripts/bake_layout.py                 # viz file + every precompute variant
+    python scripts/bake_layout.py --check         # parity against RadialLayout.ts
+    python scripts/bake_layout.py --write-fixture # refresh the committed TS output
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import List, NamedTuple
+
+import numpy as np
+
+from data_cache import CACHE_DIR as COLUMNAR_CACHE_DIR, DATA_DIR, VIZ_FILE
+from json_stream import StreamDict, StreamList, iter_json, write_atomic
+from optimize_layout import load_layout_data
+from radial_layout import DEFAULT_RING_GAP, LayoutConfig, band_layout, default_layout_config, radial_layout
+from synthetic_data import generate_viz_data
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+PRECOMPUTE_DIR = DATA_DIR / "precompute"
+TS_LAYOUT = BASE_DIR / "src" / "layouts" / "RadialLayout.ts"
+TYPESCRIPT = BASE_DIR / "node_modules" / "typescript"
+PARITY_FIXTURE = Path(__file__).parent / "tests" / "fixtures" / "radial_layout_ts.json"
+NODE = os.environ.get("NODE", "node")
+
+LAYOUT_VERSION = 1  # Bump when the baked fields or engine change
+COORD_DECIMALS = 3  # Thousandths of a pixel
+PARITY_TOLERANCE = 1e-6  # px; Math.cos and libm may differ in the last bits
+PARITY_SIZES = (300, 2500)  # Synthetic fixture sizes
+FIXTURE_SIZES = (300,)  # Synthetic sizes saved to PARITY_FIXTURE
+
+# Lays out each fixture read from stdin with RadialLayout.ts's computeRadialLayout
+TS_LAYOUT_FIXTURES = r"""
+const fixtures = JSON.parse(fs.readFileSync(0, 'utf8'))
+const results = fixtures.map(({ nodes, config }) => {
+  const { nodes: placed, computedRings } = mod.computeRadialLayout(nodes, config)
+  return {
+    positions: Object.fromEntries(placed.map(n => [n.id, [n.x, n.y]])),
+    radii: computedRings.map(r => r.radius)
+  }
+})
+process.stdout.write(JSON.stringify(results))
+"""
+
+# Loads the TypeScript module at argv[2] as `mod`, transpiled with the project's TypeScript (argv[1])
+TS_HARNESS = r"""
+const fs = require('fs')
+const ts = require(process.argv[1])
+const source = fs.readFileSync(process.argv[2], 'utf8')
+const { outputText } = ts.transpileModule(source, {
+  compilerOptions: { module: ts.ModuleKind.CommonJS, target: ts.ScriptTarget.ES2020 }
+})
+const loaded = { exports: {} }
+new Function('module', 'exports', 'require', outputText)(loaded, loaded.exports, require)
+const mod = loaded.exports
+"""
+
+# Loads a .mts copy (argv[1]) as `mod`, relying on node's own type stripping
+TS_STRIP_HARNESS = r"""
+import fs from 'node:fs'
+import { pathToFileURL } from 'node:url'
+const mod = await import(pathToFileURL(process.argv[1]).href)
+"""
+
+
+def layout_metadata(config: LayoutConfig, rings) -> dict:
+    return {
+        "version": LAYOUT_VERSION,
+        "config": config.to_dict(),
+        "ring_radii": [ring.radius for ring in rings],
+    }
+
+
+def bake_viz(viz_file=VIZ_FILE, config=None, cache_dir=COLUMNAR_CACHE_DIR):
+    """Write x/y for every laid-out node into the visualization file. Returns (written, placed)."""
+    config = config or default_layout_config()
+    hierarchy = load_layout_data(viz_file, cache_dir)
+    result = radial_layout(hierarchy, config)
+    coords = {
+        node_id: (round(x, COORD_DECIMALS), round(y, COORD_DECIMALS))
+        for node_id, x, y in zip(hierarchy.ids, result.x.tolist(), result.y.tolist())
+    }
+
+    fields = {node_id: {'x': x, 'y': y} for node_id, (x, y) in coords.items()}
+    return update_viz_nodes(viz_file, fields, 'layout', layout_metadata(config, result.rings)), len(coords)
+
+
+def update_viz_nodes(viz_file, fields_by_id: dict, metadata_key: str, metadata_value) -> bool:
+    """
+    Stream the visualization file back out with extra per-node fields and one metadata entry.
+
+    fields_by_id maps node id -> {field: value}; other nodes pass through
+    unchanged. Returns True if the file was rewritten.
+    """
+    with open(viz_file) as f:
+        viz_data = json.load(f)
+    viz_data.setdefault('metadata', {})
+
+    def nodes():
+        for node in viz_data['nodes']:
+            fields = fields_by_id.get(str(node['id']))
+            yield {**node, **fields} if fields else node
+
+    def entry(key, value):
+        if key == 'nodes':
+            return StreamList(nodes())
+        if key == 'metadata':
+            return {**value, metadata_key: metadata_value}
+        return StreamList(value) if isinstance(value, list) else value
+
+    document = StreamDict((key, entry(key, value)) for key, value in viz_data.items())
+    return write_atomic(viz_file, iter_json(document, 2))
+
+
+def variant_layout_config(num_bands: int, gap: float = DEFAULT_RING_GAP) -> LayoutConfig:
+    """Band b on ring b at (b + 1) * gap or wider, sized like the indicator ring."""
+    base = default_layout_config(gap)
+    return LayoutConfig(
+        ring_radii=[(band + 1) * gap for band in range(num_bands)],
+        node_sizes=[base.node_sizes[-1]] * num_bands,
+        node_padding=base.node_padding,
+        min_ring_gap=base.min_ring_gap,
+    )
+
+
+def position_variant(payload: dict, gap: float = DEFAULT_RING_GAP) -> dict:
+    """Add x/y to a precompute variant's nodes (in place) from their display_layer bands."""
+    nodes = payload['nodes']
+    band = np.array([node.get('display_layer', 0) for node in nodes], dtype=np.int64)
+    num_bands = max(len(payload['metadata'].get('layer_bands', [])), int(band.max()) + 1 if len(band) else 1)
+    config = variant_layout_config(num_bands, gap)
+    result = band_layout(band, config)
+    for node, x, y in zip(nodes, result.x.tolist(), result.y.tolist()):
+        node['x'] = round(x, COORD_DECIMALS)
+        node['y'] = round(y, COORD_DECIMALS)
+    payload['metadata']['layout'] = layout_metadata(config, result.rings)
+    return payload
+
+
+def bake_variants(directory=PRECOMPUTE_DIR, gap: float = DEFAULT_RING_GAP):
+    """Add positions to every graph_*.json variant. Returns (files written, files seen)."""
+    written = 0
+    paths = sorted(Path(directory).glob("graph_*.json"))
+    for path in paths:
+        with open(path) as f:
+            payload = json.load(f)
+        written += write_atomic(path, [json.dumps(position_variant(payload, gap), indent=2)])
+    return written, len(paths)
+
+
+def ts_config(config: LayoutConfig) -> dict:
+    """The LayoutConfig object RadialLayout.ts expects."""
+    return {
+        "rings": [{"radius": r, "nodeSize": s} for r, s in zip(config.ring_radii, config.node_sizes)],
+        "nodePadding": config.node_padding,
+        "startAngle": config.start_angle,
+        "totalAngle": config.total_angle,
+        "minRingGap": config.min_ring_gap,
+        "scalePaddingWithNodeSize": config.scale_padding,
+        "useFixedRadii": config.use_fixed_radii,
+    }
+
+
+def parity_configs():
+    """(name, config) pairs covering fixed and auto radii, scaled and flat padding."""
+    fixed = default_layout_config()
+    auto = LayoutConfig(fixed.ring_radii, fixed.node_sizes)
+    flat = LayoutConfig([0, 180, 380, 650, 1000, 1450], [15, 12, 8, 6, 5, 3], node_padding=2, scale_padding=False)
+    return [("fixed", fixed), ("auto", auto), ("auto-flat-padding", flat)]
+
+
+def parity_fixtures(sizes=PARITY_SIZES, real_data=True):
+    """(name, viz_data, config) for every synthetic size (and the real data) under every parity config."""
+    datasets = [(f"synthetic-{size}", generate_viz_data(size, seed=size)[0]) for size in sizes]
+    if real_data and VIZ_FILE.exists():
+        with open(VIZ_FILE) as f:
+            datasets.append(("v2_1", json.load(f)))
+
+    for name, viz_data in datasets:
+        for config_name, config in parity_configs():
+            yield f"{name}/{config_name}", viz_data, config
+
+
+class ParityResult(NamedTuple):
+    name: str
+    nodes: int
+    error: float         # max |dx|, |dy| in px
+    radius_error: float  # max ring radius difference in px
+    missing: int         # ids placed by only one side
+
+    @property
+    def ok(self) -> bool:
+        return self.missing == 0 and self.error <= PARITY_TOLERANCE and self.radius_error <= PARITY_TOLERANCE
+
+
+def ts_nodes(viz_data) -> list:
+    """The RawNodeV21 fields computeRadialLayout reads."""
+    return [{key: n[key] for key in ('id', 'layer', 'parent') if key in n} for n in viz_data['nodes']]
+
+
+def node_strips_types() -> bool:
+    """Whether NODE runs .mts files without a compiler (process.features.typescript)."""
+    if shutil.which(NODE) is None:
+        return False
+    proc = subprocess.run([NODE, "-p", "Boolean(process.features.typescript)"], capture_output=True, text=True)
+    return proc.returncode == 0 and proc.stdout.strip() == "true"
+
+
+def ts_runner_available() -> bool:
+    """Whether src/ TypeScript can be run here, with the project's TypeScript or node's type stripping."""
+    return shutil.which(NODE) is not None and (TYPESCRIPT.exists() or node_strips_types())
+
+
+def run_ts(module: Path, script: str, payload: str) -> str:
+    """
+    Run script under node with the TypeScript module loaded as `mod` and fs in scope.
+
+    payload goes to stdin; returns stdout.
+    """
+    with tempfile.TemporaryDirectory(prefix="ts-module-") as workdir:
+        if TYPESCRIPT.exists():
+            command = [NODE, "-e", TS_HARNESS + script, str(TYPESCRIPT), str(module)]
+        elif node_strips_types():
+            copy = Path(workdir) / (module.stem + ".mts")
+            shutil.copyfile(module, copy)
+            command = [NODE, "--input-type=module", "-e", TS_STRIP_HARNESS + script, str(copy)]
+        else:
+            raise RuntimeError(f"No TypeScript runner: install {TYPESCRIPT} (npm install) or use node 22.18+")
+        return subprocess.run(command, input=payload, capture_output=True, text=True, check=True).stdout
+
+
+def run_radial_layout_ts(cases: List[dict]) -> List[dict]:
+    """computeRadialLayout on each {nodes, config}; returns {positions: {id: [x, y]}, radii} per case."""
+    return json.loads(run_ts(TS_LAYOUT, TS_LAYOUT_FIXTURES, json.dumps(cases)))
+
+
+def engine_layouts(datasets) -> list:
+    """(ids, RadialLayout) from the engine for each (viz_data, config)."""
+    layouts = []
+    with tempfile.TemporaryDirectory(prefix="layout-parity-") as workdir:
+        for i, (viz_data, config) in enumerate(datasets):
+            path = Path(workdir) / f"fixture_{i}.json"
+            with open(path, 'w') as f:
+                json.dump(viz_data, f)
+            hierarchy = load_layout_data(path, Path(workdir) / "cache")
+            layouts.append((hierarchy.ids, radial_layout(hierarchy, config)))
+    return layouts
+
+
+def compare_layout(name, ids, result, ts_result) -> ParityResult:
+    """Engine positions and ring radii against one computeRadialLayout result."""
+    positions = ts_result['positions']
+    ts_xy = np.array([positions.get(node_id, [np.nan, np.nan]) for node_id in ids], dtype=float)
+    error = np.abs(ts_xy - np.column_stack([result.x, result.y])).max() if len(ids) else 0.0
+    radius_error = np.abs(np.array(ts_result['radii']) - [ring.radius for ring in result.rings]).max()
+    return ParityResult(name, len(ids), float(error), float(radius_error), len(set(ids) ^ set(positions)))
+
+
+def parity_results() -> List[ParityResult]:
+    """Lay out every fixture with the engine and with RadialLayout.ts (needs ts_runner_available())."""
+    fixtures = list(parity_fixtures())
+    expected = engine_layouts([(viz_data, config) for _name, viz_data, config in fixtures])
+    actual = run_radial_layout_ts([
+        {"nodes": ts_nodes(viz_data), "config": ts_config(config)} for _name, viz_data, config in fixtures
+    ])
+    return [compare_layout(name, ids, result, ts_result)
+            for (name, _viz, _config), (ids, result), ts_result in zip(fixtures, expected, actual)]
+
+
+def ts_layout_hash() -> str:
+    """SHA-256 of RadialLayout.ts, recorded in PARITY_FIXTURE."""
+    return hashlib.sha256(TS_LAYOUT.read_bytes()).hexdigest()
+
+
+def write_parity_fixture(path: Path = PARITY_FIXTURE) -> int:
+    """Save RadialLayout.ts's output on the FIXTURE_SIZES fixtures; returns the number of cases."""
+    fixtures = list(parity_fixtures(FIXTURE_SIZES, real_data=False))
+    cases = [
+        {"name": name, "nodes": ts_nodes(viz_data), "config": config.to_dict(), "ts_config": ts_config(config)}
+        for name, viz_data, config in fixtures
+    ]
+    outputs = run_radial_layout_ts([{"nodes": case["nodes"], "config": case["ts_config"]} for case in cases])
+    for case, output in zip(cases, outputs):
+        del case["ts_config"]
+        case.update(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(path, [json.dumps({"radial_layout_ts_sha256": ts_layout_hash(), "cases": cases})])
+    return len(cases)
+
+
+def fixture_parity_results(path: Path = PARITY_FIXTURE) -> List[ParityResult]:
+    """The engine against the RadialLayout.ts output saved by write_parity_fixture (no node needed)."""
+    with open(path) as f:
+        cases = json.load(f)["cases"]
+    expected = engine_layouts([({"nodes": case["nodes"]}, LayoutConfig(**case["config"])) for case in cases])
+    return [compare_layout(case["name"], ids, result, case) for case, (ids, result) in zip(cases, expected)]
+
+
+def check_parity():
+    """Compare the engine with RadialLayout.ts on every fixture. Returns True when they agree."""
+    if not ts_runner_available():
+        print(f"No TypeScript runner: run `npm install` for {TYPESCRIPT}, or use node 22.18+")
+        return False
+
+    results = parity_results()
+    for r in results:
+        print(f"  [{'PASS' if r.ok else 'FAIL'}] {r.name}: {r.nodes} nodes, max |dxy|={r.error:.2e}, "
+              f"max |dradius|={r.radius_error:.2e}, id mismatches={r.missing}")
+    return all(r.ok for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bake radial layout positions into the data files")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON to update')
+    parser.add_argument('--precompute-dir', type=Path, default=PRECOMPUTE_DIR, help='Variant directory')
+    parser.add_argument('--gap', type=float, default=DEFAULT_RING_GAP, help='Ring gap (px)')
+    parser.add_argument('--skip-variants', action='store_true', help='Only update the visualization file')
+    parser.add_argument('--check', action='store_true', help='Check parity with RadialLayout.ts instead')
+    parser.add_argument('--write-fixture', action='store_true',
+                        help=f'Save RadialLayout.ts output on the synthetic fixtures to {PARITY_FIXTURE.name}')
+    args = parser.parse_args()
+
+    if args.check:
+        print("Checking parity with RadialLayout.ts...")
+        return check_parity()
+    if args.write_fixture:
+        if not ts_runner_available():
+            print(f"No TypeScript runner: run `npm install` for {TYPESCRIPT}, or use node 22.18+")
+            return False
+        print(f"Wrote {write_parity_fixture()} RadialLayout.ts cases to {PARITY_FIXTURE}")
+        return True
+
+    written, placed = bake_viz(args.viz, default_layout_config(args.gap))
+    print(f"{'Updated' if written else 'Unchanged'}: {args.viz} ({placed} nodes positioned)")
+    if not args.skip_variants:
+        written, seen = bake_variants(args.precompute_dir, args.gap)
+        print(f"Variants: {written} of {seen} updated in {args.precompute_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
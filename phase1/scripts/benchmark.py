@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Benchmark the SHAP aggregation and layout stages on synthetic hierarchies.
+
+For each size a seeded synthetic dataset (see synthetic_data.py) is written to
+a temp dir and every stage is run against it:
+- compute_hierarchical_shap, normalize_shap, generate_outputs
+  (compute_shap_importance.py, with its output paths pointed at the temp dir)
+- load_layout_data, build_subtree_info, compute_collisions_with_actual_sizes
+  (optimize_layout.py, at the current gap=150 configuration)
+
+Wall time is the fastest of --repeat plain passes, stored with the standard
+deviation of those passes, and peak memory comes from a further pass under
+tracemalloc. Results are compared with a saved JSON baseline and the script
+exits non-zero when any stage regresses past --threshold and, for wall time,
+by more than NOISE_SIGMAS standard deviations of the slower of the two runs,
+so that run-to-run noise on short stages does not fail the run.
+
+Every pass also times a fixed reference workload. Wall times are scaled by
+the ratio of its baseline and current times before they are compared, so a
+machine that is slower as a whole (CPU steal, frequency scaling) during one
+run does not read as a regression of every stage.
+
+Usage:
+    python scripts/benchmark.py                          # default sizes, compare to baseline
+    python scripts/benchmark.py --sizes 2500 1000000     # up to 1M nodes
+    python scripts/benchmark.py --save-baseline          # record a new baseline
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+import compute_shap_importance as csi
+import optimize_layout as layout
+from synthetic_data import generate_viz_data
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+BASELINE_FILE = BASE_DIR / ".cache" / "benchmarks" / "baseline.json"
+
+DEFAULT_SIZES = [2500, 10000, 100000]
+DEFAULT_REPEAT = 7
+REGRESSION_THRESHOLD = 1.25  # Fail when a stage is 25% slower / larger than baseline
+NOISE_SIGMAS = 4.0  # A slowdown must also exceed this many pass-to-pass standard deviations
+MIN_SECONDS = 0.001  # Timer resolution; timings below this are not compared
+MIN_PEAK_MB = 1.0
+BENCH_GAP = 150  # Matches report_current_configuration()
+REFERENCE_STAGE = 'reference_workload'  # Machine speed, not compared itself
+
+
+def reference_workload():
+    """Fixed mix of numpy and interpreter work whose time only depends on the machine."""
+    values = np.random.default_rng(0).random(200_000)
+    values.sort()
+    total = 0
+    for i in range(100_000):
+        total += i * i
+    return total
+
+
+def shap_stages(viz_data, shap_scores, workdir):
+    """Stage callables for compute_shap_importance, sharing state through a dict."""
+    state = {}
+
+    def hierarchical():
+        nodes_by_id, hierarchy = csi.build_hierarchy(viz_data)
+        state['nodes_by_id'] = nodes_by_id
+        state['raw'] = csi.compute_hierarchical_shap(shap_scores, nodes_by_id, hierarchy)
+
+    def normalize():
+        state['normalized'], state['max_shap'] = csi.normalize_shap(state['raw'])
+
+    def outputs():
+        # Fresh directory per call so every output is actually written
+        csi.DATA_DIR = Path(tempfile.mkdtemp(dir=workdir))
+        csi.OUTPUT_DIR = csi.DATA_DIR / "importance"
+        csi.generate_outputs(viz_data, state['normalized'], state['raw'], {},
+                             state['max_shap'], state['nodes_by_id'])
+
+    return [
+        ('compute_hierarchical_shap', hierarchical),
+        ('normalize_shap', normalize),
+        ('generate_outputs', outputs),
+    ]
+
+
+def layout_stages(viz_file, workdir):
+    """Stage callables for optimize_layout against viz_file."""
+    configs = layout.equal_spacing_configs(BENCH_GAP, layout.SIZE_RANGES)
+
+    def load():
+        # Fresh columnar cache per call so the JSON conversion is included
+        layout._layout_data = layout.load_layout_data(viz_file, Path(tempfile.mkdtemp(dir=workdir)))
+
+    def subtree_info():
+        data = layout._layout_data
+        for node_id, node_layer in zip(data.ids, data.layer.tolist()):
+            if node_layer < data.max_layer:
+                layout.build_subtree_info(node_id, data.max_layer)
+
+    def collisions():
+        layout._subtree_extents.cache_clear()
+        layout.compute_collisions_with_actual_sizes(configs)
+
+    return [
+        ('load_layout_data', load),
+        ('build_subtree_info', subtree_info),
+        ('compute_collisions_with_actual_sizes', collisions),
+    ]
+
+
+def run_stages(stages, measure_memory):
+    """Run stages in order; returns {name: seconds} or {name: peak MB}."""
+    results = {}
+    for name, stage in stages:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if measure_memory:
+                tracemalloc.start()
+                stage()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results[name] = peak / 1e6
+            else:
+                start = time.perf_counter()
+                stage()
+                results[name] = time.perf_counter() - start
+    return results
+
+
+def benchmark_size(size, seed, repeat, measure_memory):
+    """Time (and optionally trace) every stage on one synthetic dataset."""
+    viz_data, shap_scores = generate_viz_data(size, seed=seed)
+    saved_dirs = (csi.DATA_DIR, csi.OUTPUT_DIR)
+    saved_layout = layout._layout_data
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+            viz_file = Path(workdir) / "synthetic.json"
+            with open(viz_file, 'w') as f:
+                json.dump(viz_data, f)
+
+            def all_stages():
+                return ([(REFERENCE_STAGE, reference_workload)] + shap_stages(viz_data, shap_scores, workdir)
+                        + layout_stages(viz_file, workdir))
+
+            passes = {}
+            for _ in range(repeat):
+                for name, value in run_stages(all_stages(), measure_memory=False).items():
+                    passes.setdefault(name, []).append(value)
+            seconds = {name: min(values) for name, values in passes.items()}
+            spreads = {name: statistics.stdev(values) if len(values) > 1 else 0.0
+                       for name, values in passes.items()}
+            peaks = run_stages(all_stages(), measure_memory=True) if measure_memory else {}
+    finally:
+        csi.DATA_DIR, csi.OUTPUT_DIR = saved_dirs
+        layout._layout_data = saved_layout
+        layout._subtree_extents.cache_clear()
+
+    return {
+        name: {
+            'seconds': round(seconds[name], 6),
+            'stdev': round(spreads[name], 6),
+            'peak_mb': round(peaks[name], 3) if name in peaks else None,
+        }
+        for name in seconds
+    }
+
+
+def noise_floor(previous, current, metric):
+    """Smallest increase of metric that is not run-to-run noise for this stage."""
+    if metric == 'peak_mb':
+        return MIN_PEAK_MB
+    # Baselines saved before the spread was recorded fall back to the current run's
+    spread = max(previous.get('stdev') or 0.0, current.get('stdev') or 0.0)
+    return max(NOISE_SIGMAS * spread, MIN_SECONDS)
+
+
+def machine_speedup(stages, baseline_stages):
+    """How much faster the machine ran than for the baseline, from the reference workload (1.0 if unknown)."""
+    old = baseline_stages.get(REFERENCE_STAGE, {}).get('seconds')
+    new = stages.get(REFERENCE_STAGE, {}).get('seconds')
+    return old / new if old and new else 1.0
+
+
+def find_regressions(results, baseline, threshold):
+    """[(size, stage, metric, baseline value, current value)] past the threshold and the noise floor.
+
+    Current wall times are reported scaled to the baseline machine speed.
+    """
+    regressions = []
+    for size, stages in results.items():
+        speedup = machine_speedup(stages, baseline.get(size, {}))
+        for stage, current in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if previous is None or stage == REFERENCE_STAGE:
+                continue
+            if current.get('seconds') is not None:
+                current = dict(current, seconds=current['seconds'] * speedup,
+                               stdev=(current.get('stdev') or 0.0) * speedup)
+            for metric, minimum in (('seconds', MIN_SECONDS), ('peak_mb', MIN_PEAK_MB)):
+                old, new = previous.get(metric), current.get(metric)
+                if old is None or new is None or max(old, new) < minimum:
+                    continue
+                if new > max(old, minimum) * threshold and new - old > noise_floor(previous, current, metric):
+                    regressions.append((size, stage, metric, old, new))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic hierarchies")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='Synthetic node counts (2500 to 1000000)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Timing passes per size (fastest is kept)')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc pass')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_FILE, help='Baseline JSON')
+    parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='Allowed ratio over baseline before failing')
+    parser.add_argument('--output', type=Path, help='Also write this run to a JSON file')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        print(f"\n=== {size} nodes ===")
+        results[str(size)] = benchmark_size(size, args.seed, max(args.repeat, 1), not args.no_memory)
+        for stage, entry in results[str(size)].items():
+            peak = f"{entry['peak_mb']:9.1f} MB" if entry['peak_mb'] is not None else ""
+            print(f"  {stage:<40} {entry['seconds']:9.3f}s ±{entry['stdev']:.3f} {peak}")
+
+    report = {
+        'generated': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'results': results,
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved baseline: {args.baseline}")
+        return True
+
+    if not args.baseline.exists():
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return True
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = find_regressions(results, baseline['results'], args.threshold)
+    if not regressions:
+        print(f"\nNo regressions past {args.threshold:.2f}x baseline ({baseline['generated']})")
+        return True
+
+    print(f"\nRegressions past {args.threshold:.2f}x baseline (wall times scaled to the baseline machine speed):")
+    for size, stage, metric, old, new in regressions:
+        print(f"  {size} nodes, {stage}: {metric} {old:.3f} -> {new:.3f} ({new / max(old, 1e-12):.2f}x)")
+    return False
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
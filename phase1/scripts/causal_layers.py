@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Longest-path layering of the causal graph and its grouping into display bands.
+
+Layers come from Kahn's algorithm run a whole frontier at a time: every row
+whose in-edges are all consumed forms the next frontier, and the round in
+which a row is freed is its longest-path distance from a source. Each edge
+is consumed once, by NumPy operations over the frontier's out-edges, and a
+row joins the frontier from the one edge occurrence that brings its
+counter to zero, so the whole pass is O(V + E).
+
+Rows that are never freed lie on a cycle or below one. Each strongly
+connected component among them is treated as a single node: its rows share
+the layer one past their deepest predecessor outside it, and rows below a
+cycle are layered after it. That is the longest path over the condensation
+of the leftover rows, also O(V + E). One cycle is traced back through them
+for the report.
+
+Bands group consecutive causal layers for display. balanced_bands chooses
+the boundaries so the bands hold as even a number of nodes as the layer
+sizes allow (smallest largest band, then the most even spread). It is a
+dynamic program costing O(B * L^2) for B bands over L layers, which is
+nothing next to the layering for the few dozen layers a causal graph has.
+"""
+
+from dataclasses import dataclass
+from typing import List, Sequence
+
+import numpy as np
+
+from centrality import CausalGraph, gather_neighbours
+
+
+@dataclass
+class CausalLayering:
+    layer: np.ndarray    # longest-path layer of every row, sources are 0
+    cyclic: np.ndarray   # rows never freed: on a cycle or downstream of one
+    cycle: List[int]     # one cycle through the cyclic rows, in edge order (empty for a DAG)
+
+    @property
+    def num_layers(self) -> int:
+        return int(self.layer.max(initial=-1)) + 1
+
+    def layer_sizes(self, rows=None) -> np.ndarray:
+        """Rows per layer, over every row or just `rows`."""
+        layer = self.layer if rows is None else self.layer[rows]
+        return np.bincount(layer, minlength=self.num_layers)
+
+
+def longest_path_layers(graph: CausalGraph) -> CausalLayering:
+    """Layer every row of the graph, one Kahn frontier per round."""
+    n = graph.num_nodes
+    in_remaining = graph.in_degree.astype(np.int64)
+    layer = np.zeros(n, dtype=np.int64)
+    freed = np.zeros(n, dtype=bool)
+
+    # owner[row]: position of the one freeing occurrence kept for row in this round's targets
+    owner = np.empty(n, dtype=np.int64)
+
+    frontier = np.flatnonzero(in_remaining == 0)
+    depth = 0
+    while len(frontier):
+        freed[frontier] = True
+        layer[frontier] = depth
+        _sources, targets = gather_neighbours(graph.indptr, graph.indices, frontier)
+        np.subtract.at(in_remaining, targets, 1)
+        hits = np.flatnonzero(in_remaining[targets] == 0)
+        owner[targets[hits]] = hits
+        frontier = targets[hits[owner[targets[hits]] == hits]]
+        depth += 1
+
+    cyclic = ~freed
+    cycle = []
+    if cyclic.any():
+        layer_condensation(graph, layer, cyclic)
+        cycle = find_cycle(graph, cyclic)
+    return CausalLayering(layer=layer, cyclic=np.flatnonzero(cyclic), cycle=cycle)
+
+
+def strong_components(graph: CausalGraph, rows: np.ndarray) -> List[List[int]]:
+    """
+    Strongly connected components of the subgraph on the masked rows (Tarjan).
+
+    Components come out sinks first, i.e. in reverse topological order of
+    the condensation. Iterative, so deep chains do not hit the recursion
+    limit.
+    """
+    indptr, indices = graph.indptr, graph.indices
+    order = {}    # row -> discovery index
+    low = {}
+    on_stack = set()
+    stack = []
+    components = []
+    for root in np.flatnonzero(rows).tolist():
+        if root in order:
+            continue
+        work = [(root, int(indptr[root]))]
+        order[root] = low[root] = len(order)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            row, edge = work[-1]
+            if edge < indptr[row + 1]:
+                work[-1] = (row, edge + 1)
+                child = int(indices[edge])
+                if not rows[child]:
+                    continue
+                if child not in order:
+                    order[child] = low[child] = len(order)
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, int(indptr[child])))
+                elif child in on_stack:
+                    low[row] = min(low[row], order[child])
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[row])
+            if low[row] == order[row]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == row:
+                        break
+                components.append(component)
+    return components
+
+
+def layer_condensation(graph: CausalGraph, layer: np.ndarray, leftover: np.ndarray):
+    """
+    Layer the rows Kahn's algorithm left behind (boolean mask), in place.
+
+    Every strongly connected component among them gets one past the
+    deepest layer of any predecessor outside it, visiting components in
+    topological order so those predecessors are already final.
+    """
+    in_indptr, in_indices = graph.in_indptr, graph.in_indices
+    for component in reversed(strong_components(graph, leftover)):
+        members = np.array(component)
+        starts, stops = in_indptr[members], in_indptr[members + 1]
+        predecessors = in_indices[np.concatenate([np.arange(a, b) for a, b in zip(starts, stops)])]
+        outside = predecessors[~np.isin(predecessors, members)]
+        layer[members] = layer[outside].max() + 1 if len(outside) else 0
+
+
+def find_cycle(graph: CausalGraph, cyclic: np.ndarray) -> List[int]:
+    """
+    One cycle among the rows Kahn's algorithm left behind (boolean mask).
+
+    Each of them still has an unprocessed predecessor, so walking backwards
+    through those predecessors must revisit a row.
+    """
+    in_indptr, in_indices = graph.in_indptr, graph.in_indices
+    row = int(np.flatnonzero(cyclic)[0])
+    step = {}
+    while row not in step:
+        predecessors = in_indices[in_indptr[row]:in_indptr[row + 1]]
+        step[row] = len(step)
+        row = int(predecessors[cyclic[predecessors]][0])
+    # The walk went against the edges: the revisited row and everything after it, reversed
+    walk = sorted(step, key=step.get)
+    return walk[step[row]:][::-1]
+
+
+def balanced_bands(layer_sizes: Sequence[int], num_bands: int) -> List[List[int]]:
+    """
+    Split causal layers 0..L-1 into at most num_bands contiguous, non-empty bands.
+
+    Boundaries minimize the largest band's node count, then the sum of
+    squared band counts, then the sum of squared band widths (so layers
+    with no nodes are still spread evenly). A dynamic program over the
+    prefix sums, O(num_bands * L^2) for L layers: each band end tries every
+    start, which is cheap for causal-graph depths (tens of layers) but
+    not meant for thousands.
+    """
+    sizes = [int(size) for size in layer_sizes]
+    num_layers = len(sizes)
+    num_bands = max(1, min(num_bands, num_layers))
+    if num_layers <= num_bands:
+        return [[layer] for layer in range(num_layers)] or [[]]
+    prefix = np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)]).tolist()
+
+    # best[b][i]: (cost, start of the last band) for layers 0..i-1 split into b + 1 bands
+    best = [{i: ((prefix[i], prefix[i] ** 2, i * i), 0) for i in range(1, num_layers - num_bands + 2)}]
+    for b in range(1, num_bands):
+        row = {}
+        for i in range(b + 1, num_layers - num_bands + b + 2):
+            options = []
+            for j in range(b, i):
+                (largest, squares, widths), _start = best[b - 1][j]
+                count = prefix[i] - prefix[j]
+                options.append(((max(largest, count), squares + count * count, widths + (i - j) ** 2), j))
+            row[i] = min(options)
+        best.append(row)
+
+    bands = []
+    end = num_layers
+    for b in range(num_bands - 1, -1, -1):
+        start = best[b][end][1]
+        bands.append(list(range(start, end)))
+        end = start
+    return bands[::-1]
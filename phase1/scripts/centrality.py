@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Node centrality over the causal edges of the visualization graph.
+
+Provides the ranking metrics used by the precompute variants:
+pagerank, betweenness, degree, shap and a composite blend of all four.
+
+The graph is held as CSR adjacency (out-edges) plus its transpose (in-edges).
+PageRank is a sparse power iteration, betweenness is Brandes' algorithm run
+one BFS level at a time, and betweenness can instead be estimated from an
+explicit number of sampled sources (Brandes-Pich pivots). Results are cached
+on disk per graph hash.
+"""
+
+import hashlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+CACHE_DIR = BASE_DIR / ".cache" / "centrality"
+
+# Composite = weighted blend of min-max normalized metrics
+COMPOSITE_WEIGHTS = {
+    'shap': 0.4,
+    'pagerank': 0.25,
+    'betweenness': 0.2,
+    'degree': 0.15,
+}
+METHODS = ('composite', 'shap', 'pagerank', 'betweenness', 'degree')
+
+
+@dataclass
+class CausalGraph:
+    """
+    Causal subgraph in CSR form: every node touching a causal edge, in file order.
+
+    Out-neighbours of row i are indices[indptr[i]:indptr[i + 1]] with matching
+    weights; in_indptr / in_indices hold the transpose.
+    """
+    ids: List[str]
+    index: Dict[str, int]
+    indptr: np.ndarray
+    indices: np.ndarray
+    weights: np.ndarray
+    in_indptr: np.ndarray
+    in_indices: np.ndarray
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices)
+
+    @property
+    def out_degree(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    @property
+    def in_degree(self) -> np.ndarray:
+        return np.diff(self.in_indptr)
+
+    def edge_sources(self) -> np.ndarray:
+        """Source row of every CSR edge (parallel to indices)."""
+        return np.repeat(np.arange(self.num_nodes), self.out_degree)
+
+    @property
+    def hash(self) -> str:
+        """Content hash of the ids and adjacency, used as the cache key."""
+        if not hasattr(self, '_hash'):
+            digest = hashlib.sha256()
+            digest.update('\0'.join(self.ids).encode())
+            for arr in (self.indptr, self.indices, self.weights):
+                digest.update(np.ascontiguousarray(arr).tobytes())
+            self._hash = digest.hexdigest()
+        return self._hash
+
+
+def csr_from_edges(ids: List[str], sources: np.ndarray, targets: np.ndarray,
+                   weights: np.ndarray) -> CausalGraph:
+    """Build a CausalGraph from parallel edge arrays of row indices."""
+    n = len(ids)
+    order = np.lexsort((targets, sources))
+    sources, targets, weights = sources[order], targets[order], weights[order]
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+
+    in_order = np.lexsort((sources, targets))
+    in_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(targets, minlength=n), out=in_indptr[1:])
+
+    return CausalGraph(
+        ids=list(ids),
+        index={node_id: i for i, node_id in enumerate(ids)},
+        indptr=indptr,
+        indices=targets.astype(np.int64),
+        weights=weights.astype(np.float64),
+        in_indptr=in_indptr,
+        in_indices=sources[in_order].astype(np.int64),
+    )
+
+
+def build_causal_graph(viz_data) -> CausalGraph:
+    """Collect the causal subgraph of parsed visualization JSON as CSR (edges to unknown nodes are dropped)."""
+    known = {str(n['id']) for n in viz_data['nodes']}
+    causal = [e for e in viz_data['edges'] if e.get('relationship') == 'causal'
+              and str(e['source']) in known and str(e['target']) in known]
+    touched = {str(e['source']) for e in causal} | {str(e['target']) for e in causal}
+    ids = [str(n['id']) for n in viz_data['nodes'] if str(n['id']) in touched]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+
+    return csr_from_edges(
+        ids,
+        np.array([index[str(e['source'])] for e in causal], dtype=np.int64),
+        np.array([index[str(e['target'])] for e in causal], dtype=np.int64),
+        np.array([e.get('weight', 0) or 0 for e in causal], dtype=np.float64),
+    )
+
+
+def build_causal_graph_from_columns(columns) -> CausalGraph:
+    """Same as build_causal_graph, from data_cache.VizColumns (no JSON parse)."""
+    sources = np.asarray(columns.edge_source, dtype=np.int64)
+    targets = np.asarray(columns.edge_target, dtype=np.int64)
+    # RELATIONSHIPS[0] == 'causal'; -1 is an endpoint missing from the node list
+    causal = (np.asarray(columns.edge_relationship) == 0) & (sources >= 0) & (targets >= 0)
+    sources, targets = sources[causal], targets[causal]
+
+    touched = np.zeros(len(columns.node_ids), dtype=bool)
+    touched[sources] = True
+    touched[targets] = True
+    rows = np.flatnonzero(touched)
+    remap = np.full(len(columns.node_ids), -1, dtype=np.int64)
+    remap[rows] = np.arange(len(rows))
+
+    return csr_from_edges(
+        np.asarray(columns.node_ids)[rows].tolist(),
+        remap[sources],
+        remap[targets],
+        np.asarray(columns.edge_weight, dtype=np.float64)[causal],
+    )
+
+
+def gather_neighbours(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray):
+    """(repeated row, neighbour) arrays for every edge leaving `rows`."""
+    counts = indptr[rows + 1] - indptr[rows]
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    ends = np.cumsum(counts)
+    positions = np.arange(total) + np.repeat(indptr[rows] - (ends - counts), counts)
+    return np.repeat(rows, counts), indices[positions]
+
+
+def pagerank(graph: CausalGraph, damping: float = 0.85, tol: float = 1e-10,
+             max_iter: int = 200, weighted: bool = False) -> np.ndarray:
+    """PageRank by sparse power iteration; dangling mass is spread uniformly."""
+    n = graph.num_nodes
+    if n == 0:
+        return np.empty(0)
+    sources = graph.edge_sources()
+    if weighted:
+        out_weight = np.bincount(sources, weights=graph.weights, minlength=n)
+        edge_share = graph.weights / np.where(out_weight > 0, out_weight, 1)[sources]
+        dangling = out_weight == 0
+    else:
+        out_degree = graph.out_degree
+        edge_share = 1 / np.where(out_degree > 0, out_degree, 1)[sources]
+        dangling = out_degree == 0
+
+    rank = np.full(n, 1 / n)
+    for _ in range(max_iter):
+        flow = np.bincount(graph.indices, weights=rank[sources] * edge_share, minlength=n)
+        new_rank = (1 - damping) / n + damping * (flow + rank[dangling].sum() / n)
+        delta = np.abs(new_rank - rank).sum()
+        rank = new_rank
+        if delta < tol:
+            break
+    return rank
+
+
+def _source_dependencies(graph: CausalGraph, source: int) -> np.ndarray:
+    """Brandes dependency of every node on shortest paths from one source, level by level."""
+    n = graph.num_nodes
+    dist = np.full(n, -1, dtype=np.int64)
+    sigma = np.zeros(n)
+    dist[source] = 0
+    sigma[source] = 1
+    frontier = np.array([source], dtype=np.int64)
+    levels = []  # shortest-path edges (v, w) discovered at each depth
+
+    depth = 0
+    while len(frontier):
+        v, w = gather_neighbours(graph.indptr, graph.indices, frontier)
+        unseen = dist[w] < 0
+        dist[w[unseen]] = depth + 1
+        on_path = dist[w] == depth + 1
+        v, w = v[on_path], w[on_path]
+        np.add.at(sigma, w, sigma[v])
+        levels.append((v, w))
+        frontier = np.unique(w)
+        depth += 1
+
+    delta = np.zeros(n)
+    for v, w in reversed(levels):
+        np.add.at(delta, v, sigma[v] / sigma[w] * (1 + delta[w]))
+    delta[source] = 0
+    return delta
+
+
+def sampling_betweenness(n: int, samples: Optional[int]) -> bool:
+    """True when betweenness(samples=samples) estimates from a sample rather than running exact Brandes."""
+    return samples is not None and samples < n
+
+
+def describe_betweenness(n: int, samples: Optional[int]) -> str:
+    """One line saying whether betweenness over n nodes is sampled, for progress output."""
+    if sampling_betweenness(n, samples):
+        return f"sampled from {samples} of {n} sources"
+    if samples is None:
+        return f"exact ({n} sources)"
+    return f"exact ({samples} samples requested, graph has only {n} sources)"
+
+
+def betweenness(graph: CausalGraph, samples: Optional[int] = None, seed: int = 0) -> np.ndarray:
+    """
+    Directed, unweighted betweenness normalized by (n-1)(n-2).
+
+    Exact Brandes when samples is None or not below the node count. Otherwise
+    `samples` sources are drawn uniformly without replacement and their
+    dependencies are scaled by n / samples, an unbiased estimate whose error
+    shrinks with 1 / sqrt(samples) (see describe_betweenness for reporting).
+    """
+    n = graph.num_nodes
+    sources = np.arange(n)
+    if sampling_betweenness(n, samples):
+        if samples < 1:
+            raise ValueError(f"betweenness samples must be positive, got {samples}")
+        sources = np.random.default_rng(seed).choice(n, size=samples, replace=False)
+
+    score = np.zeros(n)
+    for source in sources:
+        score += _source_dependencies(graph, int(source))
+
+    score *= n / len(sources) if len(sources) else 0
+    return score / ((n - 1) * (n - 2)) if n > 2 else score
+
+
+def degree(graph: CausalGraph) -> np.ndarray:
+    """(in + out) degree over the causal edges, normalized by n - 1."""
+    n = graph.num_nodes
+    return (graph.in_degree + graph.out_degree) / (n - 1 if n > 1 else 1)
+
+
+def min_max(values: np.ndarray) -> np.ndarray:
+    """Scale an array to [0, 1] (all zeros when constant)."""
+    if len(values) == 0:
+        return values
+    lo, hi = values.min(), values.max()
+    return (values - lo) / (hi - lo) if hi > lo else np.zeros_like(values, dtype=float)
+
+
+def composite(metrics: Dict[str, np.ndarray], weights: Dict[str, float] = COMPOSITE_WEIGHTS) -> np.ndarray:
+    """Weighted blend of min-max normalized metric arrays."""
+    names = [name for name in weights if name in metrics]
+    if not names:
+        return np.zeros(0)
+    stacked = np.vstack([min_max(np.asarray(metrics[name], dtype=float)) for name in names])
+    return np.array([weights[name] for name in names]) @ stacked
+
+
+def _cache_path(graph: CausalGraph, samples: Optional[int], seed: int) -> Path:
+    if not sampling_betweenness(graph.num_nodes, samples):
+        samples, seed = None, 0  # Every exact request shares one entry
+    params = f"{graph.hash}:samples={samples}:{seed}"
+    return CACHE_DIR / f"{hashlib.sha256(params.encode()).hexdigest()[:24]}.npz"
+
+
+def compute_structural(graph: CausalGraph, samples: Optional[int] = None, seed: int = 0,
+                       use_cache: bool = True) -> Dict[str, np.ndarray]:
+    """pagerank, betweenness and degree for a graph, cached on disk by graph hash."""
+    path = _cache_path(graph, samples, seed)
+    if use_cache and path.exists():
+        with np.load(path) as cached:
+            return {name: cached[name] for name in cached.files}
+
+    metrics = {
+        'pagerank': pagerank(graph),
+        'betweenness': betweenness(graph, samples=samples, seed=seed),
+        'degree': degree(graph),
+    }
+    if use_cache:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp.npz')
+        np.savez(tmp, **metrics)
+        tmp.replace(path)
+    return metrics
+
+
+def compute_all(graph: CausalGraph, shap: np.ndarray, betweenness_samples: Optional[int] = None,
+                use_cache: bool = True) -> Dict[str, np.ndarray]:
+    """Every ranking method as arrays aligned with graph.ids. shap is per-row importance."""
+    metrics = {'shap': np.asarray(shap, dtype=float)}
+    metrics.update(compute_structural(graph, samples=betweenness_samples, use_cache=use_cache))
+    metrics['composite'] = composite(metrics)
+    return metrics
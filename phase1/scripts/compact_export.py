@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Export v2_1_visualization_final.json in a compact columnar delivery format.
+
+The visualization file repeats every key on every node and edge, writes
+floats to 17 digits and stores the same few strings (node_type, domain,
+relationship, ...) thousands of times. The compact document stores each
+table (nodes, edges, the hierarchy map) as columns instead:
+- "int": plain integers
+- "quantized": integers q for the float value q / 10**decimals
+  (QUANTIZE_DECIMALS per field)
+- "rounded": floats rounded to a number of significant digits
+  (SIGNIFICANT_DIGITS per field), for fields such as importance whose
+  values span many orders of magnitude, where a fixed step would turn
+  small values into 0
+- "dict": a dictionary of distinct values and an integer code per row,
+  for string fields with few distinct values
+- "ref" / "ref_list": node row numbers (-1 for null) instead of node ids,
+  for parent, children, source and target; "ref_list" rows are
+  values[offsets[i]:offsets[i + 1]]
+- "raw": the values as they were
+A column with "rows" only has values for those rows; the others lack the
+field. Other top-level entries (metadata) are copied as they are.
+
+The document is written without whitespace next to .gz and .br (when the
+brotli module is installed) copies for servers that serve precompressed
+files. Every export is decoded again and compared with the source; only the
+quantized and rounded fields may differ, by at most half a step or half a
+unit in the last significant digit. Other float fields stay "raw".
+
+src/data/compactViz.ts is the frontend's reader (App.tsx loads the compact
+file when it is deployed, the original JSON otherwise). When node can run
+it (see bake_layout.ts_runner_available), the export also reports
+JSON.parse time for the original file against JSON.parse plus
+decodeCompactViz for the compact one, the work the browser does.
+
+Usage:
+    python scripts/compact_export.py [--viz FILE] [--output-dir DIR]
+"""
+
+import argparse
+import gzip
+import json
+import math
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bake_layout import BASE_DIR, COORD_DECIMALS, run_ts, ts_runner_available
+from data_cache import DATA_DIR, VIZ_FILE, file_hash
+from json_stream import write_atomic
+
+try:
+    import brotli
+except ImportError:  # Only the .br copy needs it
+    brotli = None
+
+OUTPUT_DIR = DATA_DIR / "compact"
+OUTPUT_NAME = "visualization.compact.json"
+TS_READER = BASE_DIR / "src" / "data" / "compactViz.ts"
+
+FORMAT_NAME = "compact-viz"
+FORMAT_VERSION = 2
+TABLES = ('nodes', 'edges')
+REF_FIELDS = ('parent', 'source', 'target')
+REF_LIST_FIELDS = ('children',)
+QUANTIZE_DECIMALS = {
+    'weight': 6,
+    'x': COORD_DECIMALS,
+    'y': COORD_DECIMALS,
+}
+SIGNIFICANT_DIGITS = {
+    'importance': 6,
+    'shap_importance': 6,
+    'shap_raw': 6,
+}
+DICTIONARY_MAX_RATIO = 0.5  # Dictionary-encode strings with at most this many distinct values per row
+PARSE_REPEAT = 20  # Parse timings keep the fastest of this many runs
+
+# decodeCompactViz on the document read from stdin
+TS_DECODE = r"""
+process.stdout.write(JSON.stringify(mod.decodeCompactViz(JSON.parse(fs.readFileSync(0, 'utf8')))))
+"""
+
+# Fastest JSON.parse (and decodeCompactViz) times in ms for the files named on stdin
+TS_PARSE_TIMES = r"""
+const { original, compact, repeat } = JSON.parse(fs.readFileSync(0, 'utf8'))
+const texts = { original: fs.readFileSync(original, 'utf8'), compact: fs.readFileSync(compact, 'utf8') }
+const fastest = run => {
+  let best = Infinity
+  for (let i = 0; i < repeat; i++) {
+    const start = performance.now()
+    run()
+    best = Math.min(best, performance.now() - start)
+  }
+  return best
+}
+process.stdout.write(JSON.stringify({
+  original: fastest(() => JSON.parse(texts.original)),
+  compact_parse: fastest(() => JSON.parse(texts.compact)),
+  compact_decoded: fastest(() => mod.decodeCompactViz(JSON.parse(texts.compact)))
+}))
+"""
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value) -> bool:
+    return _is_int(value) or isinstance(value, float)
+
+
+def encode_column(name: str, values: list, index: Optional[Dict[str, int]]) -> dict:
+    """Smallest encoding of one column (lossy only for QUANTIZE_DECIMALS and SIGNIFICANT_DIGITS fields)."""
+    if index is not None and name in REF_FIELDS and all(v is None or v in index for v in values):
+        return {'kind': 'ref', 'values': [-1 if v is None else index[v] for v in values]}
+    if index is not None and name in REF_LIST_FIELDS and all(
+            isinstance(v, list) and all(item in index for item in v) for v in values):
+        offsets = [0]
+        for v in values:
+            offsets.append(offsets[-1] + len(v))
+        return {'kind': 'ref_list', 'offsets': offsets, 'values': [index[item] for v in values for item in v]}
+    if all(_is_int(v) for v in values):
+        return {'kind': 'int', 'values': values}
+    if name in QUANTIZE_DECIMALS and all(_is_number(v) and math.isfinite(v) for v in values):
+        decimals = QUANTIZE_DECIMALS[name]
+        return {'kind': 'quantized', 'decimals': decimals, 'values': [round(v * 10 ** decimals) for v in values]}
+    if name in SIGNIFICANT_DIGITS and all(_is_number(v) and math.isfinite(v) for v in values):
+        digits = SIGNIFICANT_DIGITS[name]
+        return {'kind': 'rounded', 'digits': digits, 'values': [float(f"{v:.{digits}g}") for v in values]}
+    if all(v is None or isinstance(v, str) for v in values):
+        dictionary = list(dict.fromkeys(values))
+        if len(dictionary) <= DICTIONARY_MAX_RATIO * len(values):
+            codes = {value: code for code, value in enumerate(dictionary)}
+            return {'kind': 'dict', 'dictionary': dictionary, 'codes': [codes[v] for v in values]}
+    return {'kind': 'raw', 'values': values}
+
+
+def decode_column(column: dict, ids: Optional[List[str]]) -> list:
+    kind = column['kind']
+    if kind == 'ref':
+        return [None if row < 0 else ids[row] for row in column['values']]
+    if kind == 'ref_list':
+        offsets, rows = column['offsets'], column['values']
+        return [[ids[row] for row in rows[start:stop]] for start, stop in zip(offsets, offsets[1:])]
+    if kind == 'quantized':
+        scale = 10 ** column['decimals']
+        return [q / scale for q in column['values']]
+    if kind == 'dict':
+        dictionary = column['dictionary']
+        return [dictionary[code] for code in column['codes']]
+    if kind in ('int', 'rounded', 'raw'):
+        return column['values']
+    raise ValueError(f"unknown column kind: {kind}")
+
+
+def encode_table(records: List[dict], index: Optional[Dict[str, int]]) -> dict:
+    """Columns of a list of dicts, fields in first-seen order."""
+    fields = list(dict.fromkeys(key for record in records for key in record))
+    columns = {}
+    for field in fields:
+        rows = [i for i, record in enumerate(records) if field in record]
+        column = encode_column(field, [records[i][field] for i in rows], index)
+        if len(rows) < len(records):
+            column['rows'] = rows
+        columns[field] = column
+    return {'count': len(records), 'fields': fields, 'columns': columns}
+
+
+def decode_table(table: dict, ids: Optional[List[str]]) -> List[dict]:
+    records = [{} for _ in range(table['count'])]
+    for field in table['fields']:
+        column = table['columns'][field]
+        rows = column.get('rows', range(table['count']))
+        for row, value in zip(rows, decode_column(column, ids)):
+            records[row][field] = value
+    return records
+
+
+def node_index(nodes: List[dict]) -> Optional[Dict[str, int]]:
+    """id -> row when every node has a distinct string id (references need one), else None."""
+    ids = [node.get('id') for node in nodes]
+    if not all(isinstance(node_id, str) for node_id in ids) or len(set(ids)) != len(ids):
+        return None
+    return {node_id: row for row, node_id in enumerate(ids)}
+
+
+def encode_viz(viz_data: dict, source_hash: Optional[str] = None) -> dict:
+    """The compact document for parsed visualization JSON."""
+    index = node_index(viz_data.get('nodes', []))
+    document = {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'source_hash': source_hash,
+        'keys': list(viz_data),
+        'tables': {},
+        'other': {},
+    }
+    for key, value in viz_data.items():
+        if key in TABLES and isinstance(value, list) and all(isinstance(record, dict) for record in value):
+            document['tables'][key] = encode_table(value, index)
+        elif key == 'hierarchy' and isinstance(value, dict) and all(isinstance(v, list) for v in value.values()):
+            # {parent id: [child ids]} as a two-column table
+            records = [{'parent': parent, 'children': children} for parent, children in value.items()]
+            document['tables'][key] = encode_table(records, index)
+        else:
+            document['other'][key] = value
+    return document
+
+
+def decode_viz(document: dict) -> dict:
+    """Rebuild the visualization JSON (quantized floats rounded) from a compact document."""
+    if document.get('format') != FORMAT_NAME or document.get('version') != FORMAT_VERSION:
+        raise ValueError(f"not a {FORMAT_NAME} v{FORMAT_VERSION} document")
+    tables = document['tables']
+    ids = None
+    if 'nodes' in tables and 'id' in tables['nodes']['columns']:
+        ids = decode_column(tables['nodes']['columns']['id'], None)
+    viz_data = {}
+    for key in document['keys']:
+        if key == 'hierarchy' and key in tables:
+            viz_data[key] = {r['parent']: r['children'] for r in decode_table(tables[key], ids)}
+        elif key in tables:
+            viz_data[key] = decode_table(tables[key], ids)
+        else:
+            viz_data[key] = document['other'][key]
+    return viz_data
+
+
+def read_compact(path) -> dict:
+    """Load and decode a compact file, gzip or brotli compressed by suffix."""
+    path = Path(path)
+    data = path.read_bytes()
+    if path.suffix == '.gz':
+        data = gzip.decompress(data)
+    elif path.suffix == '.br':
+        if brotli is None:
+            raise RuntimeError("reading .br files needs the brotli module")
+        data = brotli.decompress(data)
+    return decode_viz(json.loads(data))
+
+
+def decode_viz_ts(document: dict) -> dict:
+    """decode_viz through the frontend's reader, src/data/compactViz.ts (needs ts_runner_available())."""
+    return json.loads(run_ts(TS_READER, TS_DECODE, json.dumps(document)))
+
+
+def browser_parse_times(viz_file, compact_file, repeat=PARSE_REPEAT) -> Dict[str, float]:
+    """
+    Fastest node timings in ms: JSON.parse of the original file, of the
+    compact file, and of the compact file plus decodeCompactViz.
+    """
+    payload = json.dumps({'original': str(viz_file), 'compact': str(compact_file), 'repeat': repeat})
+    return json.loads(run_ts(TS_READER, TS_PARSE_TIMES, payload))
+
+
+def round_trip_errors(original, decoded, path='$', limit=10) -> List[str]:
+    """Differences between two documents, allowing for quantized and rounded fields."""
+    errors = []
+
+    def compare(a, b, where, field):
+        if len(errors) >= limit:
+            return
+        if isinstance(a, dict) and isinstance(b, dict):
+            if set(a) != set(b):
+                errors.append(f"{where}: keys {sorted(set(a) ^ set(b))} differ")
+                return
+            for key in a:
+                compare(a[key], b[key], f"{where}.{key}", key)
+        elif isinstance(a, list) and isinstance(b, list):
+            if len(a) != len(b):
+                errors.append(f"{where}: length {len(a)} != {len(b)}")
+                return
+            for i, (x, y) in enumerate(zip(a, b)):
+                compare(x, y, f"{where}[{i}]", field)
+        elif field in QUANTIZE_DECIMALS and _is_number(a) and _is_number(b):
+            if abs(a - b) > 0.5 * 10 ** -QUANTIZE_DECIMALS[field] * (1 + 1e-9):
+                errors.append(f"{where}: {a!r} != {b!r}")
+        elif field in SIGNIFICANT_DIGITS and _is_number(a) and _is_number(b):
+            if abs(a - b) > 0.5 * 10 ** (1 - SIGNIFICANT_DIGITS[field]) * abs(a) * (1 + 1e-9):
+                errors.append(f"{where}: {a!r} != {b!r}")
+        elif a != b or type(a) is not type(b):
+            errors.append(f"{where}: {a!r} != {b!r}")
+
+    compare(original, decoded, path, None)
+    return errors
+
+
+def export_compact(viz_file=VIZ_FILE, output_dir=OUTPUT_DIR) -> Dict[str, int]:
+    """Write the compact file and its compressed copies. Returns {path: bytes} of everything written or kept."""
+    with open(viz_file) as f:
+        viz_data = json.load(f)
+    document = encode_viz(viz_data, file_hash(viz_file))
+    data = json.dumps(document, separators=(',', ':'), ensure_ascii=False).encode()
+
+    errors = round_trip_errors(viz_data, decode_viz(json.loads(data)))
+    if errors:
+        raise ValueError("compact round trip failed:\n  " + "\n  ".join(errors))
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    path = output_dir / OUTPUT_NAME
+    outputs = {path: data, path.with_name(path.name + '.gz'): gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        outputs[path.with_name(path.name + '.br')] = brotli.compress(data, quality=11)
+    for target, payload in outputs.items():
+        write_atomic(target, [payload], binary=True)
+    return {target: len(payload) for target, payload in outputs.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the visualization data in the compact columnar format")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON')
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR, help='Where to write the compact files')
+    args = parser.parse_args()
+
+    print("Exporting...")
+    sizes = export_compact(args.viz, args.output_dir)
+    original = args.viz.stat().st_size
+    print(f"  {args.viz.name}: {original / 1024:.1f} KB")
+    for path, size in sizes.items():
+        print(f"  {path.name}: {size / 1024:.1f} KB ({original / size:.1f}x smaller)")
+    if brotli is None:
+        print("  brotli module not installed: no .br copy")
+
+    # Parse + decode time against parsing the original
+    compact_path = args.output_dir / OUTPUT_NAME
+    start = time.perf_counter()
+    with open(args.viz) as f:
+        json.load(f)
+    original_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    read_compact(compact_path)
+    compact_seconds = time.perf_counter() - start
+    print(f"  Python load: {original_seconds * 1000:.1f} ms original, {compact_seconds * 1000:.1f} ms compact "
+          f"(decoded)")
+    if ts_runner_available():
+        times = browser_parse_times(args.viz, compact_path)
+        print(f"  Node JSON.parse: {times['original']:.1f} ms original, {times['compact_parse']:.1f} ms compact, "
+              f"{times['compact_decoded']:.1f} ms compact + decodeCompactViz")
+    else:
+        print("  No TypeScript runner: browser parse time not measured")
+    print("Round trip OK")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
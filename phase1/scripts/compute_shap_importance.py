@@ -10,32 +10,42 @@ This script:
 5. Generates updated visualization data and validation reports
 """
 
+import argparse
+import hashlib
+import heapq
 import json
-import pickle
 import math
 from pathlib import Path
 from datetime import datetime
-from collections import defaultdict
-import statistics
+
+import numpy as np
+
+from data_cache import SHAP_FILE, load_shap_columns
+from hierarchy import hierarchy_from_viz
+from instrumentation import StageRecorder
+from json_stream import StreamDict, StreamList, iter_json, write_atomic
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "public" / "data"
 OUTPUT_DIR = DATA_DIR / "importance"
-SHAP_FILE = Path("/home/sandesh/Documents/Global_Project/v2.1/outputs/B25/B25_shap_scores.pkl")
 VIZ_FILE = DATA_DIR / "v2_1_visualization_final.json"
 
+# Stages recorded by --trace / --chrome-trace and selectable for --profile-stage
+STAGES = ('load_data', 'build_hierarchy', 'aggregate', 'normalize', 'generate_outputs', 'run_validation_checks')
+
 # Config
 FLOOR_PERCENTAGE = 0.5  # Outcomes must be at least 50% of max outcome
+LEAF_LAYER = 5  # Indicators carry their own SHAP values
+AGGREGATE_LAYERS = (0, 1, 2, 3, 4)  # Sum of children
 
 
 def load_data():
     """Load SHAP scores and visualization data."""
     print("Loading data...")
 
-    # Load SHAP scores
-    with open(SHAP_FILE, 'rb') as f:
-        shap_scores = pickle.load(f)
+    # Load SHAP scores (columnar cache of the pickle, converted on first use)
+    shap_scores = load_shap_columns(SHAP_FILE).as_scores()
     print(f"  Loaded {len(shap_scores)} SHAP scores")
 
     # Load visualization data
@@ -47,19 +57,91 @@ def load_data():
 
 
 def build_hierarchy(viz_data):
-    """Build parent-child relationships from viz data."""
+    """Index nodes by id and compile the parent links (see hierarchy.py)."""
     nodes_by_id = {str(n['id']): n for n in viz_data['nodes']}
-    children_by_parent = defaultdict(list)
+    return nodes_by_id, hierarchy_from_viz(viz_data)
+
+
+def hierarchy_hash(nodes_by_id):
+    """Hash of every node's parent link and layer, to tell whether two runs share a hierarchy."""
+    links = "\n".join(f"{node_id}\t{node.get('parent')}\t{node['layer']}"
+                      for node_id, node in sorted(nodes_by_id.items()))
+    return hashlib.sha256(links.encode()).hexdigest()
+
+
+def sum_children(child_values, starts):
+    """
+    Sums of consecutive child rows starting at each of starts.
+
+    Both the full aggregation and the incremental update add children up
+    through this one call, so they round identically.
+    """
+    return np.add.reduceat(child_values, starts, axis=0)
+
 
-    for node in viz_data['nodes']:
-        if node.get('parent') is not None:
-            parent_id = str(node['parent'])
-            children_by_parent[parent_id].append(str(node['id']))
+def aggregate_metrics(hierarchy, leaf_values):
+    """
+    Aggregate an (N, M) matrix of metric columns up the hierarchy in one pass.
+
+    Rows follow hierarchy.ids, whose levels and sibling groups are contiguous,
+    so a whole level is summed into its parents with one np.add.reduceat call.
+    Nodes in AGGREGATE_LAYERS that have children take the sum of their
+    children; everything else keeps its own value.
+    Levels are processed deepest first so each sum sees finished children.
+    """
+    values = np.array(leaf_values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
 
-    return nodes_by_id, children_by_parent
+    aggregate = np.isin(hierarchy.layer, AGGREGATE_LAYERS)
+    offsets = hierarchy.level_offsets
 
+    for depth in range(len(offsets) - 3, -1, -1):
+        lo, hi = offsets[depth], offsets[depth + 1]
+        child_lo, child_hi = offsets[depth + 1], offsets[depth + 2]
+        has_children = hierarchy.child_count[lo:hi] > 0
+        if not has_children.any():
+            continue
 
-def compute_hierarchical_shap(shap_scores, nodes_by_id, children_by_parent):
+        # Segment boundaries must cover every parent with children; only the
+        # aggregating ones are written back.
+        starts = hierarchy.child_start[lo:hi][has_children] - child_lo
+        sums = sum_children(values[child_lo:child_hi], starts)
+        targets = np.flatnonzero(has_children) + lo
+        write = aggregate[targets]
+        values[targets[write]] = sums[write]
+
+    return values
+
+
+def compute_hierarchical_metrics(leaf_metrics, hierarchy):
+    """
+    Aggregate several metrics up the hierarchy in a single bottom-up pass.
+
+    leaf_metrics maps a metric name (shap, pagerank, degree, ...) to
+    {node_id: value} for the nodes that carry their own value, normally the
+    L5 indicators.
+    Returns {metric: {node_id: aggregated value}} for layers 0-5.
+    """
+    names = list(leaf_metrics)
+    leaf_values = np.zeros((hierarchy.num_nodes, len(names)))
+    for col, name in enumerate(names):
+        for node_id, value in leaf_metrics[name].items():
+            idx = hierarchy.index.get(node_id)
+            if idx is not None:
+                leaf_values[idx, col] = value
+
+    values = aggregate_metrics(hierarchy, leaf_values)
+
+    keep = np.flatnonzero(hierarchy.layer <= LEAF_LAYER)
+    keep_ids = [hierarchy.ids[i] for i in keep]
+    return {
+        name: dict(zip(keep_ids, values[keep, col].tolist()))
+        for col, name in enumerate(names)
+    }
+
+
+def compute_hierarchical_shap(shap_scores, nodes_by_id, hierarchy):
     """
     Compute SHAP values for all nodes in hierarchy.
 
@@ -69,38 +151,20 @@ def compute_hierarchical_shap(shap_scores, nodes_by_id, children_by_parent):
     """
     print("\nComputing hierarchical SHAP values...")
 
-    node_shap = {}  # id -> raw shap value (before normalization)
+    l5_ids = [node_id for node_id, node in nodes_by_id.items() if node['layer'] == LEAF_LAYER]
+    l5_count = sum(1 for node_id in l5_ids if node_id in shap_scores)
+    print(f"  L5: {l5_count} with SHAP, {len(l5_ids) - l5_count} missing")
+
+    leaf_metrics = {
+        "shap": {
+            node_id: shap_scores[node_id].get('shap_normalized', 0)
+            for node_id in l5_ids if node_id in shap_scores
+        }
+    }
+    node_shap = compute_hierarchical_metrics(leaf_metrics, hierarchy)["shap"]
 
-    # First, assign L5 indicator SHAP values
-    l5_count = 0
-    l5_missing = 0
-    for node_id, node in nodes_by_id.items():
-        if node['layer'] == 5:
-            # Try to find SHAP score by node id
-            if node_id in shap_scores:
-                node_shap[node_id] = shap_scores[node_id].get('shap_normalized', 0)
-                l5_count += 1
-            else:
-                node_shap[node_id] = 0
-                l5_missing += 1
-
-    print(f"  L5: {l5_count} with SHAP, {l5_missing} missing")
-
-    # Aggregate up the hierarchy (L4 -> L3 -> L2 -> L1 -> L0)
     for layer in [4, 3, 2, 1, 0]:
-        layer_nodes = [n for n in nodes_by_id.values() if n['layer'] == layer]
-        for node in layer_nodes:
-            node_id = str(node['id'])
-            children = children_by_parent.get(node_id, [])
-            if children:
-                # Sum of children's SHAP values
-                child_sum = sum(node_shap.get(c, 0) for c in children)
-                node_shap[node_id] = child_sum
-            else:
-                # Leaf node without children at non-L5 layer (shouldn't happen often)
-                node_shap[node_id] = node_shap.get(node_id, 0)
-
-        layer_vals = [node_shap[str(n['id'])] for n in layer_nodes]
+        layer_vals = [node_shap[hierarchy.ids[i]] for i in np.flatnonzero(hierarchy.layer == layer)]
         if layer_vals:
             print(f"  L{layer}: count={len(layer_vals)}, sum={sum(layer_vals):.4f}, max={max(layer_vals):.4f}")
 
@@ -157,96 +221,203 @@ def normalize_shap(node_shap):
     return normalized, max_shap
 
 
-def generate_outputs(viz_data, normalized_shap, node_shap_raw, boosted, max_shap, nodes_by_id):
-    """Generate all output files."""
+def load_previous_state():
+    """
+    Raw and normalized values from the last run's viz_importance_metadata.json.
+
+    Returns None when there is no previous run to diff against.
+    """
+    path = OUTPUT_DIR / "viz_importance_metadata.json"
+    if not path.exists():
+        return None
+    with open(path) as f:
+        metadata = json.load(f)
+    node_importance = metadata.get('node_importance', {})
+    return {
+        "metadata": metadata,
+        "max_shap": metadata.get('normalization', {}).get('max_value', 0),
+        "hierarchy_hash": metadata.get('hierarchy_hash'),
+        "raw": {node_id: v['shap_raw'] for node_id, v in node_importance.items()},
+        "normalized": {node_id: v['shap_normalized'] for node_id, v in node_importance.items()},
+    }
+
+
+def compute_incremental_shap(shap_scores, nodes_by_id, hierarchy, previous):
+    """
+    Update the previous run's raw SHAP values for the indicators whose score changed.
+
+    Only the ancestors of changed L5 values are re-summed.
+    Returns (node_shap, affected_ids), or None if the node set or any parent
+    link changed and a full recompute is needed.
+    """
+    print("\nComputing hierarchical SHAP values (incremental)...")
+
+    if set(previous['raw']) != set(nodes_by_id):
+        print("  Node set changed since last run, falling back to full recompute")
+        return None
+    if previous['hierarchy_hash'] != hierarchy_hash(nodes_by_id):
+        print("  Hierarchy changed since last run (or was not recorded), falling back to full recompute")
+        return None
+
+    node_shap = dict(previous['raw'])
+    changed = set()
+    ancestors = set()
+
+    for node_id, node in nodes_by_id.items():
+        if node['layer'] != LEAF_LAYER:
+            continue
+        new_val = shap_scores[node_id].get('shap_normalized', 0) if node_id in shap_scores else 0
+        if new_val == node_shap[node_id]:
+            continue
+        node_shap[node_id] = new_val
+        changed.add(node_id)
+        if node_id in hierarchy.index:
+            ancestors.update(row for row in hierarchy.ancestors(node_id) if hierarchy.layer[row] in AGGREGATE_LAYERS)
+
+    # Re-sum each touched ancestor from its children, deepest rows first (levels
+    # are contiguous in breadth-first order), instead of adding deltas, so the
+    # values match a full recompute exactly
+    for row in sorted(ancestors, reverse=True):
+        parent_id = hierarchy.ids[row]
+        child_values = np.array([[node_shap[child_id]] for child_id in hierarchy.children(parent_id)])
+        node_shap[parent_id] = float(sum_children(child_values, [0])[0, 0])
+
+    print(f"  L5: {len(changed)} changed, {len(ancestors)} ancestors updated")
+    return node_shap, changed | {hierarchy.ids[row] for row in ancestors}
+
+
+def normalize_shap_incremental(node_shap, previous, affected):
+    """
+    Normalize after an incremental update.
+
+    If the global max is unchanged only the affected nodes are rescaled;
+    otherwise every node is renormalized.
+    """
+    max_shap = max(node_shap.values())
+    if max_shap != previous['max_shap']:
+        print("\nGlobal max changed, renormalizing all nodes")
+        return normalize_shap(node_shap)
+
+    print(f"\nGlobal max unchanged ({max_shap:.4f}), renormalizing {len(affected)} nodes")
+    normalized = dict(previous['normalized'])
+    for node_id in affected:
+        normalized[node_id] = node_shap[node_id] / max_shap if max_shap > 0 else 0
+    return normalized, max_shap
+
+
+def report_write(path, written, verb="Created"):
+    print(f"  {verb if written else 'Unchanged'}: {path}")
+
+
+def importance_distribution(values):
+    """min/max/mean/median/p25/p75/p95 of the normalized values from a single sort."""
+    ordered = np.sort(np.fromiter(values, dtype=np.float64))
+    n = len(ordered)
+    median = ordered[n // 2] if n % 2 else (ordered[n // 2 - 1] + ordered[n // 2]) / 2
+    return {
+        "min": round(float(ordered[0]), 6),
+        "max": round(float(ordered[-1]), 6),
+        "mean": round(math.fsum(ordered.tolist()) / n, 6),
+        "median": round(float(median), 6),
+        "p25": round(float(ordered[n // 4]), 6),
+        "p75": round(float(ordered[3 * n // 4]), 6),
+        "p95": round(float(ordered[int(0.95 * n)]), 6)
+    }
+
+
+def generate_outputs(viz_data, normalized_shap, node_shap_raw, boosted, max_shap, nodes_by_id,
+                     compact=False):
+    """
+    Generate all output files.
+
+    Nodes are streamed straight to disk with their importance fields added,
+    so no second copy of the dataset is built. Every file goes through
+    write_atomic. compact=True drops the indent=2 pretty-printing.
+    """
     print("\nGenerating output files...")
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    indent = None if compact else 2
 
     # 1. Update visualization data with importance
-    updated_viz = viz_data.copy()
-    updated_viz['nodes'] = []
+    def updated_nodes():
+        for node in viz_data['nodes']:
+            node_id = str(node['id'])
+            yield {**node, 'importance': normalized_shap.get(node_id, 0), 'shap_raw': node_shap_raw.get(node_id, 0)}
 
-    for node in viz_data['nodes']:
-        node_id = str(node['id'])
-        updated_node = node.copy()
-        updated_node['importance'] = normalized_shap.get(node_id, 0)
-        updated_node['shap_raw'] = node_shap_raw.get(node_id, 0)
-        updated_viz['nodes'].append(updated_node)
+    updated_viz = StreamDict(
+        (key, StreamList(updated_nodes()) if key == 'nodes' else StreamList(value) if isinstance(value, list) else value)
+        for key, value in viz_data.items()
+    )
 
     # Save updated viz file (in main data dir for visualization to use)
     output_viz_path = DATA_DIR / "v2_1_visualization_final.json"
-    with open(output_viz_path, 'w') as f:
-        json.dump(updated_viz, f, indent=2)
-    print(f"  Updated: {output_viz_path}")
+    report_write(output_viz_path, write_atomic(output_viz_path, iter_json(updated_viz, indent)), "Updated")
 
     # 2. Generate importance metadata
-    node_importance = {}
-    for node in updated_viz['nodes']:
-        node_id = str(node['id'])
-        node_importance[node_id] = {
-            "shap_raw": node_shap_raw.get(node_id, 0),
-            "shap_normalized": normalized_shap.get(node_id, 0),
-            "layer": node['layer'],
-            "is_outcome": node['layer'] == 1,
-            "floor_adjusted": node_id in boosted
-        }
-        if node_id in boosted:
-            node_importance[node_id]["boost_factor"] = boosted[node_id]
-
-    metadata = {
-        "importance_metric": "shap_hierarchical",
-        "computation_date": datetime.now().isoformat()[:10],
-        "normalization": {
+    def node_importance():
+        for node in viz_data['nodes']:
+            node_id = str(node['id'])
+            entry = {
+                "shap_raw": node_shap_raw.get(node_id, 0),
+                "shap_normalized": normalized_shap.get(node_id, 0),
+                "layer": node['layer'],
+                "is_outcome": node['layer'] == 1,
+                "floor_adjusted": node_id in boosted
+            }
+            if node_id in boosted:
+                entry["boost_factor"] = boosted[node_id]
+            yield node_id, entry
+
+    metadata = StreamDict([
+        ("importance_metric", "shap_hierarchical"),
+        ("computation_date", datetime.now().isoformat()[:10]),
+        ("normalization", {
             "method": "global_max",
             "max_value": max_shap,
             "floor_applied": True,
             "floor_percentage": FLOOR_PERCENTAGE
-        },
-        "node_importance": node_importance,
-        "size_mapping": {
+        }),
+        ("hierarchy_hash", hierarchy_hash(nodes_by_id)),
+        ("node_importance", StreamDict(node_importance())),
+        ("size_mapping", {
             "min_radius_px": 3,
             "max_radius_px": 15,
             "formula": "radius = min + (max - min) * sqrt(importance)"
-        }
-    }
+        }),
+    ])
 
-    with open(OUTPUT_DIR / "viz_importance_metadata.json", 'w') as f:
-        json.dump(metadata, f, indent=2)
-    print(f"  Created: {OUTPUT_DIR / 'viz_importance_metadata.json'}")
+    # Keep the previous computation_date (line 3) when nothing else changed
+    metadata_path = OUTPUT_DIR / "viz_importance_metadata.json"
+    date_line = (2, ' ' * (indent or 0) + '"computation_date"')
+    report_write(metadata_path, write_atomic(metadata_path, iter_json(metadata, indent), date_line))
 
     # 3. Generate validation report
-    all_importances = list(normalized_shap.values())
-    outcome_nodes = [n for n in updated_viz['nodes'] if n['layer'] == 1]
+    outcome_nodes = [n for n in viz_data['nodes'] if n['layer'] == 1]
 
     outcome_importance = {}
-    for n in sorted(outcome_nodes, key=lambda x: normalized_shap.get(str(x['id']), 0), reverse=True):
+    ranked = sorted(outcome_nodes, key=lambda x: normalized_shap.get(str(x['id']), 0), reverse=True)
+    for rank, n in enumerate(ranked, 1):
         node_id = str(n['id'])
         outcome_importance[n['label']] = {
             "raw_shap": node_shap_raw.get(node_id, 0),
             "normalized": normalized_shap.get(node_id, 0),
             "floor_adjusted": node_id in boosted,
-            "rank": list(outcome_importance.keys()).__len__() + 1
+            "rank": rank
         }
         if node_id in boosted:
             outcome_importance[n['label']]["boost_factor"] = boosted[node_id]
 
+    total_nodes = len(viz_data['nodes'])
+    nodes_with_importance = sum(1 for v in normalized_shap.values() if v > 0)
     validation = {
         "summary": {
-            "total_nodes": len(updated_viz['nodes']),
-            "nodes_with_importance": sum(1 for v in normalized_shap.values() if v > 0),
-            "coverage_percentage": round(100 * sum(1 for v in normalized_shap.values() if v > 0) / len(updated_viz['nodes']), 1)
+            "total_nodes": total_nodes,
+            "nodes_with_importance": nodes_with_importance,
+            "coverage_percentage": round(100 * nodes_with_importance / total_nodes, 1)
         },
         "outcome_importance": outcome_importance,
-        "distribution": {
-            "min": round(min(all_importances), 6),
-            "max": round(max(all_importances), 6),
-            "mean": round(statistics.mean(all_importances), 6),
-            "median": round(statistics.median(all_importances), 6),
-            "p25": round(sorted(all_importances)[len(all_importances)//4], 6),
-            "p75": round(sorted(all_importances)[3*len(all_importances)//4], 6),
-            "p95": round(sorted(all_importances)[int(0.95*len(all_importances))], 6)
-        },
+        "distribution": importance_distribution(normalized_shap.values()),
         "warnings": []
     }
 
@@ -257,9 +428,8 @@ def generate_outputs(viz_data, normalized_shap, node_shap_raw, boosted, max_shap
                 f"{label} boosted {data['boost_factor']:.0f}x to meet 50% floor"
             )
 
-    with open(OUTPUT_DIR / "shap_importance_validation.json", 'w') as f:
-        json.dump(validation, f, indent=2)
-    print(f"  Created: {OUTPUT_DIR / 'shap_importance_validation.json'}")
+    validation_path = OUTPUT_DIR / "shap_importance_validation.json"
+    report_write(validation_path, write_atomic(validation_path, iter_json(validation, indent)))
 
     # 4. Generate human-readable summary
     summary_lines = [
@@ -281,10 +451,10 @@ def generate_outputs(viz_data, normalized_shap, node_shap_raw, boosted, max_shap
             f"| {data['rank']} | {label} | {data['raw_shap']:.4f} | {data['normalized']:.3f} | {floor_adj} |"
         )
 
-    # Top indicators
-    l5_nodes = [(str(n['id']), n['label'], normalized_shap.get(str(n['id']), 0))
-                for n in updated_viz['nodes'] if n['layer'] == 5]
-    l5_sorted = sorted(l5_nodes, key=lambda x: x[2], reverse=True)
+    # Top indicators (nlargest keeps the stable order of a full sort)
+    l5_nodes = ((str(n['id']), n['label'], normalized_shap.get(str(n['id']), 0))
+                for n in viz_data['nodes'] if n['layer'] == 5)
+    l5_top = heapq.nlargest(20, l5_nodes, key=lambda x: x[2])
 
     summary_lines.extend([
         "",
@@ -294,7 +464,7 @@ def generate_outputs(viz_data, normalized_shap, node_shap_raw, boosted, max_shap
         "|------|-----------|------------|"
     ])
 
-    for i, (node_id, label, imp) in enumerate(l5_sorted[:20], 1):
+    for i, (node_id, label, imp) in enumerate(l5_top, 1):
         summary_lines.append(f"| {i} | {label[:40]} | {imp:.4f} |")
 
     summary_lines.extend([
@@ -308,9 +478,9 @@ def generate_outputs(viz_data, normalized_shap, node_shap_raw, boosted, max_shap
         f"- 95th percentile: {validation['distribution']['p95']:.4f}",
     ])
 
-    with open(OUTPUT_DIR / "shap_importance_summary.md", 'w') as f:
-        f.write('\n'.join(summary_lines))
-    print(f"  Created: {OUTPUT_DIR / 'shap_importance_summary.md'}")
+    # Like the metadata, a new date alone does not count as a change
+    summary_path = OUTPUT_DIR / "shap_importance_summary.md"
+    report_write(summary_path, write_atomic(summary_path, ['\n'.join(summary_lines)], (2, "Generated: ")))
 
     return validation
 
@@ -346,31 +516,76 @@ def run_validation_checks(normalized_shap, nodes_by_id):
     return all(passed for _, passed in checks)
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compute hierarchical SHAP importance")
+    parser.add_argument('--incremental', action='store_true',
+                        help='Diff against the previous run and only update changed ancestor paths')
+    parser.add_argument('--compact', action='store_true',
+                        help='Write the JSON outputs without indentation (smaller, faster for large graphs)')
+    parser.add_argument('--trace', type=Path,
+                        help='Write per-stage wall/CPU time and peak memory to this JSON file')
+    parser.add_argument('--chrome-trace', type=Path,
+                        help='Also write the stages in Chrome trace-event format')
+    parser.add_argument('--profile-stage', choices=STAGES,
+                        help='Run one stage under cProfile and print its hottest functions')
+    parser.add_argument('--profile-output', type=Path,
+                        help='Where to dump the cProfile stats (default .cache/profiles/<stage>.prof)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    recorder = StageRecorder(
+        trace_memory=bool(args.trace or args.chrome_trace),
+        profile_stage=args.profile_stage,
+        profile_output=args.profile_output,
+    )
+
     print("=" * 60)
     print("SHAP Importance Computation for Phase 1 MVP")
     print("=" * 60)
 
     # Load data
-    shap_scores, viz_data = load_data()
+    with recorder.stage('load_data'):
+        shap_scores, viz_data = load_data()
 
     # Build hierarchy
-    nodes_by_id, children_by_parent = build_hierarchy(viz_data)
-
-    # Compute hierarchical SHAP
-    node_shap_raw = compute_hierarchical_shap(shap_scores, nodes_by_id, children_by_parent)
-
-    # Normalize to 0-1 (pure SHAP, no floor boosting)
-    normalized_shap, max_shap = normalize_shap(node_shap_raw)
+    with recorder.stage('build_hierarchy'):
+        nodes_by_id, hierarchy = build_hierarchy(viz_data)
+
+    # Incremental update against the previous run when possible
+    with recorder.stage('aggregate'):
+        incremental = None
+        previous = load_previous_state() if args.incremental else None
+        if previous is not None:
+            incremental = compute_incremental_shap(shap_scores, nodes_by_id, hierarchy, previous)
+        elif args.incremental:
+            print("\nNo previous run found, computing from scratch")
+
+        if incremental is None:
+            # Compute hierarchical SHAP
+            node_shap_raw = compute_hierarchical_shap(shap_scores, nodes_by_id, hierarchy)
+        else:
+            node_shap_raw, affected = incremental
+
+    with recorder.stage('normalize'):
+        if incremental is not None:
+            normalized_shap, max_shap = normalize_shap_incremental(node_shap_raw, previous, affected)
+        else:
+            # Normalize to 0-1 (pure SHAP, no floor boosting)
+            normalized_shap, max_shap = normalize_shap(node_shap_raw)
 
     # No floor boosting - pure SHAP values
     boosted = {}
 
     # Generate outputs
-    validation = generate_outputs(viz_data, normalized_shap, node_shap_raw, boosted, max_shap, nodes_by_id)
+    with recorder.stage('generate_outputs'):
+        validation = generate_outputs(viz_data, normalized_shap, node_shap_raw, boosted, max_shap, nodes_by_id,
+                                      compact=args.compact)
 
     # Run validation
-    all_passed = run_validation_checks(normalized_shap, nodes_by_id)
+    with recorder.stage('run_validation_checks'):
+        all_passed = run_validation_checks(normalized_shap, nodes_by_id)
 
     print("\n" + "=" * 60)
     print("SUMMARY")
@@ -381,6 +596,14 @@ def main():
     print(f"All validation checks: {'PASSED' if all_passed else 'FAILED'}")
     print(f"\nOutput directory: {OUTPUT_DIR}")
 
+    recorder.print_summary()
+    if args.trace:
+        recorder.write_json(args.trace)
+        print(f"Trace: {args.trace}")
+    if args.chrome_trace:
+        recorder.write_chrome_trace(args.chrome_trace)
+        print(f"Chrome trace: {args.chrome_trace}")
+
     return all_passed
 
 
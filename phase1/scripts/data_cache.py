@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Columnar sidecar cache for the visualization data and SHAP scores.
+
+The first load of a source file converts it into a directory of .npy columns
+(node ids, layers, parent indices, importance arrays, edge arrays) keyed by the
+file's content hash. Later loads memory-map those columns read-only, so they
+skip JSON/pickle parsing and processes reading the same cache share pages.
+
+Usage:
+    python scripts/data_cache.py            # build the cache for the default files
+    python scripts/data_cache.py --clear    # drop every cached conversion
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+DATA_DIR = BASE_DIR / "public" / "data"
+VIZ_FILE = DATA_DIR / "v2_1_visualization_final.json"
+SHAP_FILE = Path(os.environ.get(
+    "B25_SHAP_FILE", "/home/sandesh/Documents/Global_Project/v2.1/outputs/B25/B25_shap_scores.pkl"
+))
+CACHE_DIR = BASE_DIR / ".cache" / "columnar"
+
+CACHE_VERSION = 1  # Bump when the column layout changes
+RELATIONSHIPS = ('causal', 'hierarchical')
+
+
+def file_hash(path):
+    """SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ColumnStore:
+    """Read-only memory-mapped columns from one cache directory."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / "meta.json") as f:
+            self.meta = json.load(f)
+        self.source_hash = self.meta['source_hash']
+        for name in self.meta['columns']:
+            setattr(self, name, np.load(self.directory / f"{name}.npy", mmap_mode='r'))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.directory.name}, columns={self.meta['columns']})"
+
+
+class VizColumns(ColumnStore):
+    """
+    Columnar view of v2_1_visualization_final.json.
+
+    Node rows follow the file's node order; parent and edge endpoints are row
+    indices (-1 when absent). edge_relationship indexes into RELATIONSHIPS.
+    """
+
+    @property
+    def index(self):
+        """id -> row, built on first use."""
+        if not hasattr(self, '_index'):
+            self._index = {node_id: i for i, node_id in enumerate(self.node_ids.tolist())}
+        return self._index
+
+    def children_by_parent(self):
+        """{parent_id: [child_id, ...]} in node order, like build_hierarchy()."""
+        ids = self.node_ids.tolist()
+        children = {}
+        for row, parent in enumerate(self.parent.tolist()):
+            if parent >= 0:
+                children.setdefault(ids[parent], []).append(ids[row])
+        return children
+
+
+class ShapColumns(ColumnStore):
+    """Columnar view of the B25 SHAP pickle: indicator ids and shap_normalized."""
+
+    def as_scores(self):
+        """{id: {'shap_normalized': value}}, the shape compute_shap_importance expects."""
+        return {
+            node_id: {'shap_normalized': value}
+            for node_id, value in zip(self.ids.tolist(), self.shap_normalized.tolist())
+        }
+
+
+def viz_to_columns(viz_data):
+    """Convert parsed visualization JSON into {column: array}."""
+    nodes = viz_data['nodes']
+    ids = [str(n['id']) for n in nodes]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+
+    edges = viz_data.get('edges', [])
+    return {
+        'node_ids': np.array(ids, dtype=str),
+        'layer': np.array([n['layer'] for n in nodes], dtype=np.int16),
+        'parent': np.array([
+            index.get(str(n['parent']), -1) if n.get('parent') is not None else -1 for n in nodes
+        ], dtype=np.int32),
+        'importance': np.array([n.get('importance', 0) or 0 for n in nodes], dtype=np.float64),
+        'shap_raw': np.array([n.get('shap_raw', 0) or 0 for n in nodes], dtype=np.float64),
+        'in_degree': np.array([n.get('in_degree', 0) or 0 for n in nodes], dtype=np.int32),
+        'out_degree': np.array([n.get('out_degree', 0) or 0 for n in nodes], dtype=np.int32),
+        'edge_source': np.array([index.get(str(e['source']), -1) for e in edges], dtype=np.int32),
+        'edge_target': np.array([index.get(str(e['target']), -1) for e in edges], dtype=np.int32),
+        'edge_weight': np.array([e.get('weight', 0) or 0 for e in edges], dtype=np.float64),
+        'edge_relationship': np.array([
+            RELATIONSHIPS.index(e['relationship']) if e.get('relationship') in RELATIONSHIPS else -1
+            for e in edges
+        ], dtype=np.int8),
+    }
+
+
+def shap_to_columns(shap_scores):
+    """Convert the {id: {'shap_normalized': ...}} pickle into {column: array}."""
+    ids = [str(k) for k in shap_scores]
+    return {
+        'ids': np.array(ids, dtype=str),
+        'shap_normalized': np.array(
+            [shap_scores[k].get('shap_normalized', 0) for k in shap_scores], dtype=np.float64
+        ),
+    }
+
+
+def write_columns(directory, columns, source, source_hash):
+    """Write columns to a temp dir and rename it into place so readers never see half a cache."""
+    directory = Path(directory)
+    directory.parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(tempfile.mkdtemp(prefix=f".{directory.name}.", dir=directory.parent))
+    try:
+        for name, values in columns.items():
+            np.save(tmp / f"{name}.npy", values)
+        with open(tmp / "meta.json", 'w') as f:
+            json.dump({
+                'version': CACHE_VERSION,
+                'source': str(source),
+                'source_hash': source_hash,
+                'columns': list(columns),
+                'rows': {name: len(values) for name, values in columns.items()},
+            }, f, indent=2)
+        try:
+            tmp.rename(directory)
+        except OSError:
+            # Another process finished first; its copy is identical
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return directory
+
+
+def _cached(kind, source, convert, store_cls, cache_dir):
+    source = Path(source)
+    source_hash = file_hash(source)
+    directory = Path(cache_dir) / f"{kind}-v{CACHE_VERSION}-{source_hash[:24]}"
+    if not (directory / "meta.json").exists():
+        write_columns(directory, convert(source), source, source_hash)
+    return store_cls(directory)
+
+
+def load_viz_columns(viz_file=VIZ_FILE, cache_dir=CACHE_DIR):
+    """Memory-mapped columns for a visualization JSON file, converting it on first use."""
+    def convert(path):
+        with open(path) as f:
+            return viz_to_columns(json.load(f))
+    return _cached("viz", viz_file, convert, VizColumns, cache_dir)
+
+
+def load_shap_columns(shap_file=SHAP_FILE, cache_dir=CACHE_DIR):
+    """Memory-mapped columns for the SHAP pickle, converting it on first use."""
+    def convert(path):
+        with open(path, 'rb') as f:
+            return shap_to_columns(pickle.load(f))
+    return _cached("shap", shap_file, convert, ShapColumns, cache_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or clear the columnar data cache")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON')
+    parser.add_argument('--shap', type=Path, default=SHAP_FILE, help='SHAP scores pickle')
+    parser.add_argument('--clear', action='store_true', help='Remove all cached conversions')
+    args = parser.parse_args()
+
+    if args.clear:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        print(f"Cleared {CACHE_DIR}")
+        return
+
+    viz = load_viz_columns(args.viz)
+    print(f"Viz columns: {len(viz.node_ids)} nodes, {len(viz.edge_source)} edges -> {viz.directory}")
+    if args.shap.exists():
+        shap = load_shap_columns(args.shap)
+        print(f"SHAP columns: {len(shap.ids)} scores -> {shap.directory}")
+    else:
+        print(f"SHAP pickle not found, skipped: {args.shap}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Precompute hierarchical edge bundles for the causal edges.
+
+Each causal edge is routed through the hierarchy: up from the source to the
+lowest common ancestor of both endpoints, then down to the target, using the
+node positions of the default radial layout. The control polygon is pulled
+toward the straight source-target line by the bundling strength beta
+(Holten's straightening), so beta=1 follows the tree exactly and beta=0 is a
+straight line. The renderer draws each polygon with a B-spline
+(d3.curveBasis).
+
+Everything is computed for all edges at once on padded NumPy arrays (paths
+are at most 2 * depth + 1 points), and written as packed arrays rather than
+per-edge objects:
+- edges are sorted by weight, heaviest first, so every LOD bucket is a
+  prefix: drawing the top k edges is edges[:lod[i].edges]
+- points holds x, y pairs for every control point, edge after edge;
+  edge i owns points offsets[i]:offsets[i + 1] (in points, not numbers)
+
+Usage:
+    python scripts/edge_bundling.py [--viz FILE] [--output FILE] [--beta 0.85]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from bake_layout import COORD_DECIMALS, layout_metadata
+from data_cache import CACHE_DIR as COLUMNAR_CACHE_DIR, DATA_DIR, VIZ_FILE
+from json_stream import StreamDict, iter_json, write_atomic
+from optimize_layout import load_layout_data
+from radial_layout import default_layout_config, radial_layout
+
+OUTPUT_FILE = DATA_DIR / "edge_bundles.json"
+
+BUNDLE_VERSION = 1
+DEFAULT_BETA = 0.85  # Bundling strength
+LOD_SIZES = (250, 1000, 2500, 5000)  # Top-k edge counts per level of detail (the last level is every edge)
+CAUSAL = 0  # data_cache.RELATIONSHIPS index
+
+
+class EdgeBundles(NamedTuple):
+    source: np.ndarray   # hierarchy row of each edge's source, heaviest edge first
+    target: np.ndarray
+    weight: np.ndarray
+    offsets: np.ndarray  # edge i's control points are points[offsets[i]:offsets[i + 1]]
+    points: np.ndarray   # (P, 2) control points
+    lca: np.ndarray      # hierarchy row of each edge's lowest common ancestor
+    skipped: int         # causal edges with an endpoint missing or outside the laid-out hierarchy
+
+
+def ancestor_table(parent: np.ndarray, max_depth: int) -> np.ndarray:
+    """(N, max_depth + 1) table: column k is the k-th ancestor of each row (-1 past the root)."""
+    table = np.full((len(parent), max_depth + 1), -1, dtype=np.int64)
+    table[:, 0] = np.arange(len(parent))
+    for k in range(1, max_depth + 1):
+        previous = table[:, k - 1]
+        table[:, k] = np.where(previous >= 0, parent[np.maximum(previous, 0)], -1)
+    return table
+
+
+def lowest_common_ancestors(source: np.ndarray, target: np.ndarray, depth: np.ndarray,
+                            ancestors: np.ndarray) -> np.ndarray:
+    """LCA row for each (source, target) pair: lift to equal depth, then lift both until they meet."""
+    common = np.minimum(depth[source], depth[target])
+    a = ancestors[source, depth[source] - common]
+    b = ancestors[target, depth[target] - common]
+    # Ancestors of a and b at the same height coincide from the LCA up; find the lowest such height
+    lift = np.zeros(len(source), dtype=np.int64)
+    for k in range(int(common.max(initial=0)), -1, -1):
+        same = ancestors[a, np.minimum(k, common)] == ancestors[b, np.minimum(k, common)]
+        lift = np.where(same & (k <= common), k, lift)
+    return ancestors[a, lift]
+
+
+def bundle_paths(source: np.ndarray, target: np.ndarray, lca: np.ndarray, depth: np.ndarray,
+                 ancestors: np.ndarray):
+    """
+    Hierarchy path of every edge, packed: (offsets, rows).
+
+    Edge i visits rows[offsets[i]:offsets[i + 1]]: the source, its ancestors
+    up to and including the LCA, then the target's ancestors below the LCA
+    in descending order, ending at the target.
+    """
+    up = depth[source] - depth[lca]      # Steps from the source to the LCA
+    down = depth[target] - depth[lca]    # Steps from the target to the LCA
+    lengths = up + down + 1
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    rows = np.empty(offsets[-1], dtype=np.int64)
+    starts, ends = offsets[:-1], offsets[1:] - 1
+    for k in range(ancestors.shape[1]):
+        rising = k <= up
+        rows[starts[rising] + k] = ancestors[source[rising], k]
+        falling = k < down
+        rows[ends[falling] - k] = ancestors[target[falling], k]
+    return offsets, rows
+
+
+def straighten(points: np.ndarray, offsets: np.ndarray, beta: float) -> np.ndarray:
+    """Blend each control polygon with the straight line between its endpoints."""
+    lengths = np.diff(offsets)
+    edge = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.arange(len(points)) - offsets[edge]
+    t = (position / np.maximum(lengths[edge] - 1, 1))[:, None]
+    first, last = points[offsets[:-1]][edge], points[offsets[1:] - 1][edge]
+    return beta * points + (1 - beta) * (first + t * (last - first))
+
+
+def compute_bundles(hierarchy, x: np.ndarray, y: np.ndarray, beta: float = DEFAULT_BETA) -> EdgeBundles:
+    """Bundle every causal edge of hierarchy.columns at positions (x, y) per hierarchy row."""
+    columns = hierarchy.columns
+    causal = np.asarray(columns.edge_relationship) == CAUSAL
+    source = np.asarray(columns.edge_source, dtype=np.int64)[causal]
+    target = np.asarray(columns.edge_target, dtype=np.int64)[causal]
+    weight = np.asarray(columns.edge_weight, dtype=float)[causal]
+    resolved = (source >= 0) & (target >= 0)  # -1: endpoint missing from the node list
+    tree = hierarchy.hierarchy
+    to_row = tree.source_rows(len(columns.node_ids))  # -1 for nodes outside the laid-out tree
+    source, target, weight = to_row[source[resolved]], to_row[target[resolved]], weight[resolved]
+
+    placed = (source >= 0) & (target >= 0)
+    order = np.argsort(-weight[placed], kind='stable')
+    source, target, weight = source[placed][order], target[placed][order], weight[placed][order]
+
+    depth = tree.depth
+    ancestors = ancestor_table(tree.parent, int(depth.max(initial=0)))
+    lca = lowest_common_ancestors(source, target, depth, ancestors)
+    offsets, rows = bundle_paths(source, target, lca, depth, ancestors)
+    points = straighten(np.column_stack([x[rows], y[rows]]), offsets, beta)
+    return EdgeBundles(source, target, weight, offsets, points, lca, int((~resolved).sum() + (~placed).sum()))
+
+
+def lod_levels(num_edges: int, sizes=LOD_SIZES):
+    """Prefix sizes of the weight-ordered edge list, smallest first, ending with every edge."""
+    levels = sorted({min(size, num_edges) for size in sizes} | {num_edges})
+    return [count for count in levels if count > 0]
+
+
+def bundles_payload(bundles: EdgeBundles, hierarchy, config, rings, beta: float) -> StreamDict:
+    """The output document; packed arrays are written one per line."""
+    # Only nodes that are an edge endpoint get an entry; edges index into this list
+    endpoints = np.unique(np.concatenate([bundles.source, bundles.target]))
+    local = np.full(len(hierarchy.ids), -1, dtype=np.int64)
+    local[endpoints] = np.arange(len(endpoints))
+    offsets = bundles.offsets
+    return StreamDict([
+        ("metadata", {
+            "version": BUNDLE_VERSION,
+            "beta": beta,
+            "edges": len(bundles.weight),
+            "points": len(bundles.points),
+            "skipped_edges": bundles.skipped,
+            "data_hash": hierarchy.data_hash,
+            "layout": layout_metadata(config, rings),
+        }),
+        ("lod", [
+            {"edges": count, "points": int(offsets[count]),
+             "min_weight": float(bundles.weight[count - 1])}
+            for count in lod_levels(len(bundles.weight))
+        ]),
+        ("nodes", [hierarchy.ids[row] for row in endpoints.tolist()]),
+        ("source", local[bundles.source].tolist()),
+        ("target", local[bundles.target].tolist()),
+        ("weight", bundles.weight.tolist()),
+        ("offsets", offsets.tolist()),
+        ("points", np.round(bundles.points, COORD_DECIMALS).ravel().tolist()),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute hierarchical edge bundles for causal edges")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON')
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE, help='Bundle file to write')
+    parser.add_argument('--beta', type=float, default=DEFAULT_BETA, help='Bundling strength, 0 (straight) to 1')
+    args = parser.parse_args()
+    if not 0 <= args.beta <= 1:
+        parser.error("--beta must be between 0 and 1")
+
+    print("Loading data...")
+    hierarchy = load_layout_data(args.viz, COLUMNAR_CACHE_DIR)
+    config = default_layout_config()
+    layout = radial_layout(hierarchy, config)
+
+    print("Bundling causal edges...")
+    bundles = compute_bundles(hierarchy, layout.x, layout.y, args.beta)
+    mean_points = len(bundles.points) / max(len(bundles.weight), 1)
+    print(f"  {len(bundles.weight)} edges, {len(bundles.points)} control points "
+          f"({mean_points:.1f} per edge), {bundles.skipped} skipped")
+
+    document = bundles_payload(bundles, hierarchy, config, layout.rings, args.beta)
+    written = write_atomic(args.output, iter_json(document, indent=None))
+    print(f"{'Updated' if written else 'Unchanged'}: {args.output}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Split v2_1_visualization_final.json into per-subtree shards for lazy loading.
+
+The view starts with only the root expanded, so the browser only needs the
+top of the hierarchy up front. This script writes:
+1. manifest.json - root, outcomes and coarse domains with child counts,
+   importance and the shard that holds each coarse domain's subtree
+2. shard_<coarse id>.json - every node under one coarse domain plus the
+   causal edges touching those nodes
+
+Causal edges that cross two shards appear in both, so either side can draw
+them once it is loaded; clients dedupe on (source, target).
+
+Subtrees come from the compiled Hierarchy (a preorder slice per shard
+root), and every file goes through write_atomic.
+
+Usage:
+    python scripts/export_shards.py [--output-dir DIR]
+"""
+
+import argparse
+import json
+import re
+from pathlib import Path
+
+from data_cache import DATA_DIR, VIZ_FILE, file_hash
+from hierarchy import hierarchy_from_viz
+from json_stream import write_atomic
+
+OUTPUT_DIR = DATA_DIR / "shards"
+
+SHARD_LAYER = 2  # Coarse domains: one shard per subtree rooted here
+MANIFEST_VERSION = 1
+MANIFEST_FIELDS = ('id', 'label', 'layer', 'node_type', 'domain', 'importance', 'parent')
+
+
+def shard_filename(node_id):
+    """File-system safe shard name for a subtree root id."""
+    return f"shard_{re.sub(r'[^A-Za-z0-9_.-]', '_', node_id)}.json"
+
+
+def collect_subtrees(viz_data, tree):
+    """{shard root id: [node ids in its subtree, depth-first, root first]} for every SHARD_LAYER node."""
+    subtrees = {}
+    for node in viz_data['nodes']:
+        node_id = str(node['id'])
+        if node['layer'] != SHARD_LAYER or node_id not in tree.index:
+            continue
+        row = tree.index[node_id]
+        subtrees[node_id] = [tree.ids[r] for r in tree.preorder[tree.entry[row]:tree.exit[row]].tolist()]
+    return subtrees
+
+
+def build_shards(viz_data):
+    """Return (manifest, {filename: shard payload})."""
+    nodes_by_id = {str(n['id']): n for n in viz_data['nodes']}
+    tree = hierarchy_from_viz(viz_data)
+    children_by_parent = tree.children_by_parent()
+
+    subtrees = collect_subtrees(viz_data, tree)
+    shard_of = {
+        member: root_id for root_id, members in subtrees.items() for member in members
+    }
+
+    causal = [e for e in viz_data['edges'] if e.get('relationship') == 'causal']
+    edges_by_shard = {root_id: [] for root_id in subtrees}
+    for e in causal:
+        touched = {shard_of.get(str(e['source'])), shard_of.get(str(e['target']))} - {None}
+        for root_id in touched:
+            edges_by_shard[root_id].append(e)
+
+    shards = {}
+    shard_entries = {}
+    for root_id, members in subtrees.items():
+        filename = shard_filename(root_id)
+        shards[filename] = {
+            "root": root_id,
+            "nodes": [nodes_by_id[m] for m in members],
+            "edges": edges_by_shard[root_id],
+        }
+        shard_entries[root_id] = {
+            "file": filename,
+            "node_count": len(members),
+            "edge_count": len(edges_by_shard[root_id]),
+        }
+
+    # Everything above the shard layer goes straight into the manifest
+    manifest_nodes = []
+    for node_id, node in nodes_by_id.items():
+        if node['layer'] > SHARD_LAYER:
+            continue
+        entry = {field: node.get(field) for field in MANIFEST_FIELDS}
+        entry['child_count'] = len(children_by_parent.get(node_id, []))
+        if node_id in subtrees:
+            entry['descendant_count'] = len(subtrees[node_id]) - 1
+            entry['shard'] = shard_entries[node_id]['file']
+        manifest_nodes.append(entry)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "shard_layer": SHARD_LAYER,
+        "total_nodes": len(nodes_by_id),
+        "total_causal_edges": len(causal),
+        "nodes": manifest_nodes,
+        "shards": shard_entries,
+        "metadata": viz_data.get('metadata', {}),
+    }
+    return manifest, shards
+
+
+def write_shards(manifest, shards, output_dir=OUTPUT_DIR):
+    """
+    Write the manifest and shard files into output_dir. Returns their total bytes.
+
+    Shard files left over from an earlier export are removed; nothing else in
+    the directory is touched. A non-empty directory without a manifest.json is
+    refused rather than written into.
+    """
+    output_dir = Path(output_dir)
+    if output_dir.exists() and any(output_dir.iterdir()) and not (output_dir / "manifest.json").exists():
+        raise ValueError(f"{output_dir} is not empty and holds no shard manifest")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for stale in output_dir.glob("shard_*.json"):
+        if stale.name not in shards:
+            stale.unlink()
+
+    total = 0
+    for filename, payload in shards.items():
+        data = json.dumps(payload, separators=(',', ':')).encode()
+        write_atomic(output_dir / filename, [data], binary=True)
+        manifest['shards'][payload['root']]['bytes'] = len(data)
+        total += len(data)
+
+    data = json.dumps(manifest, indent=2).encode()
+    write_atomic(output_dir / "manifest.json", [data], binary=True)
+    return total + len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export per-subtree shards of the visualization data")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON')
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR, help='Where to write the shards')
+    args = parser.parse_args()
+
+    print("Loading data...")
+    with open(args.viz) as f:
+        viz_data = json.load(f)
+
+    manifest, shards = build_shards(viz_data)
+    manifest['source_hash'] = file_hash(args.viz)
+    total = write_shards(manifest, shards, args.output_dir)
+
+    manifest_size = (args.output_dir / "manifest.json").stat().st_size
+    largest = max(entry['bytes'] for entry in manifest['shards'].values())
+    print(f"  Manifest: {len(manifest['nodes'])} nodes, {manifest_size / 1024:.1f} KB")
+    print(f"  Shards: {len(shards)}, largest {largest / 1024:.1f} KB, total {total / 1024:.1f} KB")
+    print(f"\nOutput directory: {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
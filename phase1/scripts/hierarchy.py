@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Compiled node hierarchy shared by the importance and layout scripts.
+
+The parent links of the visualization nodes are flattened once into a
+struct-of-arrays table in breadth-first order: node ids are interned to row
+numbers, and every row has its layer, parent row and a contiguous range of
+child rows. Each depth level is a contiguous slice (level_offsets), so
+bottom-up and top-down passes work one level at a time.
+
+Rows also carry Euler-tour entry / exit positions (preorder index and one
+past the last descendant), so subtree questions need no traversal:
+- Y is under X: entry[X] <= entry[Y] < exit[X]                      O(1)
+- subtree size of X: exit[X] - entry[X]                             O(1)
+- nodes of layer L under X: two binary searches over the sorted
+  entries of layer L                                                O(log n)
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class Hierarchy:
+    """
+    Nodes reachable from the roots (nodes without a known parent), breadth-first.
+
+    Children of row i are rows child_start[i]:child_start[i] + child_count[i],
+    in source order. Nodes caught in a parent cycle are unreachable and left out.
+    """
+    ids: List[str]
+    index: Dict[str, int]     # id -> row
+    source_row: np.ndarray    # row -> position in the source node list
+    layer: np.ndarray
+    parent: np.ndarray        # row of the parent, -1 for roots
+    child_start: np.ndarray
+    child_count: np.ndarray
+    child_rank: np.ndarray    # position among siblings
+    level_offsets: List[int]  # level d is rows level_offsets[d]:level_offsets[d + 1]
+    entry: np.ndarray         # preorder position
+    exit: np.ndarray          # entry + subtree size
+    preorder: np.ndarray      # rows in depth-first order (preorder[entry[i]] == i)
+    _layer_entries: Dict[int, np.ndarray] = field(default_factory=dict, repr=False)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self.ids)
+
+    @property
+    def depth(self) -> np.ndarray:
+        return np.repeat(np.arange(len(self.level_offsets) - 1), np.diff(self.level_offsets))
+
+    @property
+    def subtree_sizes(self) -> np.ndarray:
+        return self.exit - self.entry
+
+    def source_rows(self, num_source: int) -> np.ndarray:
+        """Source list position -> row, -1 for nodes outside this hierarchy."""
+        to_row = np.full(num_source, -1, dtype=np.int64)
+        to_row[self.source_row] = np.arange(self.num_nodes)
+        return to_row
+
+    def is_descendant(self, rows, ancestor_rows):
+        """True where rows lie in the subtree of ancestor_rows (a node is in its own subtree)."""
+        return (self.entry[ancestor_rows] <= self.entry[rows]) & (self.entry[rows] < self.exit[ancestor_rows])
+
+    def contains(self, ancestor_id: str, node_id: str) -> bool:
+        """Whether node_id is ancestor_id or one of its descendants."""
+        return bool(self.is_descendant(self.index[node_id], self.index[ancestor_id]))
+
+    def subtree_size(self, node_id: str) -> int:
+        row = self.index[node_id]
+        return int(self.exit[row] - self.entry[row])
+
+    def layer_count(self, node_id: str, layer: int) -> int:
+        """Nodes of one layer in node_id's subtree, by binary search."""
+        entries = self._layer_entries.get(layer)
+        if entries is None:
+            entries = self._layer_entries[layer] = np.sort(self.entry[self.layer == layer])
+        row = self.index[node_id]
+        return int(np.searchsorted(entries, self.exit[row]) - np.searchsorted(entries, self.entry[row]))
+
+    def subtree_layer_counts(self, num_layers: Optional[int] = None) -> np.ndarray:
+        """
+        (N, num_layers) nodes per layer in every subtree, from prefix sums along the preorder.
+
+        Layers at or beyond num_layers are not counted.
+        """
+        if num_layers is None:
+            num_layers = int(self.layer.max(initial=-1)) + 1
+        ordered = self.layer[self.preorder]
+        prefix = np.zeros((self.num_nodes + 1, num_layers), dtype=np.int64)
+        inside = ordered < num_layers
+        prefix[np.flatnonzero(inside) + 1, ordered[inside]] = 1
+        np.cumsum(prefix, axis=0, out=prefix)
+        return prefix[self.exit] - prefix[self.entry]
+
+    def children(self, node_id: str) -> List[str]:
+        row = self.index[node_id]
+        start = int(self.child_start[row])
+        return self.ids[start:start + int(self.child_count[row])]
+
+    def children_by_parent(self) -> Dict[str, List[str]]:
+        """{parent_id: [child_id, ...]} for every node with children, children in source order."""
+        return {
+            self.ids[row]: self.ids[start:start + count]
+            for row, (start, count) in enumerate(zip(self.child_start.tolist(), self.child_count.tolist()))
+            if count
+        }
+
+    def ancestors(self, node_id: str) -> List[int]:
+        """Rows from the parent of node_id up to its root."""
+        rows = []
+        row = int(self.parent[self.index[node_id]])
+        while row >= 0:
+            rows.append(row)
+            row = int(self.parent[row])
+        return rows
+
+    def subtree(self, node_id: str) -> 'Hierarchy':
+        """The hierarchy under node_id alone, with source_row still pointing at the source list."""
+        root = self.index[node_id]
+        keep = np.flatnonzero(self.is_descendant(np.arange(self.num_nodes), root))
+        remap = np.full(self.num_nodes, -1, dtype=np.int64)
+        remap[keep] = np.arange(len(keep))
+        parent = np.where(keep == root, -1, remap[self.parent[keep]])
+        sub = build_hierarchy([self.ids[row] for row in keep.tolist()], parent, self.layer[keep])
+        sub.source_row = self.source_row[keep][sub.source_row]
+        return sub
+
+
+def build_hierarchy(ids: List[str], parent: np.ndarray, layer: np.ndarray) -> Hierarchy:
+    """
+    Compile parallel node arrays into a Hierarchy.
+
+    parent holds each node's position in the same arrays, or -1; roots are
+    the nodes without one, taken in source order.
+    """
+    parent = np.asarray(parent, dtype=np.int64)
+    layer = np.asarray(layer, dtype=np.int64)
+    n = len(ids)
+
+    # Children of each source position, in source order
+    has_parent = parent >= 0
+    child_sources = np.flatnonzero(has_parent)[np.argsort(parent[has_parent], kind='stable')]
+    child_ptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(parent[has_parent], minlength=n), out=child_ptr[1:])
+
+    # Breadth-first levels
+    level = np.flatnonzero(~has_parent)
+    levels = []
+    level_parents = [np.full(len(level), -1, dtype=np.int64)]
+    offset = 0
+    while len(level):
+        levels.append(level)
+        counts = child_ptr[level + 1] - child_ptr[level]
+        total = int(counts.sum())
+        ends = np.cumsum(counts)
+        positions = np.arange(total) + np.repeat(child_ptr[level] - (ends - counts), counts)
+        level_parents.append(np.repeat(np.arange(offset, offset + len(level)), counts))
+        offset += len(level)
+        level = child_sources[positions]
+    source_row = np.concatenate(levels) if levels else np.zeros(0, dtype=np.int64)
+    parent_row = np.concatenate(level_parents[:len(levels)]) if levels else np.zeros(0, dtype=np.int64)
+    level_offsets = np.concatenate([[0], np.cumsum([len(rows) for rows in levels])]).astype(int).tolist()
+
+    rows = len(source_row)
+    child_count = np.bincount(parent_row[parent_row >= 0], minlength=rows)
+    # Children are contiguous and follow their parents' order, one level down
+    child_start = np.empty(rows, dtype=np.int64)
+    for depth in range(len(levels)):
+        lo, hi = level_offsets[depth], level_offsets[depth + 1]
+        counts = child_count[lo:hi]
+        child_start[lo:hi] = hi + np.cumsum(counts) - counts
+    child_rank = np.arange(rows) - np.where(parent_row >= 0, child_start[np.maximum(parent_row, 0)], np.arange(rows))
+
+    # Subtree sizes bottom-up, then preorder entries top-down
+    size = np.ones(rows, dtype=np.int64)
+    for depth in range(len(levels) - 1, 0, -1):
+        lo, hi = level_offsets[depth], level_offsets[depth + 1]
+        np.add.at(size, parent_row[lo:hi], size[lo:hi])
+    entry = np.empty(rows, dtype=np.int64)
+    if rows:
+        roots = slice(0, level_offsets[1])
+        entry[roots] = np.cumsum(size[roots]) - size[roots]
+    for depth in range(1, len(levels)):
+        lo, hi = level_offsets[depth], level_offsets[depth + 1]
+        before = np.cumsum(size[lo:hi]) - size[lo:hi]       # Sizes of earlier rows in this level
+        first = child_start[parent_row[lo:hi]] - lo         # The row's first sibling
+        entry[lo:hi] = entry[parent_row[lo:hi]] + 1 + before - before[first]
+    preorder = np.empty(rows, dtype=np.int64)
+    preorder[entry] = np.arange(rows)
+
+    row_ids = [ids[i] for i in source_row.tolist()]
+    return Hierarchy(
+        ids=row_ids,
+        index={node_id: i for i, node_id in enumerate(row_ids)},
+        source_row=source_row,
+        layer=layer[source_row],
+        parent=parent_row,
+        child_start=child_start,
+        child_count=child_count,
+        child_rank=child_rank,
+        level_offsets=level_offsets,
+        entry=entry,
+        exit=entry + size,
+        preorder=preorder,
+    )
+
+
+def hierarchy_from_viz(viz_data) -> Hierarchy:
+    """Hierarchy of parsed visualization JSON (nodes' 'parent' fields)."""
+    nodes = viz_data['nodes']
+    ids = [str(n['id']) for n in nodes]
+    index = {node_id: i for i, node_id in enumerate(ids)}
+    parent = np.array([
+        index.get(str(n['parent']), -1) if n.get('parent') is not None else -1 for n in nodes
+    ], dtype=np.int64)
+    return build_hierarchy(ids, parent, np.array([n['layer'] for n in nodes], dtype=np.int64))
+
+
+def hierarchy_from_columns(columns) -> Hierarchy:
+    """Same as hierarchy_from_viz, from data_cache.VizColumns (no JSON parse)."""
+    return build_hierarchy(columns.node_ids.tolist(), np.asarray(columns.parent), np.asarray(columns.layer))
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Stage-level timing, memory and profiling for the pipeline scripts.
+
+A StageRecorder wraps each stage of a run in a context manager and records
+wall time, CPU time and (when enabled) the tracemalloc peak reached inside the
+stage. The run can be written as a JSON trace, for comparing runs, and in
+Chrome trace-event format, for chrome://tracing or Perfetto. One stage can be
+run under cProfile, with the stats dumped for snakeviz / pstats.
+
+Usage:
+    recorder = StageRecorder(trace_memory=True, profile_stage='generate_outputs')
+    with recorder.stage('load_data'):
+        ...
+    recorder.print_summary()
+    recorder.write_json(path)
+"""
+
+import cProfile
+import io
+import json
+import os
+import platform
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+PROFILE_DIR = BASE_DIR / ".cache" / "profiles"
+
+TRACE_VERSION = 1
+PROFILE_TOP = 20  # Functions printed from a profiled stage
+
+
+class StageRecorder:
+    """Collects per-stage wall/CPU time and peak memory for one run."""
+
+    def __init__(self, trace_memory=False, profile_stage=None, profile_output=None):
+        self.trace_memory = trace_memory
+        self.profile_stage = profile_stage
+        self.profile_output = Path(profile_output) if profile_output else None
+        self.stages = []
+        self.started = datetime.now().isoformat()
+        self._origin = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Record one stage. Stages should not nest: each one resets the tracemalloc peak."""
+        profiler = cProfile.Profile() if name == self.profile_stage else None
+        if self.trace_memory:
+            current_before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+            entry = {
+                'name': name,
+                'start': wall_start - self._origin,
+                'wall_seconds': time.perf_counter() - wall_start,
+                'cpu_seconds': time.process_time() - cpu_start,
+            }
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                entry['peak_mb'] = peak / 1e6
+                entry['retained_mb'] = (current - current_before) / 1e6
+            self.stages.append(entry)
+            if profiler:
+                self._dump_profile(name, profiler)
+
+    def _dump_profile(self, name, profiler):
+        path = self.profile_output or PROFILE_DIR / f"{name}.prof"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_TOP)
+        print(f"\nProfile of {name} (top {PROFILE_TOP} by cumulative time), saved to {path}:")
+        print(out.getvalue())
+
+    def to_dict(self):
+        """JSON-serializable trace of the run."""
+        return {
+            'version': TRACE_VERSION,
+            'started': self.started,
+            'argv': sys.argv,
+            'python': platform.python_version(),
+            'memory_traced': self.trace_memory,
+            'total_wall_seconds': time.perf_counter() - self._origin,
+            'stages': self.stages,
+        }
+
+    def to_chrome_trace(self):
+        """Complete ('X') events in the Chrome trace-event format, times in microseconds."""
+        pid = os.getpid()
+        events = []
+        for entry in self.stages:
+            args = {k: v for k, v in entry.items() if k not in ('name', 'start', 'wall_seconds')}
+            events.append({
+                'name': entry['name'],
+                'cat': 'stage',
+                'ph': 'X',
+                'ts': entry['start'] * 1e6,
+                'dur': entry['wall_seconds'] * 1e6,
+                'pid': pid,
+                'tid': 0,
+                'args': args,
+            })
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'started': self.started}}
+
+    def write_json(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_chrome_trace(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+
+    def print_summary(self):
+        print("\nStage timings:")
+        for entry in sorted(self.stages, key=lambda e: e['start']):
+            line = f"  {entry['name']:<28} wall={entry['wall_seconds']:8.3f}s  cpu={entry['cpu_seconds']:8.3f}s"
+            if 'peak_mb' in entry:
+                line += f"  peak={entry['peak_mb']:8.1f} MB"
+            print(line)
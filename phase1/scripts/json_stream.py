@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON output with atomic, change-only writes.
+
+iter_json encodes a document in chunks, with StreamList / StreamDict marking
+the large containers that should be consumed lazily; write_atomic streams
+those chunks to a temp file and renames it over the target only when the
+contents changed. Used for the files the frontend loads, which are far
+larger than anything worth holding as one string.
+"""
+
+import filecmp
+import itertools
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+STREAM_BATCH = 512  # Nodes / entries encoded per json.dumps call when streaming outputs
+
+
+class StreamList:
+    """List whose elements are encoded and written one at a time by iter_json."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+class StreamDict(StreamList):
+    """Dict given as (key, value) pairs, encoded one entry at a time by iter_json."""
+
+
+def iter_json(value, indent=2, level=0):
+    """
+    Yield the JSON text of value in chunks.
+
+    Matches json.dumps(value, indent=indent) byte for byte, except that
+    StreamList / StreamDict contents are consumed lazily, STREAM_BATCH
+    entries per json.dumps call, so large outputs are never held as one
+    string. With indent=None the output is compact, but top-level entries
+    still go on their own lines.
+    """
+    if not isinstance(value, StreamList):
+        if indent is None:
+            yield json.dumps(value, separators=(',', ':'))
+            return
+        text = json.dumps(value, indent=indent)
+        yield text.replace('\n', '\n' + ' ' * (indent * level)) if level else text
+        return
+
+    is_dict = isinstance(value, StreamDict)
+    brackets = '{}' if is_dict else '[]'
+    if indent is None:
+        newline = close = '\n' if level == 0 else ''
+        separators = (',', ':')
+    else:
+        newline, close = '\n' + ' ' * (indent * (level + 1)), '\n' + ' ' * (indent * level)
+        separators = (',', ': ')
+
+    def one_at_a_time(item):
+        # Nested streams recurse; compact top-level entries each need their own line
+        return isinstance(item[1] if is_dict else item, StreamList) or (indent is None and level == 0)
+
+    empty = True
+    for single, group in itertools.groupby(value, key=one_at_a_time):
+        if single:
+            for item in group:
+                yield (brackets[0] if empty else ',') + newline
+                empty = False
+                if is_dict:
+                    key, item = item
+                    yield json.dumps(key) + separators[1]
+                yield from iter_json(item, indent, level + 1)
+            continue
+        while True:
+            batch = list(itertools.islice(group, STREAM_BATCH))
+            if not batch:
+                break
+            text = json.dumps(dict(batch) if is_dict else batch, indent=indent, separators=separators)
+            # Strip the batch's own brackets and shift its entries to this depth
+            if indent is None:
+                body = text[1:-1]
+            else:
+                body = text[1:-2].replace('\n', '\n' + ' ' * (indent * level)) if level else text[1:-2]
+            yield (brackets[0] if empty else ',') + body
+            empty = False
+    yield brackets if empty else close + brackets[1]
+
+
+def same_contents(path_a, path_b, volatile_line=None):
+    """
+    True if two text files are equal.
+
+    volatile_line=(index, prefix) names a line (e.g. a generated date) that
+    may differ as long as it starts with prefix in both files.
+    """
+    if volatile_line is None:
+        return filecmp.cmp(path_a, path_b, shallow=False)
+    index, prefix = volatile_line
+    with open(path_a) as a, open(path_b) as b:
+        for i, (line_a, line_b) in enumerate(itertools.zip_longest(a, b)):
+            if i == index and line_a is not None and line_b is not None:
+                if not (line_a.startswith(prefix) and line_b.startswith(prefix)):
+                    return False
+            elif line_a != line_b:
+                return False
+    return True
+
+
+def write_atomic(path, chunks, volatile_line=None, binary=False):
+    """
+    Stream chunks to a temp file beside path and rename it into place.
+
+    The existing file is left alone (and the temp file dropped) when the
+    contents match, see same_contents. With binary=True the chunks are bytes
+    (volatile_line does not apply). Returns True if written.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, 'wb' if binary else 'w') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        if path.exists():
+            if same_contents(path, tmp, volatile_line):
+                os.unlink(tmp)
+                return False
+            shutil.copymode(path, tmp)
+        else:
+            os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Precompute the zoom level at which each node label can be shown without overlap.
+
+Labels are placed the way App.tsx draws them (horizontal under the node for
+rings 0-1, radial beyond the node elsewhere, font size from the node size)
+at the default radial layout. For each discrete zoom level, from farthest out
+to closest in, labels that are readable at that zoom are placed greedily by
+importance; a label is accepted if its rotated box clears every label already
+accepted. Accepted labels stay accepted at every closer zoom, so each node
+gets one number: the smallest zoom scale at which its label is drawn.
+
+Candidate overlaps come from a uniform grid over the label boxes, so a level
+costs O(labels) rather than O(labels^2).
+
+Usage:
+    python scripts/label_culling.py [--viz FILE] [--output FILE]
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from bake_layout import update_viz_nodes
+from data_cache import CACHE_DIR as COLUMNAR_CACHE_DIR, VIZ_FILE
+from json_stream import write_atomic
+from optimize_layout import SIZE_RANGES, load_layout_data
+from radial_layout import DEFAULT_SIZE_MULTIPLIERS, default_layout_config, radial_layout
+
+# Zoom scales to precompute, within the d3.zoom scaleExtent([0.05, 4]) in App.tsx
+ZOOM_LEVELS = (0.05, 0.1, 0.2, 0.35, 0.5, 0.75, 1, 1.5, 2, 3, 4)
+MIN_READABLE_FONT_SIZE = 6  # Screen px, as in App.tsx
+LABEL_PADDING_PX = 2  # Screen px kept clear between labels
+CHAR_WIDTH = 0.6  # Average glyph advance in em
+ASCENT = 0.8  # Share of the font size above the baseline
+
+
+class GridIndex:
+    """Uniform grid of axis-aligned boxes: a cell lists every box that touches it."""
+
+    def __init__(self, cell_size: float):
+        self.cell_size = cell_size
+        self.cells: Dict[tuple, List[int]] = {}
+
+    def _cells(self, box):
+        x0, y0, x1, y1 = (math.floor(v / self.cell_size) for v in box)
+        return ((cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1))
+
+    def insert(self, item: int, box):
+        for cell in self._cells(box):
+            self.cells.setdefault(cell, []).append(item)
+
+    def query(self, box):
+        """Items whose cells overlap box (a superset of the boxes that overlap it)."""
+        found = set()
+        for cell in self._cells(box):
+            found.update(self.cells.get(cell, ()))
+        return found
+
+
+def label_boxes(x, y, ring, size, labels):
+    """
+    Rotated label rectangles in layout coordinates, as App.tsx positions them.
+
+    Returns (center (N, 2), axis angle (N,), half width (N,), half height (N,),
+    font size (N,)). Each rectangle's long axis runs along the text.
+    """
+    base = np.clip(size * 0.5, 5, 10)
+    font = np.where(ring == 5, base * 0.35, np.where(ring == 4, base * 0.7, base))
+    width = np.array([len(label) for label in labels]) * font * CHAR_WIDTH
+    half_w, half_h = width / 2, font / 2
+
+    # Rings 0-1: centered under the node, horizontal
+    inner = ring <= 1
+    anchor_y = y + size + font * 0.5 + 4
+    center_inner = np.column_stack([x, anchor_y - font * (ASCENT - 0.5)])
+
+    # Outer rings: starts just past the node and runs radially outward
+    angle = np.arctan2(y, x)
+    offset = size + font * 0.3 + 2
+    reach = offset + width / 2
+    center_outer = np.column_stack([x + np.cos(angle) * reach, y + np.sin(angle) * reach])
+
+    center = np.where(inner[:, None], center_inner, center_outer)
+    axis = np.where(inner, 0.0, angle)
+    return center, axis, half_w, half_h, font
+
+
+def boxes_overlap(a, b, pad):
+    """Separating-axis test for two rotated rectangles (cx, cy, cos, sin, hw, hh), each grown by pad."""
+    dx, dy = b[0] - a[0], b[1] - a[1]
+    for cos_t, sin_t in ((a[2], a[3]), (b[2], b[3])):
+        for ux, uy in ((cos_t, sin_t), (-sin_t, cos_t)):
+            reach_a = (a[4] + pad) * abs(a[2] * ux + a[3] * uy) + (a[5] + pad) * abs(-a[3] * ux + a[2] * uy)
+            reach_b = (b[4] + pad) * abs(b[2] * ux + b[3] * uy) + (b[5] + pad) * abs(-b[3] * ux + b[2] * uy)
+            if abs(dx * ux + dy * uy) > reach_a + reach_b:
+                return False
+    return True
+
+
+def min_visible_zoom(center, axis, half_w, half_h, font, importance, ring,
+                     zoom_levels=ZOOM_LEVELS) -> np.ndarray:
+    """
+    Smallest zoom level at which each label is placed (nan if never).
+
+    Labels are tried in order of importance (then inner ring first); one that
+    is accepted at some level is kept at every higher level.
+    """
+    n = len(center)
+    rects = [
+        (cx, cy, math.cos(t), math.sin(t), hw, hh)
+        for (cx, cy), t, hw, hh in zip(center.tolist(), axis.tolist(), half_w.tolist(), half_h.tolist())
+    ]
+    # Axis-aligned bounds of each rotated rectangle, for the grid
+    cos_abs, sin_abs = np.abs(np.cos(axis)), np.abs(np.sin(axis))
+    extent_x = half_w * cos_abs + half_h * sin_abs
+    extent_y = half_w * sin_abs + half_h * cos_abs
+    order = np.lexsort((np.arange(n), ring, -importance))
+    result = np.full(n, np.nan)
+    accepted: List[int] = []
+    cell_size = max(float(np.median(np.maximum(extent_x, extent_y))) * 4, 1e-6) if n else 1.0
+
+    for zoom in sorted(zoom_levels):
+        pad = LABEL_PADDING_PX / zoom / 2  # World units on each side
+        bounds = np.column_stack([center[:, 0] - extent_x - pad, center[:, 1] - extent_y - pad,
+                                  center[:, 0] + extent_x + pad, center[:, 1] + extent_y + pad]).tolist()
+        grid = GridIndex(cell_size)
+        for i in accepted:
+            grid.insert(i, bounds[i])
+
+        readable = font * zoom >= MIN_READABLE_FONT_SIZE
+        for i in order[readable[order] & np.isnan(result[order])].tolist():
+            if any(boxes_overlap(rects[i], rects[j], pad) for j in grid.query(bounds[i])):
+                continue
+            grid.insert(i, bounds[i])
+            accepted.append(i)
+            result[i] = zoom
+    return result
+
+
+def compute_label_zoom(viz_file=VIZ_FILE, cache_dir=COLUMNAR_CACHE_DIR,
+                       zoom_levels=ZOOM_LEVELS) -> Dict[str, Optional[float]]:
+    """{node id: min visible zoom or None} at App.tsx's default layout and sizes."""
+    hierarchy = load_layout_data(viz_file, cache_dir)
+    layout = radial_layout(hierarchy, default_layout_config())
+
+    ring = hierarchy.layer
+    multiplier = np.array(DEFAULT_SIZE_MULTIPLIERS)[ring]
+    min_size = np.array([lo for lo, _hi in SIZE_RANGES])[ring] * multiplier
+    max_size = np.array([hi for _lo, hi in SIZE_RANGES])[ring] * multiplier
+    size = min_size + (max_size - min_size) * np.sqrt(hierarchy.importance)
+
+    with open(viz_file) as f:
+        labels_by_id = {str(n['id']): str(n.get('label') or n['id']) for n in json.load(f)['nodes']}
+    labels = [labels_by_id[node_id] for node_id in hierarchy.ids]
+
+    zoom = min_visible_zoom(*label_boxes(layout.x, layout.y, ring, size, labels),
+                            hierarchy.importance, ring, zoom_levels)
+    return {node_id: (None if math.isnan(z) else z) for node_id, z in zip(hierarchy.ids, zoom.tolist())}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute per-node minimum label zoom")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON')
+    parser.add_argument('--output', type=Path,
+                        help='Write {id: zoom} to this file instead of adding label_zoom to the viz file')
+    args = parser.parse_args()
+
+    print("Computing label visibility...")
+    label_zoom = compute_label_zoom(args.viz)
+    for zoom in ZOOM_LEVELS:
+        shown = sum(1 for z in label_zoom.values() if z is not None and z <= zoom)
+        print(f"  zoom {zoom:>5}: {shown} of {len(label_zoom)} labels")
+
+    metadata = {
+        "zoom_levels": list(ZOOM_LEVELS),
+        "min_readable_font_size": MIN_READABLE_FONT_SIZE,
+        "padding_px": LABEL_PADDING_PX,
+    }
+    if args.output:
+        written = write_atomic(args.output, [json.dumps({**metadata, "label_zoom": label_zoom}, separators=(',', ':'))])
+        print(f"\n{'Wrote' if written else 'Unchanged'}: {args.output}")
+    else:
+        written = update_viz_nodes(args.viz, {k: {'label_zoom': v} for k, v in label_zoom.items()},
+                                   'labels', metadata)
+        print(f"\n{'Updated' if written else 'Unchanged'}: {args.viz}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Precompute aggregated causal edges for collapsed subtrees, one edge list per level.
+
+At level L every node at layer L or deeper stands in for its layer-L
+ancestor; shallower nodes stand for themselves. With M the membership
+matrix (M[i, g] = 1 when node i belongs to group g) and A the weighted causal
+adjacency, the level's adjacency is Mᵀ·A·M: each causal edge is moved onto
+its endpoints' groups and parallel edges are summed. That product is done
+as a COO aggregation (group each edge's endpoints, then sum duplicates by
+sorting the (group, group) keys), O(E log E) per level with no dense
+matrices. Edges that fall inside one group are not drawn; each group
+instead records how many it absorbed.
+
+Each level is written as packed arrays, heaviest edge first:
+- nodes: group ids; source / target index into nodes
+- weight: summed causal weight; count: causal edges merged into the edge
+- internal: causal edges inside each group
+
+Usage:
+    python scripts/meta_graph.py [--viz FILE] [--output FILE]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import List, NamedTuple
+
+import numpy as np
+
+from data_cache import CACHE_DIR as COLUMNAR_CACHE_DIR, DATA_DIR, VIZ_FILE, load_viz_columns
+from hierarchy import Hierarchy, hierarchy_from_columns
+from json_stream import StreamDict, iter_json, write_atomic
+
+OUTPUT_FILE = DATA_DIR / "meta_graph.json"
+
+META_GRAPH_VERSION = 1
+LEVELS = (1, 2, 3, 4)
+CAUSAL = 0  # data_cache.RELATIONSHIPS index
+WEIGHT_DECIMALS = 6
+
+
+class MetaEdges(NamedTuple):
+    level: int
+    groups: np.ndarray    # hierarchy rows of the groups with at least one edge (inside or out)
+    source: np.ndarray    # index into groups, heaviest edge first
+    target: np.ndarray
+    weight: np.ndarray    # summed causal weight
+    count: np.ndarray     # causal edges merged
+    internal: np.ndarray  # causal edges inside each group
+
+
+def level_groups(hierarchy: Hierarchy, level: int) -> np.ndarray:
+    """Group of every hierarchy row at `level`: its ancestor on that layer, or itself if shallower."""
+    group = np.arange(hierarchy.num_nodes)
+    while True:
+        lift = (hierarchy.layer[group] > level) & (hierarchy.parent[group] >= 0)
+        if not lift.any():
+            return group
+        group = np.where(lift, hierarchy.parent[group], group)
+
+
+def aggregate_edges(group: np.ndarray, source: np.ndarray, target: np.ndarray, weight: np.ndarray, level: int):
+    """Mᵀ·A·M for edge arrays over hierarchy rows, as MetaEdges."""
+    a, b = group[source], group[target]
+    inside = a == b
+    n = len(group)
+    keys, inverse = np.unique(a[~inside] * n + b[~inside], return_inverse=True)
+    summed = np.bincount(inverse, weights=weight[~inside], minlength=len(keys))
+    counts = np.bincount(inverse, minlength=len(keys))
+    order = np.lexsort((keys, -summed))
+    keys, summed, counts = keys[order], summed[order], counts[order]
+
+    groups, local = np.unique(np.concatenate([keys // n, keys % n, a[inside]]), return_inverse=True)
+    internal = np.bincount(local[2 * len(keys):], minlength=len(groups))
+    return MetaEdges(level, groups, local[:len(keys)], local[len(keys):2 * len(keys)], summed, counts, internal)
+
+
+def build_meta_graph(columns, hierarchy: Hierarchy, levels=LEVELS):
+    """MetaEdges per level for the causal edges of data_cache.VizColumns. Returns (levels, skipped edges)."""
+    to_row = hierarchy.source_rows(len(columns.node_ids))  # -1 for nodes the hierarchy left out
+    causal = np.asarray(columns.edge_relationship) == CAUSAL
+    source = np.asarray(columns.edge_source, dtype=np.int64)[causal]
+    target = np.asarray(columns.edge_target, dtype=np.int64)[causal]
+    weight = np.asarray(columns.edge_weight, dtype=float)[causal]
+    resolved = (source >= 0) & (target >= 0)  # -1: endpoint missing from the node list
+    source, target, weight = to_row[source[resolved]], to_row[target[resolved]], weight[resolved]
+    placed = (source >= 0) & (target >= 0)
+    source, target, weight = source[placed], target[placed], weight[placed]
+    return [aggregate_edges(level_groups(hierarchy, level), source, target, weight, level)
+            for level in levels], int((~resolved).sum() + (~placed).sum())
+
+
+def meta_graph_payload(levels: List[MetaEdges], hierarchy: Hierarchy, data_hash: str, skipped: int) -> StreamDict:
+    """The output document, streamed a level at a time."""
+    return StreamDict([
+        ("metadata", {
+            "version": META_GRAPH_VERSION,
+            "relationship": "causal",
+            "data_hash": data_hash,
+            "skipped_edges": skipped,
+            "levels": [{"level": m.level, "nodes": len(m.groups), "edges": len(m.weight)} for m in levels],
+        }),
+        ("levels", StreamDict([
+            (str(m.level), StreamDict([
+                ("nodes", [hierarchy.ids[row] for row in m.groups.tolist()]),
+                ("internal", m.internal.tolist()),
+                ("source", m.source.tolist()),
+                ("target", m.target.tolist()),
+                ("weight", np.round(m.weight, WEIGHT_DECIMALS).tolist()),
+                ("count", m.count.tolist()),
+            ]))
+            for m in levels
+        ])),
+    ])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute aggregated causal edges per hierarchy level")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON')
+    parser.add_argument('--output', type=Path, default=OUTPUT_FILE, help='Meta-graph file to write')
+    args = parser.parse_args()
+
+    print("Loading data...")
+    columns = load_viz_columns(args.viz, COLUMNAR_CACHE_DIR)
+    hierarchy = hierarchy_from_columns(columns)
+
+    print("Aggregating causal edges...")
+    levels, skipped = build_meta_graph(columns, hierarchy)
+    for m in levels:
+        print(f"  Level {m.level}: {len(m.groups)} nodes, {len(m.weight)} edges "
+              f"(from {int(m.count.sum())} causal edges, {int(m.internal.sum())} inside groups)")
+    if skipped:
+        print(f"  {skipped} causal edges skipped (endpoint missing or outside the hierarchy)")
+
+    document = meta_graph_payload(levels, hierarchy, columns.source_hash, skipped)
+    written = write_atomic(args.output, iter_json(document, indent=None))
+    print(f"{'Updated' if written else 'Unchanged'}: {args.output}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+CSR neighbour index over the causal edges, for constant-time neighbourhood queries.
+
+Rows follow the visualization file's node order (every node, not just the
+ones with causal edges). The index holds:
+- out_indptr / out_indices / out_weights: causal out-edges of each node
+- in_indptr / in_indices / in_weights: causal in-edges of each node
+- hop1 / hop2: distinct nodes within one and two hops, ignoring direction
+
+Neighbours of a row are sorted by weight, heaviest first, so the first k are
+its top-k edges. Everything is written to one little-endian binary file
+(neighbours.bin) with a JSON manifest (neighbours.json) giving each array's
+dtype, byte offset and length: the browser wraps slices of the fetched
+ArrayBuffer in typed arrays, and NeighbourIndex memory-maps the same file.
+
+Usage:
+    python scripts/neighbour_index.py [--viz FILE] [--output-dir DIR]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from centrality import gather_neighbours
+from data_cache import CACHE_DIR as COLUMNAR_CACHE_DIR, DATA_DIR, VIZ_FILE, load_viz_columns
+from json_stream import write_atomic
+
+OUTPUT_DIR = DATA_DIR / "neighbours"
+BINARY_NAME = "neighbours.bin"
+MANIFEST_NAME = "neighbours.json"
+
+INDEX_VERSION = 1
+ALIGNMENT = 8  # Byte alignment of each array, so typed array views are valid
+HOP_BLOCK_PAIRS = 1 << 22  # Two-hop candidate pairs expanded per block
+CAUSAL = 0  # data_cache.RELATIONSHIPS index
+
+# Array name -> dtype, in file order (all little-endian)
+ARRAY_DTYPES = {
+    'out_indptr': '<i4',
+    'out_indices': '<i4',
+    'out_weights': '<f4',
+    'in_indptr': '<i4',
+    'in_indices': '<i4',
+    'in_weights': '<f4',
+    'hop1': '<i4',
+    'hop2': '<i4',
+}
+
+
+def weighted_csr(num_nodes: int, rows: np.ndarray, cols: np.ndarray, weights: np.ndarray):
+    """(indptr, indices, weights) with each row's entries sorted by weight descending, then column."""
+    order = np.lexsort((cols, -weights, rows))
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=num_nodes), out=indptr[1:])
+    return indptr, cols[order], weights[order]
+
+
+def hop_counts(num_nodes: int, sources: np.ndarray, targets: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Distinct nodes within one and two undirected hops of each node (itself excluded).
+
+    Two-hop pairs are expanded a block of rows at a time, so memory stays
+    bounded by HOP_BLOCK_PAIRS even around hubs.
+    """
+    keep = sources != targets
+    a = np.concatenate([sources[keep], targets[keep]])
+    b = np.concatenate([targets[keep], sources[keep]])
+    pairs = np.unique(a * num_nodes + b)
+    a, b = pairs // num_nodes, pairs % num_nodes
+    indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(a, minlength=num_nodes), out=indptr[1:])
+    hop1 = np.diff(indptr)
+
+    # Block sizes from each row's two-hop fan-out (the sum of its neighbours' degrees)
+    cumulative = np.cumsum(np.bincount(a, weights=hop1[b], minlength=num_nodes))
+    hop2 = np.zeros(num_nodes, dtype=np.int64)
+    start = 0
+    while start < num_nodes:
+        budget = (cumulative[start - 1] if start else 0) + HOP_BLOCK_PAIRS
+        stop = max(int(np.searchsorted(cumulative, budget, side='right')), start + 1)
+        rows = np.arange(start, min(stop, num_nodes))
+        first_rows, first = gather_neighbours(indptr, b, rows)
+        second_rows, second = gather_neighbours(indptr, b, first)
+        origin = np.concatenate([first_rows, np.repeat(first_rows, hop1[first])])
+        reached = np.concatenate([first, second])
+        keys = np.unique(origin[origin != reached] * num_nodes + reached[origin != reached])
+        hop2 += np.bincount(keys // num_nodes, minlength=num_nodes)
+        start = stop
+    return hop1, hop2
+
+
+def index_arrays(columns) -> Dict[str, np.ndarray]:
+    """Every index array for data_cache.VizColumns at full precision (int64, float64 weights)."""
+    num_nodes = len(columns.node_ids)
+    causal = np.asarray(columns.edge_relationship) == CAUSAL
+    sources = np.asarray(columns.edge_source, dtype=np.int64)[causal]
+    targets = np.asarray(columns.edge_target, dtype=np.int64)[causal]
+    weights = np.asarray(columns.edge_weight, dtype=np.float64)[causal]
+    resolved = (sources >= 0) & (targets >= 0)
+    sources, targets, weights = sources[resolved], targets[resolved], weights[resolved]
+
+    arrays = {}
+    for direction, rows, cols in (('out', sources, targets), ('in', targets, sources)):
+        indptr, indices, sorted_weights = weighted_csr(num_nodes, rows, cols, weights)
+        arrays[f'{direction}_indptr'] = indptr
+        arrays[f'{direction}_indices'] = indices
+        arrays[f'{direction}_weights'] = sorted_weights
+    arrays['hop1'], arrays['hop2'] = hop_counts(num_nodes, sources, targets)
+    return arrays
+
+
+def build_index(columns) -> Dict[str, np.ndarray]:
+    """Every index array for data_cache.VizColumns, in ARRAY_DTYPES order and dtypes."""
+    arrays = index_arrays(columns)
+    return {name: arrays[name].astype(dtype) for name, dtype in ARRAY_DTYPES.items()}
+
+
+def write_index(arrays: Dict[str, np.ndarray], ids: List[str], data_hash: str, output_dir=OUTPUT_DIR):
+    """Write the binary file and its manifest. Returns (binary written, manifest written)."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    layout = {}
+    chunks = []
+    offset = 0
+    for name, values in arrays.items():
+        data = values.tobytes()
+        layout[name] = {'dtype': ARRAY_DTYPES[name], 'offset': offset, 'length': len(values)}
+        padding = -len(data) % ALIGNMENT
+        chunks.append(data + b'\0' * padding)
+        offset += len(data) + padding
+
+    manifest = {
+        'version': INDEX_VERSION,
+        'relationship': 'causal',
+        'data_hash': data_hash,
+        'binary': BINARY_NAME,
+        'bytes': offset,
+        'num_nodes': len(ids),
+        'num_edges': int(arrays['out_indptr'][-1]),
+        'arrays': layout,
+        'ids': ids,
+    }
+    binary_written = write_atomic(output_dir / BINARY_NAME, chunks, binary=True)
+    manifest_written = write_atomic(output_dir / MANIFEST_NAME, [json.dumps(manifest, separators=(',', ':'))])
+    return binary_written, manifest_written
+
+
+class NeighbourIndex:
+    """Read-only view of a written index, with every array memory-mapped."""
+
+    def __init__(self, directory=OUTPUT_DIR):
+        directory = Path(directory)
+        with open(directory / MANIFEST_NAME) as f:
+            self.manifest = json.load(f)
+        self.ids: List[str] = self.manifest['ids']
+        self.index = {node_id: i for i, node_id in enumerate(self.ids)}
+        path = directory / self.manifest['binary']
+        for name, entry in self.manifest['arrays'].items():
+            setattr(self, name, np.memmap(path, dtype=entry['dtype'], mode='r',
+                                          offset=entry['offset'], shape=(entry['length'],)))
+
+    def _neighbours(self, direction: str, node_id: str, limit=None) -> List[Tuple[str, float]]:
+        indptr = getattr(self, f'{direction}_indptr')
+        row = self.index[node_id]
+        start, stop = int(indptr[row]), int(indptr[row + 1])
+        if limit is not None:
+            stop = min(stop, start + limit)
+        indices = getattr(self, f'{direction}_indices')[start:stop].tolist()
+        weights = getattr(self, f'{direction}_weights')[start:stop].tolist()
+        return [(self.ids[i], w) for i, w in zip(indices, weights)]
+
+    def out_neighbours(self, node_id: str, limit=None) -> List[Tuple[str, float]]:
+        """(target id, weight) for node_id's causal out-edges, heaviest first."""
+        return self._neighbours('out', node_id, limit)
+
+    def in_neighbours(self, node_id: str, limit=None) -> List[Tuple[str, float]]:
+        """(source id, weight) for node_id's causal in-edges, heaviest first."""
+        return self._neighbours('in', node_id, limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the CSR neighbour index for causal edges")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON')
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR, help='Where to write the index')
+    args = parser.parse_args()
+
+    print("Loading data...")
+    columns = load_viz_columns(args.viz, COLUMNAR_CACHE_DIR)
+    arrays = build_index(columns)
+    binary_written, manifest_written = write_index(arrays, columns.node_ids.tolist(), columns.source_hash,
+                                                   args.output_dir)
+
+    hop1, hop2 = arrays['hop1'], arrays['hop2']
+    size = (args.output_dir / BINARY_NAME).stat().st_size
+    print(f"  {len(hop1)} nodes, {int(arrays['out_indptr'][-1])} causal edges, {size / 1024:.1f} KB")
+    print(f"  1-hop: max {int(hop1.max(initial=0))}, mean {hop1.mean() if len(hop1) else 0:.1f}; "
+          f"2-hop: max {int(hop2.max(initial=0))}, mean {hop2.mean() if len(hop2) else 0:.1f}")
+    print(f"{'Updated' if binary_written or manifest_written else 'Unchanged'}: {args.output_dir}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Top-k node selection with domain quotas for the precompute variants.
+
+One pass over a ranking's scores feeds bounded heaps: a global heap keeping
+the best max_nodes nodes and one heap per domain keeping each domain's best
+ceil(max_nodes / domains) nodes, O(N log k) in total. Every variant of that
+ranking up to max_nodes is then read off those two short lists:
+- top(n): the first n of the global list
+- capped(n, domain, cap): top(n) with the domain's nodes beyond int(cap * n)
+  dropped (the freed slots are not refilled)
+- balanced(n): at most ceil(n / domains) nodes per domain, best first
+
+Ties are broken by input order, as a stable sort by descending score would.
+"""
+
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+
+@dataclass
+class RankedSelection:
+    """The heads of one ranking: overall and per domain, best first."""
+    max_nodes: int
+    num_domains: int
+    ranked: List[str]             # best max_nodes ids overall
+    ranked_domains: List[str]     # domain of each ranked id
+    quota_stream: List[str]       # every domain's best ceil(max_nodes / num_domains) ids, merged best first
+    quota_rank: List[int]         # position of each quota_stream id within its own domain
+
+    def top(self, n: int) -> List[str]:
+        self._check(n)
+        return self.ranked[:n]
+
+    def capped(self, n: int, domain: str, cap: float) -> List[str]:
+        """top(n) keeping only the first int(cap * n) nodes of `domain`."""
+        self._check(n)
+        limit = int(cap * n)
+        kept = 0
+        selected = []
+        for node_id, node_domain in zip(self.ranked[:n], self.ranked_domains[:n]):
+            if node_domain == domain:
+                if kept >= limit:
+                    continue
+                kept += 1
+            selected.append(node_id)
+        return selected
+
+    def balanced(self, n: int) -> List[str]:
+        """The best n nodes with no domain over ceil(n / domains)."""
+        self._check(n)
+        quota = math.ceil(n / max(self.num_domains, 1))
+        selected = []
+        for node_id, rank in zip(self.quota_stream, self.quota_rank):
+            if rank < quota:
+                selected.append(node_id)
+                if len(selected) == n:
+                    break
+        return selected
+
+    def _check(self, n: int):
+        if n > self.max_nodes:
+            raise ValueError(f"selection holds the top {self.max_nodes} nodes, {n} requested")
+
+
+def rank_nodes(ids: Sequence[str], scores: Dict[str, float], domains: Dict[str, str],
+               max_nodes: int) -> RankedSelection:
+    """Stream ids once through the global and per-domain bounded heaps."""
+    domain_names = sorted(set(domains[node_id] for node_id in ids))
+    quota = math.ceil(max_nodes / len(domain_names)) if domain_names else 0
+
+    # Min-heaps of (score, -position): the root is the weakest entry kept
+    overall: List[tuple] = []
+    by_domain: Dict[str, List[tuple]] = {name: [] for name in domain_names}
+    for position, node_id in enumerate(ids):
+        item = (scores[node_id], -position)
+        for heap, bound in ((overall, max_nodes), (by_domain[domains[node_id]], quota)):
+            if len(heap) < bound:
+                heapq.heappush(heap, item)
+            elif bound and item > heap[0]:
+                heapq.heapreplace(heap, item)
+
+    ranked = [ids[-position] for _score, position in sorted(overall, reverse=True)]
+    merged = []
+    for heap in by_domain.values():
+        merged.extend((item, rank) for rank, item in enumerate(sorted(heap, reverse=True)))
+    merged.sort(reverse=True)
+    return RankedSelection(
+        max_nodes=max_nodes,
+        num_domains=len(domain_names),
+        ranked=ranked,
+        ranked_domains=[domains[node_id] for node_id in ranked],
+        quota_stream=[ids[-position] for (_score, position), _rank in merged],
+        quota_rank=[rank for _item, rank in merged],
+    )
@@ -2,36 +2,50 @@
 """
 Optimize layout parameters to maximize node sizes while minimizing ring radii and collisions.
 Uses actual importance-based node sizing (matching App.tsx getSize function).
+Causal edge crossings (see edge_crossings) are reported, not optimized: equal spacing
+keeps the node angles at every gap, so the sweep prints them once, and the per-ring
+search compares its result's crossings with the configuration it started from.
 """
 
+import argparse
+import hashlib
 import json
 import math
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from data_cache import CACHE_DIR as COLUMNAR_CACHE_DIR, VIZ_FILE, VizColumns, load_viz_columns
+from edge_crossings import CrossingCount, count_crossings
+from hierarchy import Hierarchy, hierarchy_from_columns
+from json_stream import write_atomic
+from radial_layout import allocate_angles, required_extents
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+CACHE_DIR = BASE_DIR / ".cache" / "layout_sweep"
+
+# Sweep config
+SWEEP_GAPS = [100, 120, 140, 150, 160, 180, 200, 220, 250, 280, 300, 320, 350, 400]
+REFINE_TOLERANCE = 1  # Stop bisecting once the gap bracket is this narrow (px)
+SWEEP_VERSION = 3  # Bump when cached ring collision counts change meaning, so they are recomputed
+CAUSAL = 0  # data_cache.RELATIONSHIPS index
 
-# Load data
-with open('public/data/v2_1_visualization_final.json') as f:
-    data = json.load(f)
-
-nodes = data['nodes']
-node_by_id = {str(n['id']): n for n in nodes}
-
-# Build hierarchy
-children_by_parent: Dict[str, List[str]] = {}
-for n in nodes:
-    if n.get('parent') is not None:
-        parent_id = str(n['parent'])
-        if parent_id not in children_by_parent:
-            children_by_parent[parent_id] = []
-        children_by_parent[parent_id].append(str(n['id']))
-
-# Count nodes per layer
-nodes_per_layer = {}
-for n in nodes:
-    layer = n['layer']
-    nodes_per_layer[layer] = nodes_per_layer.get(layer, 0) + 1
-
-print("Nodes per layer:", nodes_per_layer)
+# Base size ranges (matching App.tsx BASE_SIZE_RANGES)
+SIZE_RANGES = [
+    (12, 12),   # Ring 0
+    (3, 18),    # Ring 1
+    (2, 14),    # Ring 2
+    (2, 12),    # Ring 3
+    (1.5, 10),  # Ring 4
+    (1, 8),     # Ring 5
+]
 
 @dataclass
 class RingConfig:
@@ -48,220 +62,887 @@ def get_actual_node_size(node: dict, config: RingConfig) -> float:
     importance = node.get('importance', 0) or 0
     return config.min_size + (config.max_size - config.min_size) * math.sqrt(importance)
 
+
+@dataclass
+class LayoutData:
+    """
+    The laid-out hierarchy (the root's subtree) as breadth-first arrays.
+
+    Row i of every array describes ids[i]. Each depth level is a contiguous
+    slice (level_offsets) and siblings are adjacent, so the positioning and
+    subtree passes work one level at a time instead of recursing per node.
+    The arrays are views of `hierarchy`, which also answers subtree queries.
+    """
+    columns: VizColumns        # every node in file order (memory-mapped)
+    hierarchy: Hierarchy
+    nodes_per_layer: Dict[int, int]
+    data_hash: str
+    max_layer: int
+    ids: List[str]
+    index: Dict[str, int]      # id -> row
+    layer: np.ndarray          # node layer (ring index)
+    importance: np.ndarray     # normalized importance, 0 when missing
+    parent: np.ndarray         # row of the parent, -1 for the root
+    child_rank: np.ndarray     # position among siblings
+    level_offsets: List[int]   # level d is rows level_offsets[d]:level_offsets[d + 1]
+    preorder: np.ndarray       # rows in depth-first order (matches position_subtree)
+    subtree_counts: np.ndarray  # (N, max_layer + 1) nodes per layer in each subtree
+    edge_source: np.ndarray    # rows of the causal edges with both ends laid out
+    edge_target: np.ndarray
+
+
+def load_layout_data(path: Path = VIZ_FILE, cache_dir: Path = COLUMNAR_CACHE_DIR) -> LayoutData:
+    """Load the visualization data (via the columnar cache) and compile the root's subtree."""
+    columns = load_viz_columns(path, cache_dir)
+    all_layers = np.asarray(columns.layer, dtype=np.int64)
+    nodes_per_layer = {int(layer): int(count) for layer, count in enumerate(np.bincount(all_layers)) if count}
+
+    # Only nodes under the first layer-0 node are laid out
+    root = columns.node_ids[int(np.flatnonzero(all_layers == 0)[0])]
+    tree = hierarchy_from_columns(columns).subtree(str(root))
+    max_layer = int(all_layers.max())
+
+    to_row = tree.source_rows(len(columns.node_ids))  # -1 outside the root's subtree
+    edge_source = np.asarray(columns.edge_source, dtype=np.int64)
+    edge_target = np.asarray(columns.edge_target, dtype=np.int64)
+    # -1 is an endpoint missing from the node list
+    causal = (np.asarray(columns.edge_relationship) == CAUSAL) & (edge_source >= 0) & (edge_target >= 0)
+    edge_source, edge_target = to_row[edge_source[causal]], to_row[edge_target[causal]]
+    placed = (edge_source >= 0) & (edge_target >= 0)
+
+    return LayoutData(
+        columns=columns,
+        hierarchy=tree,
+        nodes_per_layer=nodes_per_layer,
+        data_hash=columns.source_hash,
+        max_layer=max_layer,
+        ids=tree.ids,
+        index=tree.index,
+        layer=tree.layer,
+        importance=np.asarray(columns.importance[tree.source_row], dtype=float),
+        parent=tree.parent,
+        child_rank=tree.child_rank,
+        level_offsets=tree.level_offsets,
+        preorder=tree.preorder,
+        subtree_counts=tree.subtree_layer_counts(max_layer + 1),
+        edge_source=edge_source[placed],
+        edge_target=edge_target[placed],
+    )
+
+
+_layout_data: Optional[LayoutData] = None
+
+
+def get_layout_data() -> LayoutData:
+    """Load the default data file on first use and reuse it afterwards."""
+    global _layout_data
+    if _layout_data is None:
+        _layout_data = load_layout_data()
+    return _layout_data
+
+
 def build_subtree_info(node_id: str, max_layer: int) -> Dict[int, int]:
-    node = node_by_id[node_id]
-    counts = {i: 0 for i in range(max_layer + 1)}
-    counts[node['layer']] = 1
-    for child_id in children_by_parent.get(node_id, []):
-        child_counts = build_subtree_info(child_id, max_layer)
-        for layer, count in child_counts.items():
-            counts[layer] += count
+    """Per-layer node counts in the subtree under node_id."""
+    layout = get_layout_data()
+    counts = {layer: 0 for layer in range(max_layer + 1)}
+    if node_id in layout.index:
+        row = layout.subtree_counts[layout.index[node_id]]
+        for layer in range(min(max_layer + 1, len(row))):
+            counts[layer] = int(row[layer])
     return counts
 
-# Cache subtree info
-max_layer = max(n['layer'] for n in nodes)
-subtree_cache = {}
-for n in nodes:
-    subtree_cache[str(n['id'])] = build_subtree_info(str(n['id']), max_layer)
+
+@lru_cache(maxsize=256)
+def _subtree_extents(config_key: Tuple[Tuple[float, float, float], ...], node_padding: float,
+                     data_hash: str) -> np.ndarray:
+    layout = get_layout_data()
+    n_layers = layout.max_layer + 1
+    radius = np.array([ring_radius for ring_radius, _min_size, _max_size in config_key[:n_layers]], dtype=float)
+    # Use max size for spacing calculation (layout algorithm)
+    spacing = np.array([max_size * 2 + node_padding for _r, _min_size, max_size in config_key[:n_layers]])
+    return required_extents(layout.subtree_counts, radius, spacing)
+
+
+def compute_subtree_extents(ring_configs: List[RingConfig], node_padding: float = 2) -> np.ndarray:
+    """
+    Angular extent each subtree needs, memoized per ring configuration.
+
+    Uses MAX sizes (layout spacing): the widest of count * (spacing / radius)
+    across the rings the subtree reaches, as in RadialLayout.ts.
+    """
+    config_key = tuple((c.radius, c.min_size, c.max_size) for c in ring_configs)
+    return _subtree_extents(config_key, node_padding, get_layout_data().data_hash)
+
+
+def node_angles(ring_configs: List[RingConfig], node_padding: float = 2) -> np.ndarray:
+    """
+    Angle of every row of LayoutData, level by level.
+
+    Uses the radial_layout engine with the sweep's spacing (max size plus
+    unscaled padding) at the configured radii.
+    """
+    layout = get_layout_data()
+    required = compute_subtree_extents(ring_configs, node_padding)
+    start, extent = allocate_angles(layout.parent, layout.child_rank, layout.level_offsets, required,
+                                    -math.pi / 2, 2 * math.pi)
+    return start + extent / 2
+
+
+def position_nodes(ring_configs: List[RingConfig], node_padding: float = 2) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Lay out the tree (see node_angles) and return (x, y, size) per row of LayoutData."""
+    layout = get_layout_data()
+    radius = np.array([c.radius for c in ring_configs])[layout.layer]
+    min_size = np.array([c.min_size for c in ring_configs])[layout.layer]
+    max_size = np.array([c.max_size for c in ring_configs])[layout.layer]
+
+    center = node_angles(ring_configs, node_padding)
+    x = radius * np.cos(center)
+    y = radius * np.sin(center)
+    x[0] = y[0] = 0
+    # Use ACTUAL importance-based size
+    size = min_size + (max_size - min_size) * np.sqrt(layout.importance)
+    return x, y, size
+
+
+OVERLAP_TOLERANCE = 0.5  # Match RadialLayout.ts
+
+
+def find_ring_collisions(x: np.ndarray, y: np.ndarray, size: np.ndarray,
+                         tolerance: float = OVERLAP_TOLERANCE) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Find overlapping node pairs on one ring with an angular sort-and-sweep.
+
+    Nodes are sorted by angle and each node is only compared with the nodes
+    that follow it within the largest angular gap that could still overlap;
+    one binary search per node finds where that window ends.
+    Radially projecting points onto the innermost circle never increases their
+    distance, so that gap is derived from the smallest radius on the ring and
+    the largest possible min_distance. Total work is O(n log n + pairs checked).
+
+    Returns (i, j, distance, min_distance) arrays for colliding pairs with i < j,
+    ordered the same way as a nested i/j loop over the input.
+    """
+    n = len(x)
+    empty = np.empty(0, dtype=np.int64)
+    if n < 2:
+        return empty, empty, np.empty(0), np.empty(0)
+
+    cutoff = 2 * size.max() - tolerance
+    r_min = float(np.hypot(x, y).min())
+    if cutoff <= 0:
+        return empty, empty, np.empty(0), np.empty(0)
+
+    if 2 * r_min <= cutoff or 2 * math.asin(cutoff / (2 * r_min)) >= math.pi / 2:
+        # Window spans most of the circle (or nodes sit at the centre): check every pair
+        i, j = np.triu_indices(n, k=1)
+    else:
+        # Small safety margin so float rounding never drops a real collision
+        max_sep = 2 * math.asin(cutoff / (2 * r_min)) * (1 + 1e-9) + 1e-12
+        theta = np.arctan2(y, x)
+        order = np.argsort(theta, kind='stable')
+        theta_sorted = theta[order]
+        # Partners of sorted position p are the next positions (wrapping once
+        # around the circle) up to the last angle within max_sep
+        wrapped = np.concatenate([theta_sorted, theta_sorted + 2 * math.pi])
+        counts = np.searchsorted(wrapped, theta_sorted + max_sep, side='right') - np.arange(n) - 1
+        counts = np.minimum(counts, n - 1)
+        total = int(counts.sum())
+        if total == 0:
+            return empty, empty, np.empty(0), np.empty(0)
+        first = np.repeat(np.arange(n), counts)
+        step = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + 1
+        a = order[first]
+        b = order[(first + step) % n]
+        i = np.minimum(a, b)
+        j = np.maximum(a, b)
+
+    dx = x[i] - x[j]
+    dy = y[i] - y[j]
+    dist = np.sqrt(dx * dx + dy * dy)
+    min_dist = size[i] + size[j] - tolerance
+    hit = dist < min_dist
+
+    i, j, dist, min_dist = i[hit], j[hit], dist[hit], min_dist[hit]
+    order = np.lexsort((j, i))
+    return i[order], j[order], dist[order], min_dist[order]
+
 
 def compute_collisions_with_actual_sizes(ring_configs: List[RingConfig], node_padding: float = 2) -> Tuple[int, List[dict]]:
     """
     Compute collisions using ACTUAL importance-based node sizes (not max sizes).
     Returns (collision_count, list_of_collision_details)
     """
-    root = next(n for n in nodes if n['layer'] == 0)
-    root_id = str(root['id'])
-    outcome_ids = children_by_parent.get(root_id, [])
-
-    def get_required_extent(node_id: str) -> float:
-        """Get angular extent needed for subtree using MAX sizes (for layout spacing)"""
-        subtree_counts = subtree_cache[node_id]
-        max_extent = 0
-        for layer, count in subtree_counts.items():
-            if layer < len(ring_configs) and count > 0:
-                cfg = ring_configs[layer]
-                if cfg.radius > 0:
-                    # Use max size for spacing calculation (layout algorithm)
-                    node_spacing = cfg.max_size * 2 + node_padding
-                    extent = (count * node_spacing) / cfg.radius
-                    max_extent = max(max_extent, extent)
-        return max_extent
-
-    outcome_extents = {oid: get_required_extent(oid) for oid in outcome_ids}
-    total_extent = sum(outcome_extents.values())
-
-    positioned = []
-
-    def position_subtree(node_id: str, start_angle: float, angular_extent: float):
-        node = node_by_id[node_id]
-        layer = node['layer']
-        cfg = ring_configs[layer]
-        center_angle = start_angle + angular_extent / 2
-        x = cfg.radius * math.cos(center_angle)
-        y = cfg.radius * math.sin(center_angle)
-        # Use ACTUAL importance-based size
-        size = get_actual_node_size(node, cfg)
-        positioned.append({
-            'id': node_id,
-            'layer': layer,
-            'x': x,
-            'y': y,
-            'size': size,
-            'importance': node.get('importance', 0) or 0
-        })
-
-        child_ids = children_by_parent.get(node_id, [])
-        if child_ids:
-            child_extents = [get_required_extent(cid) for cid in child_ids]
-            total_child = sum(child_extents)
-            scale = angular_extent / max(total_child, 0.0001)
-            child_start = start_angle
-            for i, cid in enumerate(child_ids):
-                position_subtree(cid, child_start, child_extents[i] * scale)
-                child_start += child_extents[i] * scale
-
-    # Position root
-    root_cfg = ring_configs[0]
-    positioned.append({
-        'id': root_id,
-        'layer': 0,
-        'x': 0,
-        'y': 0,
-        'size': get_actual_node_size(root, root_cfg),
-        'importance': root.get('importance', 0) or 0
-    })
-
-    # Position outcomes
-    scale = (2 * math.pi) / max(total_extent, 0.0001)
-    current_angle = -math.pi / 2
-    for oid in outcome_ids:
-        extent = outcome_extents[oid] * scale
-        position_subtree(oid, current_angle, extent)
-        current_angle += extent
-
-    # Count collisions using ACTUAL node sizes
+    layout = get_layout_data()
+    x, y, size = position_nodes(ring_configs, node_padding)
+
+    # Count collisions using ACTUAL node sizes, per ring in depth-first order
     collisions = 0
     collision_details = []
-    nodes_by_layer = {}
-    for p in positioned:
-        layer = p['layer']
-        if layer not in nodes_by_layer:
-            nodes_by_layer[layer] = []
-        nodes_by_layer[layer].append(p)
-
-    OVERLAP_TOLERANCE = 0.5  # Match RadialLayout.ts
-
-    for layer, layer_nodes in nodes_by_layer.items():
-        for i in range(len(layer_nodes)):
-            for j in range(i + 1, len(layer_nodes)):
-                n1, n2 = layer_nodes[i], layer_nodes[j]
-                dx = n1['x'] - n2['x']
-                dy = n1['y'] - n2['y']
-                dist = math.sqrt(dx*dx + dy*dy)
-                # Actual collision: sum of actual radii (not max sizes)
-                min_dist = n1['size'] + n2['size'] - OVERLAP_TOLERANCE
-                if dist < min_dist:
-                    collisions += 1
-                    collision_details.append({
-                        'layer': layer,
-                        'distance': dist,
-                        'min_distance': min_dist,
-                        'gap': dist - min_dist,
-                        'size1': n1['size'],
-                        'size2': n2['size']
-                    })
+    preorder_layers = layout.layer[layout.preorder]
+    _, first_seen = np.unique(preorder_layers, return_index=True)
+    for layer in preorder_layers[np.sort(first_seen)].tolist():
+        rows = layout.preorder[preorder_layers == layer]
+        ring_size = size[rows]
+        # Actual collision: sum of actual radii (not max sizes)
+        i, j, dist, min_dist = find_ring_collisions(x[rows], y[rows], ring_size)
+        collisions += len(i)
+        for a, b, d, m in zip(i.tolist(), j.tolist(), dist.tolist(), min_dist.tolist()):
+            collision_details.append({
+                'layer': layer,
+                'distance': d,
+                'min_distance': m,
+                'gap': d - m,
+                'size1': ring_size[a].item(),
+                'size2': ring_size[b].item()
+            })
 
     return collisions, collision_details
 
-# Current configuration - Equal spacing with gap=150
-print("\n=== Current Configuration (Equal spacing, gap=150px) ===")
-current = [
-    RingConfig(0 * 150, 12, 12),      # Ring 0: Root
-    RingConfig(1 * 150, 3, 18),       # Ring 1: Outcomes
-    RingConfig(2 * 150, 2, 14),       # Ring 2: Coarse Domains
-    RingConfig(3 * 150, 2, 12),       # Ring 3: Fine Domains
-    RingConfig(4 * 150, 1.5, 10),     # Ring 4: Indicator Groups
-    RingConfig(5 * 150, 1, 8),        # Ring 5: Indicators
-]
-coll, details = compute_collisions_with_actual_sizes(current)
-print(f"Collisions with actual sizes: {coll}")
-print(f"Max radius: {max(c.radius for c in current)}")
-if details:
-    print(f"Collision details (first 5):")
-    for d in details[:5]:
-        print(f"  Layer {d['layer']}: gap={d['gap']:.2f}px, sizes={d['size1']:.1f}+{d['size2']:.1f}px")
 
-# Base size ranges (matching App.tsx BASE_SIZE_RANGES)
-size_ranges = [
-    (12, 12),   # Ring 0
-    (3, 18),    # Ring 1
-    (2, 14),    # Ring 2
-    (2, 12),    # Ring 3
-    (1.5, 10),  # Ring 4
-    (1, 8),     # Ring 5
-]
+_crossing_counts: Dict[str, CrossingCount] = {}
+
 
-# Optimization with equal spacing - test different gaps
-print("\n=== Running Optimization (equal spacing, varying gap) ===")
-results = []
+def layout_crossings(ring_configs: List[RingConfig], node_padding: float = 2,
+                     cache_dir: Optional[Path] = None) -> CrossingCount:
+    """
+    Causal edge crossings of a configuration, memoized per layout shape.
 
-# Test gaps from 100px to 400px
-for gap in [100, 120, 140, 150, 160, 180, 200, 220, 250, 280, 300, 320, 350, 400]:
-    configs = [
+    Scaling every radius alike cannot change which edges cross, and equal
+    spacing at any gap usually yields the same angles, so the key is the
+    endpoints' angles and radii relative to the outermost ring (rounded past
+    float noise): a whole sweep typically counts crossings once per process.
+    With cache_dir the counts are also kept on disk under that key.
+    """
+    layout = get_layout_data()
+    radii = np.array([c.radius for c in ring_configs[:layout.max_layer + 1]], dtype=float)
+    angle = node_angles(ring_configs, node_padding)
+    ends = np.concatenate([layout.edge_source, layout.edge_target])
+    shape = np.concatenate([np.round(angle[ends], 9), np.round(radii / max(radii.max(), 1e-12), 9)])
+    key = hashlib.sha256(shape.tobytes() + layout.data_hash.encode()).hexdigest()
+    path = cache_dir / "crossings" / f"{key[:24]}.json" if cache_dir is not None else None
+    if key not in _crossing_counts and path is not None and path.exists():
+        with open(path) as f:
+            _crossing_counts[key] = CrossingCount(**json.load(f))
+    if key not in _crossing_counts:
+        _crossing_counts[key] = count_crossings(radii[layout.layer], angle, layout.layer,
+                                                layout.edge_source, layout.edge_target)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(path, [json.dumps(_crossing_counts[key]._asdict())])
+    return _crossing_counts[key]
+
+
+def equal_spacing_configs(gap: float, size_ranges: List[Tuple[float, float]]) -> List[RingConfig]:
+    """Ring N at N * gap, matching generateRingConfigs() in App.tsx."""
+    return [
         RingConfig(i * gap, size_ranges[i][0], size_ranges[i][1])
-        for i in range(6)
+        for i in range(len(size_ranges))
     ]
 
-    collisions, _ = compute_collisions_with_actual_sizes(configs)
+
+def ring_rows(layout: LayoutData) -> List[np.ndarray]:
+    """Rows of each ring (layer), in depth-first order."""
+    preorder_layers = layout.layer[layout.preorder]
+    return [layout.preorder[preorder_layers == ring] for ring in range(layout.max_layer + 1)]
+
+
+def ring_collision_count(config: RingConfig, angle: np.ndarray, sqrt_importance: np.ndarray) -> int:
+    """Collisions among one ring's nodes placed at these angles with these sqrt(importance) values."""
+    if len(angle) < 2:
+        return 0
+    size = config.min_size + (config.max_size - config.min_size) * sqrt_importance
+    i, _, _, _ = find_ring_collisions(config.radius * np.cos(angle), config.radius * np.sin(angle), size)
+    return len(i)
+
+
+def ring_state_key(ring: int, config: RingConfig, angle: np.ndarray, data_hash: str) -> str:
+    """
+    Key for one ring's collision count: everything the count depends on.
+
+    That is the ring's radius and size range and its nodes' angles. The
+    angles depend on every ring's spacing, but a change elsewhere that leaves
+    them unchanged keeps the key.
+    """
+    digest = hashlib.sha256(json.dumps([SWEEP_VERSION, ring, config.radius, config.min_size, config.max_size,
+                                        data_hash]).encode())
+    digest.update(np.ascontiguousarray(angle, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:24]
+
+
+def evaluate_gap(gap: float, size_ranges: List[Tuple[float, float]],
+                 cache_dir: Optional[Path] = None) -> Tuple[dict, int]:
+    """
+    Score one equal-spacing configuration (collisions, edge crossings, max radius, avg actual size).
+
+    With cache_dir, each ring's collision count and the crossing count are
+    read from / written to disk (see ring_state_key and layout_crossings),
+    so a change to one ring's size range only recounts the rings it affects.
+    Returns (result, rings whose collisions were computed).
+    """
+    configs = equal_spacing_configs(gap, size_ranges)
+    layout = get_layout_data()
+    angle = node_angles(configs)
+    sqrt_importance = np.sqrt(layout.importance)
+
+    collisions = 0
+    computed = 0
+    for ring, rows in enumerate(ring_rows(layout)):
+        path = None
+        if cache_dir is not None:
+            path = cache_dir / "rings" / f"{ring_state_key(ring, configs[ring], angle[rows], layout.data_hash)}.json"
+            if path.exists():
+                with open(path) as f:
+                    collisions += json.load(f)['collisions']
+                continue
+        count = ring_collision_count(configs[ring], angle[rows], sqrt_importance[rows])
+        collisions += count
+        computed += 1
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_atomic(path, [json.dumps({'collisions': count})])
+
+    crossings = layout_crossings(configs, cache_dir=cache_dir)
     max_radius = max(c.radius for c in configs)
 
     # Compute average actual node size
-    total_size = 0
-    count = 0
-    for n in nodes:
-        layer = n['layer']
-        if layer < len(configs):
-            cfg = configs[layer]
-            total_size += get_actual_node_size(n, cfg)
-            count += 1
-    avg_actual_size = total_size / count if count > 0 else 0
-
-    results.append({
+    columns = layout.columns
+    sized = columns.layer < len(configs)
+    layer = columns.layer[sized]
+    min_size = np.array([c.min_size for c in configs])[layer]
+    max_size = np.array([c.max_size for c in configs])[layer]
+    sizes = min_size + (max_size - min_size) * np.sqrt(columns.importance[sized])
+    avg_actual_size = float(sizes.mean()) if len(sizes) > 0 else 0
+
+    return {
         'gap': gap,
         'collisions': collisions,
+        'crossings': round(crossings.count),
+        'crossings_exact': crossings.exact,
         'max_radius': max_radius,
         'avg_actual_size': avg_actual_size,
-        'configs': configs
-    })
-
-# Sort by collisions, then radius (smallest)
-results.sort(key=lambda x: (x['collisions'], x['max_radius']))
-
-print(f"Tested {len(results)} configurations\n")
-print(f"{'Rank':<5} {'Coll':<6} {'MaxRad':<8} {'AvgSize':<8} {'Gap':<8}")
-print("-" * 45)
-
-for i, r in enumerate(results[:20]):
-    print(f"{i+1:<5} {r['collisions']:<6} {r['max_radius']:<8.0f} {r['avg_actual_size']:<8.2f} {r['gap']:<8}")
-
-# Find smallest radius with 0 collisions
-zero_coll = [r for r in results if r['collisions'] == 0]
-if zero_coll:
-    best = min(zero_coll, key=lambda x: x['max_radius'])
-    print(f"\n=== SMALLEST GAP WITH 0 COLLISIONS ===")
-    print(f"Ring gap: {best['gap']}px")
-    print(f"Max radius: {best['max_radius']:.0f}px")
-    print(f"Avg actual node size: {best['avg_actual_size']:.2f}px")
-    print("\nSet DEFAULT_RING_GAP in App.tsx to:", best['gap'])
-else:
-    print("\n=== NO CONFIGURATION WITH 0 COLLISIONS FOUND ===")
-    # Find best compromise
-    best = results[0]
-    print(f"Best found: {best['collisions']} collisions at gap={best['gap']}px")
-
-# Also show a few options for user to choose
-print("\n=== OPTIONS FOR USER ===")
-print("(Choose based on preference for compactness vs collision-free)")
-for r in results[:10]:
-    status = "0 collisions" if r['collisions'] == 0 else f"{r['collisions']} collisions"
-    print(f"  gap={r['gap']}px: max_radius={r['max_radius']:.0f}px, {status}")
+    }, computed
+
+
+class SweepRunner:
+    """
+    Evaluates gap values across a process pool, memoizing per ring on disk.
+
+    Each ring's collision count is cached under a key of that ring's radius
+    (ring index times gap), size range and node angles, plus the data hash,
+    and crossing counts under their layout shape (see evaluate_gap). After
+    a change to one ring's size range, a re-run recounts only that ring, and
+    any ring whose angles move because its max size sets the spacing. The
+    other rings and the crossings come from disk.
+    """
+
+    def __init__(self, size_ranges: List[Tuple[float, float]], workers: Optional[int] = None,
+                 cache_dir: Optional[Path] = CACHE_DIR):
+        self.size_ranges = size_ranges
+        self.workers = workers
+        self.cache_dir = cache_dir
+        self.results: Dict[float, dict] = {}
+        self.rings_cached = 0
+        self.rings_computed = 0
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def evaluate(self, gaps: List[float]) -> List[dict]:
+        pending = [gap for gap in dict.fromkeys(gaps) if gap not in self.results]
+
+        if len(pending) > 1 and self.workers != 1:
+            # Count crossings here first: forked workers inherit the memo instead of each recounting
+            layout_crossings(equal_spacing_configs(pending[0], self.size_ranges), cache_dir=self.cache_dir)
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                computed = list(pool.map(evaluate_gap, pending, [self.size_ranges] * len(pending),
+                                         [self.cache_dir] * len(pending)))
+        else:
+            computed = [evaluate_gap(gap, self.size_ranges, self.cache_dir) for gap in pending]
+
+        num_rings = get_layout_data().max_layer + 1
+        for gap, (result, rings_computed) in zip(pending, computed):
+            self.results[gap] = result
+            self.rings_computed += rings_computed
+            self.rings_cached += num_rings - rings_computed
+
+        return [self.results[gap] for gap in gaps]
+
+    def refine(self, tolerance: float = REFINE_TOLERANCE) -> Optional[dict]:
+        """
+        Bisect between the largest colliding gap below the smallest
+        collision-free gap found so far, down to `tolerance` px.
+        """
+        clean = [r['gap'] for r in self.results.values() if r['collisions'] == 0]
+        if not clean:
+            return None
+        hi = min(clean)
+        below = [r['gap'] for r in self.results.values() if r['collisions'] > 0 and r['gap'] < hi]
+        if not below:
+            return self.results[hi]
+        lo = max(below)
+
+        while hi - lo > tolerance:
+            mid = (lo + hi) / 2
+            if tolerance >= 1:
+                mid = round(mid)
+                if mid in (lo, hi):
+                    break
+            if self.evaluate([mid])[0]['collisions'] == 0:
+                hi = mid
+            else:
+                lo = mid
+
+        return self.results[hi]
+
+
+# Per-ring search
+ANGLE_TOLERANCE = 1e-9  # Radians; a ring whose angles all moved less than this keeps its collision count
+MIN_NODE_SIZE = 0.5  # Smallest min_size the ring search may choose (px)
+MAX_SIZE_SCALE = 3.0  # Largest max_size as a multiple of the base range's max
+RING_SEARCH_STEP = 0.2  # Initial relative step for each parameter
+RING_SEARCH_MIN_STEP = 0.002  # Search stops once the step falls below this
+RING_SEARCH_EVALUATIONS = 5000
+DEFAULT_SIZE_WEIGHT = 0.5  # Weight of the (relative) average size against the (relative) max radius
+DEFAULT_MIN_RING_GAP = 80  # radial_layout.MIN_RING_GAP
+RADIUS_TIEBREAK = 1e-3  # Weight of the summed ring radii in the objective
+
+
+@dataclass
+class RingScore:
+    """One evaluated configuration, with the per-ring state a later evaluation can reuse."""
+    configs: List[RingConfig]
+    collisions: int
+    max_radius: float
+    avg_actual_size: float
+    ring_collisions: List[int]
+    terms: np.ndarray     # (N, rings) required extent each ring asks of each subtree
+    required: np.ndarray
+    angle: np.ndarray
+    rescored: List[int]   # Rings whose collisions were counted (not reused or memoized) for this score
+
+
+class RingEvaluator:
+    """
+    Scores per-ring configurations incrementally against the last accepted one.
+
+    A subtree's required extent is the largest of one term per ring, so
+    changing a ring's radius or max size only recomputes that ring's column
+    of terms; a min-size change leaves every angle alone. Angles are only
+    re-allocated when the required extents actually changed, and collisions
+    are only recounted on rings whose parameters changed or whose node
+    angles moved. Scaling the dominant ring's spacing scales every extent
+    alike, so in practice most candidates re-score a single ring.
+
+    Recounted rings are memoized by ring_state_key (the ring's parameters
+    and its nodes' angles). The pattern search keeps returning to the same
+    ring states, for example when a step is undone or when a move keeps a
+    ring's angles, so most recounts are memo hits.
+    """
+
+    def __init__(self, layout: LayoutData, node_padding: float = 2):
+        self.layout = layout
+        self.node_padding = node_padding
+        self.num_rings = layout.max_layer + 1
+        self.ring_rows = ring_rows(layout)
+        self.sqrt_importance = np.sqrt(layout.importance)
+        self.ring_memo: Dict[str, int] = {}
+
+        # Average size over every node in the file, as evaluate_gap() computes it
+        columns = layout.columns
+        file_layers = np.asarray(columns.layer, dtype=np.int64)
+        file_sqrt = np.sqrt(np.asarray(columns.importance, dtype=float))
+        self.ring_counts = np.bincount(file_layers, minlength=self.num_rings)[:self.num_rings]
+        self.ring_sqrt_sums = np.bincount(file_layers, weights=file_sqrt, minlength=self.num_rings)[:self.num_rings]
+        self.base: Optional[RingScore] = None
+        self.evaluations = 0
+        self.rings_rescored = 0
+
+    def _term(self, ring: int, config: RingConfig) -> np.ndarray:
+        spacing = config.max_size * 2 + self.node_padding
+        return required_extents(self.layout.subtree_counts[:, ring:ring + 1],
+                                np.array([config.radius]), np.array([spacing]))
+
+    def _ring_collisions(self, ring: int, config: RingConfig, angle: np.ndarray) -> Tuple[int, bool]:
+        """(collisions on one ring, whether they were counted rather than taken from the memo)."""
+        rows = self.ring_rows[ring]
+        key = ring_state_key(ring, config, angle[rows], self.layout.data_hash)
+        if key in self.ring_memo:
+            return self.ring_memo[key], False
+        count = self.ring_memo[key] = ring_collision_count(config, angle[rows], self.sqrt_importance[rows])
+        return count, True
+
+    def average_size(self, configs: List[RingConfig]) -> float:
+        min_size = np.array([c.min_size for c in configs[:self.num_rings]])
+        max_size = np.array([c.max_size for c in configs[:self.num_rings]])
+        total = (self.ring_counts * min_size + (max_size - min_size) * self.ring_sqrt_sums).sum()
+        return float(total / max(self.ring_counts.sum(), 1))
+
+    def evaluate(self, configs: List[RingConfig]) -> RingScore:
+        """Score configs, reusing whatever the accepted base already computed."""
+        self.evaluations += 1
+        base = self.base
+        rings = range(self.num_rings)
+        if base is None:
+            changed = set(rings)
+            spacing_changed = set(rings)
+            terms = np.column_stack([self._term(ring, configs[ring]) for ring in rings])
+        else:
+            changed = {ring for ring in rings if configs[ring] != base.configs[ring]}
+            spacing_changed = {
+                ring for ring in changed
+                if (configs[ring].radius, configs[ring].max_size) != (base.configs[ring].radius, base.configs[ring].max_size)
+            }
+            terms = base.terms
+            if spacing_changed:
+                terms = terms.copy()
+                for ring in spacing_changed:
+                    terms[:, ring] = self._term(ring, configs[ring])
+
+        if base is not None and not spacing_changed:
+            required, angle = base.required, base.angle
+        else:
+            required = terms.max(axis=1, initial=0)
+            if base is not None and np.array_equal(required, base.required):
+                angle = base.angle
+            else:
+                start, extent = allocate_angles(self.layout.parent, self.layout.child_rank, self.layout.level_offsets,
+                                                required, -math.pi / 2, 2 * math.pi)
+                angle = start + extent / 2
+
+        rescore = set(changed)
+        if base is not None and angle is not base.angle:
+            for ring in rings:
+                rows = self.ring_rows[ring]
+                if ring not in rescore and not np.allclose(angle[rows], base.angle[rows], rtol=0, atol=ANGLE_TOLERANCE):
+                    rescore.add(ring)
+
+        ring_collisions = []
+        counted = []
+        for ring in rings:
+            if ring not in rescore:
+                ring_collisions.append(base.ring_collisions[ring])
+                continue
+            count, fresh = self._ring_collisions(ring, configs[ring], angle)
+            ring_collisions.append(count)
+            if fresh:
+                counted.append(ring)
+        self.rings_rescored += len(counted)
+        return RingScore(
+            configs=list(configs),
+            collisions=sum(ring_collisions),
+            max_radius=max(c.radius for c in configs),
+            avg_actual_size=self.average_size(configs),
+            ring_collisions=ring_collisions,
+            terms=terms,
+            required=required,
+            angle=angle,
+            rescored=counted,
+        )
+
+    def accept(self, score: RingScore):
+        self.base = score
+
+
+def ring_objective(score: RingScore, reference: RingScore, size_weight: float) -> float:
+    """
+    Lower is better: max radius against the reference, minus the weighted relative average size.
+
+    A small term for the summed radii lets inner rings tighten even when
+    that does not yet move the outermost ring.
+    """
+    if score.collisions:
+        return math.inf
+    total_radius = sum(c.radius for c in score.configs) / max(sum(c.radius for c in reference.configs), 1e-9)
+    return (score.max_radius / max(reference.max_radius, 1e-9)
+            - size_weight * score.avg_actual_size / max(reference.avg_actual_size, 1e-9)
+            + RADIUS_TIEBREAK * total_radius)
+
+
+def ring_candidates(configs: List[RingConfig], step: float, size_ranges: List[Tuple[float, float]],
+                    min_ring_gap: float):
+    """
+    Moves of +/- step (relative) that keep the rings ordered and sizes valid.
+
+    Every single parameter moves on its own; the radii of ring r and every
+    ring outside it also scale together, which keeps the angles (and so the
+    other rings' collision counts) of a ring-dominated layout unchanged.
+    """
+    for ring in range(1, len(configs)):
+        for factor in (1 - step, 1 + step):
+            scaled = configs[:ring] + [RingConfig(c.radius * factor, c.min_size, c.max_size) for c in configs[ring:]]
+            gaps = np.diff([c.radius for c in scaled[1:]])
+            if scaled[ring].radius > configs[ring - 1].radius + min_ring_gap * (ring > 1) and (gaps >= min_ring_gap).all():
+                yield scaled
+
+    for ring, config in enumerate(configs):
+        size_cap = size_ranges[ring][1] * MAX_SIZE_SCALE
+        for direction in (-1, 1):
+            factor = 1 + direction * step
+            moves = [
+                RingConfig(config.radius, max(config.min_size * factor, MIN_NODE_SIZE), config.max_size),
+                RingConfig(config.radius, config.min_size, min(config.max_size * factor, size_cap)),
+            ]
+            if ring > 0:
+                moves.append(RingConfig(config.radius * factor, config.min_size, config.max_size))
+            for move in moves:
+                if move == config or move.min_size > move.max_size:
+                    continue
+                if ring > 0:
+                    inner = configs[ring - 1].radius + min_ring_gap * (ring > 1)
+                    outer = configs[ring + 1].radius - min_ring_gap if ring + 1 < len(configs) else math.inf
+                    if not inner < move.radius <= outer:
+                        continue
+                yield configs[:ring] + [move] + configs[ring + 1:]
+
+
+def spread_rings(evaluator: RingEvaluator, start: List[RingConfig],
+                 max_evaluations: int = RING_SEARCH_EVALUATIONS) -> Tuple[RingScore, float]:
+    """
+    The smallest uniform radius scale that clears the start's collisions.
+
+    Grows the scale by RING_SEARCH_STEP until the rings stop colliding, then
+    bisects between the last colliding and the first clean scale down to
+    RING_SEARCH_MIN_STEP. Returns (score, scale); scale is 1 when the start
+    is already clean.
+    """
+    def scaled(factor):
+        return evaluator.evaluate([RingConfig(c.radius * factor, c.min_size, c.max_size) for c in start])
+
+    clean, lo, hi = scaled(1.0), 1.0, 1.0
+    while clean.collisions and evaluator.evaluations < max_evaluations:
+        lo, hi = hi, hi * (1 + RING_SEARCH_STEP)
+        clean = scaled(hi)
+    while clean.collisions == 0 and hi / lo - 1 > RING_SEARCH_MIN_STEP and evaluator.evaluations < max_evaluations:
+        mid = (lo + hi) / 2
+        score = scaled(mid)
+        if score.collisions:
+            lo = mid
+        else:
+            clean, hi = score, mid
+    return clean, hi
+
+
+def optimize_rings(start: List[RingConfig], size_ranges: List[Tuple[float, float]],
+                   size_weight: float = DEFAULT_SIZE_WEIGHT, min_ring_gap: float = DEFAULT_MIN_RING_GAP,
+                   max_evaluations: int = RING_SEARCH_EVALUATIONS,
+                   evaluator: Optional[RingEvaluator] = None) -> Tuple[RingScore, RingScore, RingEvaluator]:
+    """
+    Tune each ring's radius, min size and max size independently by pattern search.
+
+    Starting from a collision-free configuration (the start rings spread out
+    by the smallest uniform scale that clears them, see spread_rings), every
+    single-parameter move of the current step is tried and the best
+    improving one is kept; the step halves when none improves. Returns
+    (reference score after spreading, best score, evaluator).
+    """
+    evaluator = evaluator or RingEvaluator(get_layout_data())
+    current, _scale = spread_rings(evaluator, start, max_evaluations)
+    evaluator.accept(current)
+    reference = current
+
+    step = RING_SEARCH_STEP
+    best_value = ring_objective(current, reference, size_weight)
+    while step >= RING_SEARCH_MIN_STEP and evaluator.evaluations < max_evaluations:
+        best_move = None
+        for candidate in ring_candidates(current.configs, step, size_ranges, min_ring_gap):
+            if evaluator.evaluations >= max_evaluations:
+                break
+            score = evaluator.evaluate(candidate)
+            value = ring_objective(score, reference, size_weight)
+            if value < best_value - 1e-12:
+                best_move, best_value = score, value
+        if best_move is None:
+            step /= 2
+        else:
+            current = best_move
+            evaluator.accept(current)
+    return reference, current, evaluator
+
+
+def run_ring_search(start_gap: float, size_ranges: List[Tuple[float, float]], size_weight: float,
+                    min_ring_gap: float, max_evaluations: int, output: Optional[Path] = None) -> RingScore:
+    """Per-ring optimization from the equal-spacing configuration at start_gap, with a report."""
+    print(f"\n=== Per-ring optimization (start: equal spacing, gap={start_gap}px) ===")
+    started = time.perf_counter()
+    start = equal_spacing_configs(start_gap, size_ranges)
+    evaluator = RingEvaluator(get_layout_data())
+    initial = evaluator.evaluate(start)
+    reference, best, evaluator = optimize_rings(
+        start, size_ranges, size_weight=size_weight, min_ring_gap=min_ring_gap,
+        max_evaluations=max_evaluations, evaluator=evaluator,
+    )
+    elapsed = time.perf_counter() - started
+    print(f"Evaluated {evaluator.evaluations} candidates in {elapsed:.2f}s "
+          f"({evaluator.rings_rescored / max(evaluator.evaluations, 1):.2f} rings re-scored per candidate)\n")
+
+    print(f"{'Ring':<5} {'Radius':>8} {'MinSize':>8} {'MaxSize':>8}")
+    print("-" * 32)
+    for ring, config in enumerate(best.configs):
+        print(f"{ring:<5} {config.radius:>8.1f} {config.min_size:>8.2f} {config.max_size:>8.2f}")
+
+    print(f"\nStart: {initial.collisions} collisions, max radius {initial.max_radius:.0f}px")
+    if reference.max_radius != initial.max_radius:
+        print(f"Radii spread x{reference.max_radius / initial.max_radius:.3f} to clear collisions")
+    print(f"Collisions: {best.collisions} (after spreading: {reference.collisions})")
+    print(f"Max radius: {best.max_radius:.0f}px (after spreading: {reference.max_radius:.0f}px)")
+    print(f"Avg actual node size: {best.avg_actual_size:.2f}px (after spreading: {reference.avg_actual_size:.2f}px)")
+    crossings, reference_crossings = layout_crossings(best.configs), layout_crossings(reference.configs)
+    print(f"Edge crossings: {format_count(crossings)} (after spreading: {format_count(reference_crossings)})")
+
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump({
+                'start_gap': start_gap,
+                'size_weight': size_weight,
+                'min_ring_gap': min_ring_gap,
+                'evaluations': evaluator.evaluations,
+                'collisions': best.collisions,
+                'max_radius': best.max_radius,
+                'avg_actual_size': best.avg_actual_size,
+                'crossings': round(crossings.count),
+                'crossings_exact': crossings.exact,
+                'rings': [asdict(c) for c in best.configs],
+            }, f, indent=2)
+        print(f"\nSaved: {output}")
+    return best
+
+
+def report_current_configuration():
+    # Current configuration - Equal spacing with gap=150
+    print("\n=== Current Configuration (Equal spacing, gap=150px) ===")
+    current = [
+        RingConfig(0 * 150, 12, 12),      # Ring 0: Root
+        RingConfig(1 * 150, 3, 18),       # Ring 1: Outcomes
+        RingConfig(2 * 150, 2, 14),       # Ring 2: Coarse Domains
+        RingConfig(3 * 150, 2, 12),       # Ring 3: Fine Domains
+        RingConfig(4 * 150, 1.5, 10),     # Ring 4: Indicator Groups
+        RingConfig(5 * 150, 1, 8),        # Ring 5: Indicators
+    ]
+    coll, details = compute_collisions_with_actual_sizes(current)
+    print(f"Collisions with actual sizes: {coll}")
+    print(f"Max radius: {max(c.radius for c in current)}")
+    if details:
+        print(f"Collision details (first 5):")
+        for d in details[:5]:
+            print(f"  Layer {d['layer']}: gap={d['gap']:.2f}px, sizes={d['size1']:.1f}+{d['size2']:.1f}px")
+
+
+def format_count(crossings: CrossingCount) -> str:
+    """A crossing count, with ~ marking a sampled estimate."""
+    return f"{'' if crossings.exact else '~'}{round(crossings.count)}"
+
+
+def format_crossings(result: dict) -> str:
+    """Crossing count of a sweep result, with ~ marking a sampled estimate."""
+    return f"{'' if result['crossings_exact'] else '~'}{result['crossings']}"
+
+
+def run_sweep(gaps: List[float], size_ranges: List[Tuple[float, float]], workers: Optional[int] = None,
+              use_cache: bool = True, refine: bool = True,
+              tolerance: float = REFINE_TOLERANCE) -> List[dict]:
+    """Run the equal-spacing gap sweep, optionally refining the best gap by bisection."""
+    # Optimization with equal spacing - test different gaps
+    print("\n=== Running Optimization (equal spacing, varying gap) ===")
+    runner = SweepRunner(size_ranges, workers=workers, cache_dir=CACHE_DIR if use_cache else None)
+    runner.evaluate(gaps)
+    if refine:
+        runner.refine(tolerance)
+
+    results = list(runner.results.values())
+    for r in results:
+        r['configs'] = equal_spacing_configs(r['gap'], size_ranges)
+
+    # Sort by collisions, then radius (smallest)
+    results.sort(key=lambda x: (x['collisions'], x['max_radius']))
+
+    print(f"Tested {len(results)} configurations "
+          f"(ring collisions: {runner.rings_cached} cached, {runner.rings_computed} computed)\n")
+    print(f"{'Rank':<5} {'Coll':<6} {'MaxRad':<8} {'AvgSize':<8} {'Gap':<8}")
+    print("-" * 45)
+
+    for i, r in enumerate(results[:20]):
+        print(f"{i+1:<5} {r['collisions']:<6} {r['max_radius']:<8.0f} {r['avg_actual_size']:<8.2f} {r['gap']:<8}")
+
+    crossings = sorted({format_crossings(r) for r in results})
+    if len(crossings) == 1:
+        print(f"\nEdge crossings: {crossings[0]} at every gap (equal spacing keeps the node angles)")
+    else:
+        print(f"\nEdge crossings vary by gap: {', '.join(crossings)}")
+
+    # Find smallest radius with 0 collisions
+    zero_coll = [r for r in results if r['collisions'] == 0]
+    if zero_coll:
+        best = min(zero_coll, key=lambda x: x['max_radius'])
+        print(f"\n=== SMALLEST GAP WITH 0 COLLISIONS ===")
+        print(f"Ring gap: {best['gap']}px")
+        print(f"Max radius: {best['max_radius']:.0f}px")
+        print(f"Avg actual node size: {best['avg_actual_size']:.2f}px")
+        print("\nSet DEFAULT_RING_GAP in App.tsx to:", best['gap'])
+    else:
+        print("\n=== NO CONFIGURATION WITH 0 COLLISIONS FOUND ===")
+        # Find best compromise
+        best = results[0]
+        print(f"Best found: {best['collisions']} collisions at gap={best['gap']}px")
+
+    # Also show a few options for user to choose
+    print("\n=== OPTIONS FOR USER ===")
+    print("(Choose based on preference for compactness vs collision-free)")
+    for r in results[:10]:
+        status = "0 collisions" if r['collisions'] == 0 else f"{r['collisions']} collisions"
+        print(f"  gap={r['gap']}px: max_radius={r['max_radius']:.0f}px, {status}")
+
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+
+    sweep = commands.add_parser('sweep', help='Equal-spacing ring gap sweep (default)')
+    sweep.add_argument('--gaps', type=float, nargs='+', default=SWEEP_GAPS,
+                       help='Coarse gap values to evaluate (px)')
+    sweep.add_argument('--workers', type=int, default=None,
+                       help='Worker processes (default: CPU count, 1 = serial)')
+    sweep.add_argument('--no-cache', action='store_true', help='Ignore and do not write the on-disk cache')
+    sweep.add_argument('--no-refine', action='store_true', help='Skip bisection refinement of the best gap')
+    sweep.add_argument('--tolerance', type=float, default=REFINE_TOLERANCE,
+                       help='Bisection stops when the gap bracket is this narrow (px)')
+
+    rings = commands.add_parser('rings', help='Tune each ring\'s radius and size range independently')
+    rings.add_argument('--start-gap', type=float, default=150, help='Equal-spacing gap to start from (px)')
+    rings.add_argument('--size-weight', type=float, default=DEFAULT_SIZE_WEIGHT,
+                       help='Weight of average node size against max radius (both relative to the start)')
+    rings.add_argument('--min-ring-gap', type=float, default=DEFAULT_MIN_RING_GAP,
+                       help='Smallest gap between adjacent rings beyond ring 1 (px)')
+    rings.add_argument('--max-evaluations', type=int, default=RING_SEARCH_EVALUATIONS,
+                       help='Candidate configurations to evaluate at most')
+    rings.add_argument('--output', type=Path, help='Write the best configuration to this JSON file')
+
+    # 'sweep' is the default command, so bare flags apply to it
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0] not in commands.choices and argv[0] not in ('-h', '--help')):
+        argv = ['sweep'] + argv
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("Nodes per layer:", get_layout_data().nodes_per_layer)
+
+    if args.command == 'sweep':
+        report_current_configuration()
+        run_sweep(
+            [int(g) if float(g).is_integer() else g for g in args.gaps],
+            SIZE_RANGES,
+            workers=args.workers,
+            use_cache=not args.no_cache,
+            refine=not args.no_refine,
+            tolerance=args.tolerance,
+        )
+    elif args.command == 'rings':
+        run_ring_search(args.start_gap, SIZE_RANGES, args.size_weight, args.min_ring_gap,
+                        args.max_evaluations, args.output)
+
+
+if __name__ == "__main__":
+    main()
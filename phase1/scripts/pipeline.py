@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Content-hash build pipeline for the generated data.
+
+Declares the regeneration steps as a DAG of stages, each with the files it
+reads, the files it writes, the upstream stages whose results it takes and
+the scripts its behaviour depends on:
+
+    load -> aggregate -> normalize -> write_outputs -> layout_sweep
+                                                   -> precompute_variants
+
+A stage's key is the hash of its code (each script it runs and every
+scripts/ module those import), its input files and its upstream results. A stage whose key matches the last run and whose outputs are still
+as it left them is skipped; otherwise it runs and its result is pickled
+under .cache/pipeline, so downstream stages can reuse it later without the
+upstream running again. An upstream stage that reruns but produces the same
+result does not invalidate anything below it.
+
+--watch polls the input files and scripts and reruns the pipeline when one
+changes; only the stages downstream of the change see a new key.
+
+precompute_variants writes to precompute_graphs.OUTPUT_DIR under .cache, not
+to the shipped public/data/precompute variants (see precompute_graphs).
+
+The visualization file is both read (load) and rewritten with importance
+fields (write_outputs). load therefore keys on viz_source_digest, the file
+without those fields, so rewriting them does not make load stale again;
+any other edit to the file still reruns it.
+
+Usage:
+    python scripts/pipeline.py                 # run stale stages
+    python scripts/pipeline.py --dry-run       # show what would run
+    python scripts/pipeline.py --force         # rerun everything
+    python scripts/pipeline.py --watch         # rerun on changes
+"""
+
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import pickle
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import compute_shap_importance as csi
+import optimize_layout as layout
+import precompute_graphs
+from data_cache import SHAP_FILE, VIZ_FILE, file_hash
+from json_stream import write_atomic
+from instrumentation import StageRecorder
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+SCRIPTS_DIR = Path(__file__).parent
+CACHE_DIR = BASE_DIR / ".cache" / "pipeline"
+STATE_FILE = CACHE_DIR / "state.json"
+ARTIFACT_DIR = CACHE_DIR / "artifacts"
+LOG_DIR = CACHE_DIR / "logs"
+SWEEP_REPORT = CACHE_DIR / "layout_sweep.json"
+
+PIPELINE_VERSION = 2  # Bump to invalidate every stage
+WATCH_INTERVAL = 1.0  # Seconds between polls
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[Dict[str, Any]], Any]  # Gets {upstream stage: result}, returns this stage's result
+    inputs: Tuple[Path, ...] = ()         # Files read
+    digests: Tuple[Tuple[Path, Callable[[Path], str]], ...] = ()  # Files read, keyed on part of their contents
+    outputs: Tuple[Path, ...] = ()        # Files written
+    after: Tuple[str, ...] = ()           # Upstream stages whose results it takes
+    code: Tuple[str, ...] = ()            # Scripts (in scripts/) the stage runs
+
+
+# Stage bodies: thin wrappers over the scripts' own functions
+
+def _load(_upstream):
+    return csi.load_data()
+
+
+def _aggregate(upstream):
+    shap_scores, viz_data = upstream['load']
+    nodes_by_id, hierarchy = csi.build_hierarchy(viz_data)
+    return csi.compute_hierarchical_shap(shap_scores, nodes_by_id, hierarchy)
+
+
+def _normalize(upstream):
+    return csi.normalize_shap(upstream['aggregate'])
+
+
+def _write_outputs(upstream):
+    _shap_scores, viz_data = upstream['load']
+    normalized, max_shap = upstream['normalize']
+    nodes_by_id, _hierarchy = csi.build_hierarchy(viz_data)
+    validation = csi.generate_outputs(viz_data, normalized, upstream['aggregate'], {}, max_shap, nodes_by_id)
+    if not csi.run_validation_checks(normalized, nodes_by_id):
+        raise RuntimeError("importance validation checks failed")
+    return validation['summary']
+
+
+def _layout_sweep(_upstream):
+    layout._layout_data = None  # The visualization file may have changed since it was loaded
+    layout._subtree_extents.cache_clear()
+    results = layout.run_sweep(layout.SWEEP_GAPS, layout.SIZE_RANGES)
+    report = [{k: v for k, v in r.items() if k != 'configs'} for r in results]
+    SWEEP_REPORT.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(SWEEP_REPORT, [json.dumps(report, indent=2)])
+    return report
+
+
+def _precompute_variants(_upstream):
+    return precompute_graphs.run_precompute(output_dir=precompute_graphs.OUTPUT_DIR)
+
+
+IMPORTANCE_FIELDS = ('importance', 'shap_raw')  # Node fields write_outputs sets in the visualization file
+
+
+def viz_source_digest(path: Path) -> str:
+    """Hash of the visualization file with the IMPORTANCE_FIELDS left out."""
+    with open(path) as f:
+        viz_data = json.load(f)
+    viz_data['nodes'] = [{k: v for k, v in node.items() if k not in IMPORTANCE_FIELDS} for node in viz_data['nodes']]
+    return hashlib.sha256(json.dumps(viz_data, sort_keys=True).encode()).hexdigest()
+
+
+IMPORTANCE_OUTPUTS = tuple(csi.OUTPUT_DIR / name for name in (
+    "viz_importance_metadata.json", "shap_importance_validation.json", "shap_importance_summary.md",
+))
+
+# Each entry script followed by every scripts/ module it imports, directly or not
+IMPORTANCE_CODE = ('compute_shap_importance.py', 'data_cache.py', 'hierarchy.py', 'instrumentation.py',
+                   'json_stream.py')
+LAYOUT_CODE = ('optimize_layout.py', 'data_cache.py', 'edge_crossings.py', 'hierarchy.py', 'json_stream.py',
+               'radial_layout.py')
+PRECOMPUTE_CODE = ('precompute_graphs.py', 'bake_layout.py', 'causal_layers.py', 'centrality.py', 'data_cache.py',
+                   'edge_crossings.py', 'hierarchy.py', 'json_stream.py', 'node_selection.py', 'optimize_layout.py',
+                   'radial_layout.py', 'synthetic_data.py')
+
+STAGES = [
+    Stage('load', _load, inputs=(SHAP_FILE,), digests=((VIZ_FILE, viz_source_digest),), code=IMPORTANCE_CODE),
+    Stage('aggregate', _aggregate, after=('load',), code=IMPORTANCE_CODE),
+    Stage('normalize', _normalize, after=('aggregate',), code=IMPORTANCE_CODE),
+    Stage('write_outputs', _write_outputs, outputs=(VIZ_FILE,) + IMPORTANCE_OUTPUTS,
+          after=('load', 'aggregate', 'normalize'), code=IMPORTANCE_CODE),
+    Stage('layout_sweep', _layout_sweep, inputs=(VIZ_FILE,), outputs=(SWEEP_REPORT,), code=LAYOUT_CODE),
+    Stage('precompute_variants', _precompute_variants, inputs=(VIZ_FILE,),
+          outputs=(precompute_graphs.OUTPUT_DIR / "SUMMARY.json",), code=PRECOMPUTE_CODE),
+]
+
+
+def check_stages(stages: List[Stage]):
+    """Every stage must come after the stages whose results it takes."""
+    seen = set()
+    for stage in stages:
+        missing = [name for name in stage.after if name not in seen]
+        if missing:
+            raise ValueError(f"stage {stage.name} is listed before {', '.join(missing)}")
+        seen.add(stage.name)
+
+
+class HashCache:
+    """File hashes (file_hash or another digest), recomputed only when a file's size or mtime changes."""
+
+    def __init__(self):
+        self._hashes: Dict[Tuple[Path, Callable], Tuple[Tuple[int, int], str]] = {}
+
+    def __call__(self, path: Path, digest: Callable[[Path], str] = file_hash) -> Optional[str]:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        signature = (stat.st_size, stat.st_mtime_ns)
+        cached = self._hashes.get((path, digest))
+        if cached is None or cached[0] != signature:
+            cached = self._hashes[path, digest] = (signature, digest(path))
+        return cached[1]
+
+
+class Pipeline:
+    """Runs the stages in order, skipping those whose key and outputs are unchanged."""
+
+    def __init__(self, stages: List[Stage] = STAGES, verbose: bool = False):
+        check_stages(stages)
+        self.stages = stages
+        self.verbose = verbose
+        self.hashes = HashCache()
+        self.state = self._load_state()
+
+    @staticmethod
+    def _load_state() -> dict:
+        if STATE_FILE.exists():
+            with open(STATE_FILE) as f:
+                state = json.load(f)
+            if state.get('version') == PIPELINE_VERSION:
+                return state
+        return {'version': PIPELINE_VERSION, 'stages': {}}
+
+    def _save_state(self):
+        STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = STATE_FILE.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        tmp.replace(STATE_FILE)
+
+    def stage_key(self, stage: Stage) -> Optional[str]:
+        """Hash of the stage's code, input files and upstream results; None while an upstream has none."""
+        upstream = [self.state['stages'].get(name, {}).get('result_hash') for name in stage.after]
+        if None in upstream:
+            return None
+        payload = {
+            'stage': stage.name,
+            'code': {name: self.hashes(SCRIPTS_DIR / name) for name in stage.code},
+            'inputs': {str(path): self.hashes(path) for path in stage.inputs},
+            'digests': {str(path): self.hashes(path, digest) for path, digest in stage.digests},
+            'upstream': dict(zip(stage.after, upstream)),
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def is_fresh(self, stage: Stage, key: Optional[str]) -> bool:
+        recorded = self.state['stages'].get(stage.name)
+        if key is None or recorded is None or recorded['key'] != key:
+            return False
+        if not (ARTIFACT_DIR / f"{stage.name}.pkl").exists():
+            return False
+        return all(self.hashes(path) == recorded['outputs'].get(str(path)) for path in stage.outputs)
+
+    def _result(self, name: str, results: Dict[str, Any]):
+        if name not in results:
+            with open(ARTIFACT_DIR / f"{name}.pkl", 'rb') as f:
+                results[name] = pickle.load(f)
+        return results[name]
+
+    def run(self, force: bool = False, dry_run: bool = False) -> List[str]:
+        """Run every stale stage (all of them with force). Returns the names of the stages run."""
+        recorder = StageRecorder()
+        results: Dict[str, Any] = {}
+        ran = []
+        for stage in self.stages:
+            key = self.stage_key(stage)
+            if not force and self.is_fresh(stage, key):
+                print(f"  [skip] {stage.name}")
+                continue
+            if dry_run:
+                # Upstream results are unknown until they run, so everything below a stale stage may run
+                print(f"  [stale] {stage.name}")
+                self.state['stages'].pop(stage.name, None)
+                ran.append(stage.name)
+                continue
+
+            print(f"  [run]  {stage.name}")
+            upstream = {name: self._result(name, results) for name in stage.after}
+            log = io.StringIO()
+            with recorder.stage(stage.name):
+                with contextlib.redirect_stdout(sys.stdout if self.verbose else log):
+                    result = stage.run(upstream)
+            LOG_DIR.mkdir(parents=True, exist_ok=True)
+            (LOG_DIR / f"{stage.name}.log").write_text(log.getvalue())
+
+            data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+            (ARTIFACT_DIR / f"{stage.name}.pkl").write_bytes(data)
+            results[stage.name] = result
+            self.state['stages'][stage.name] = {
+                'key': key,
+                'result_hash': hashlib.sha256(data).hexdigest(),
+                'outputs': {str(path): self.hashes(path) for path in stage.outputs},
+                'finished': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            self._save_state()
+            ran.append(stage.name)
+
+        if dry_run:
+            self.state = self._load_state()
+        elif ran:
+            recorder.print_summary()
+        return ran
+
+    def watched_files(self) -> List[Path]:
+        files = {path for stage in self.stages for path in stage.inputs}
+        files |= {path for stage in self.stages for path, _digest in stage.digests}
+        files |= {SCRIPTS_DIR / name for stage in self.stages for name in stage.code}
+        return sorted(files)
+
+    def watch(self, interval: float = WATCH_INTERVAL):
+        """Run, then poll the watched files and rerun whenever one changes (Ctrl-C to stop)."""
+        def snapshot():
+            signatures = {}
+            for path in self.watched_files():
+                try:
+                    stat = path.stat()
+                    signatures[path] = (stat.st_size, stat.st_mtime_ns)
+                except FileNotFoundError:
+                    signatures[path] = None
+            return signatures
+
+        self.run()
+        seen = snapshot()
+        print(f"\nWatching {len(seen)} files (Ctrl-C to stop)...")
+        try:
+            while True:
+                time.sleep(interval)
+                current = snapshot()
+                changed = [path for path in current if current[path] != seen.get(path)]
+                if not changed:
+                    continue
+                print(f"\nChanged: {', '.join(path.name for path in changed)}")
+                self.run()
+                # Files the run itself rewrote are not changes to react to
+                seen = snapshot()
+        except KeyboardInterrupt:
+            print("\nStopped watching")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the data files, rerunning only stale stages")
+    parser.add_argument('--force', action='store_true', help='Rerun every stage')
+    parser.add_argument('--dry-run', action='store_true', help='Only report which stages are stale')
+    parser.add_argument('--watch', action='store_true', help='Keep running and rerun when inputs change')
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL, help='Watch poll interval (s)')
+    parser.add_argument('--verbose', action='store_true', help='Show stage output (always saved to logs)')
+    args = parser.parse_args()
+
+    pipeline = Pipeline(verbose=args.verbose)
+    if args.watch:
+        pipeline.watch(args.interval)
+        return True
+    print("Running pipeline...")
+    ran = pipeline.run(force=args.force, dry_run=args.dry_run)
+    print(f"\n{len(ran)} of {len(pipeline.stages)} stages {'stale' if args.dry_run else 'run'}; "
+          f"logs in {LOG_DIR}")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
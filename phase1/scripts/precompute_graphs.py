@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Generate precompute graph variants from v2_1_visualization_final.json.
+
+Each variant keeps the top-N causal nodes under one ranking method
+(composite, shap, pagerank, betweenness, degree), optionally balanced across
+domains or with Governance capped at a share of N, and groups the causal
+layers into display bands holding similar numbers of the selected nodes.
+Nodes carry baked x/y for those bands (see bake_layout.position_variant).
+
+This script:
+1. Loads the visualization data and computes every centrality once
+2. Computes longest-path causal layers over the causal edges (see causal_layers)
+3. Builds the variants in parallel, skipping those whose inputs and config are unchanged
+4. Rewrites SUMMARY.json
+
+Output goes to .cache/precompute/out by default. The variants shipped in
+public/data/precompute were built from a larger upstream graph, so a run
+over v2_1 should not replace them unless --output-dir says so.
+
+A Governance cap that never binds (Governance already within the cap in
+the top N) would reproduce the uncapped variant byte for byte. Such a cap
+variant is not written when its uncapped variant is in the grid; its
+SUMMARY.json entry points at the uncapped file with "cap_binds": false and
+"same_as" naming that file.
+
+Variants, the manifest and SUMMARY.json are written atomically (see
+json_stream.write_atomic), so an interrupted run never leaves a truncated
+file for the next run's up-to-date check to trust.
+
+Usage:
+    python scripts/precompute_graphs.py [--workers N] [--force] [--output-dir DIR]
+"""
+
+import argparse
+import hashlib
+import json
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from bake_layout import position_variant
+from causal_layers import balanced_bands, longest_path_layers
+from centrality import build_causal_graph, compute_all, describe_betweenness
+from data_cache import VIZ_FILE, file_hash
+from json_stream import write_atomic
+from node_selection import rank_nodes
+
+# Paths
+BASE_DIR = Path(__file__).parent.parent
+OUTPUT_DIR = BASE_DIR / ".cache" / "precompute" / "out"
+MANIFEST_FILE = BASE_DIR / ".cache" / "precompute" / "manifest.json"
+
+GENERATOR_VERSION = 5  # Bump to force every variant to rebuild
+GOVERNANCE_DOMAIN = "Governance"
+
+# Variant grid: (nodes, layers, method, balance, gov_cap)
+VARIANT_GRID = [
+    (20, 2, 'composite', False, None),
+    (30, 2, 'composite', False, None),
+    (30, 5, 'composite', False, None),
+    (50, 2, 'composite', False, None),
+    (50, 3, 'composite', False, None),
+    (50, 5, 'composite', False, None),
+    (100, 2, 'composite', False, None),
+    (100, 3, 'composite', False, None),
+    (100, 5, 'composite', False, None),
+    (100, 21, 'composite', False, None),
+    (200, 2, 'composite', False, None),
+    (200, 3, 'composite', False, None),
+    (200, 5, 'composite', False, None),
+    (200, 21, 'composite', False, None),
+    (290, 2, 'composite', False, None),
+    (290, 5, 'composite', False, None),
+    (290, 21, 'composite', False, None),
+    (500, 5, 'composite', False, None),
+    (500, 21, 'composite', False, None),
+    (1000, 21, 'composite', False, None),
+    (100, 2, 'shap', False, None),
+    (100, 5, 'shap', False, None),
+    (100, 21, 'shap', False, None),
+    (200, 5, 'shap', False, None),
+    (200, 21, 'shap', False, None),
+    (290, 5, 'shap', False, None),
+    (290, 21, 'shap', False, None),
+    (500, 5, 'shap', False, None),
+    (1000, 21, 'shap', False, None),
+    (100, 5, 'betweenness', False, None),
+    (200, 5, 'betweenness', False, None),
+    (290, 5, 'betweenness', False, None),
+    (500, 5, 'betweenness', False, None),
+    (1000, 21, 'betweenness', False, None),
+    (100, 5, 'pagerank', False, None),
+    (200, 5, 'pagerank', False, None),
+    (100, 5, 'degree', False, None),
+    (30, 2, 'shap', True, None),
+    (100, 5, 'composite', True, None),
+    (200, 5, 'composite', True, None),
+    (290, 5, 'composite', True, None),
+    (500, 5, 'composite', True, None),
+    (30, 2, 'composite', False, 0.3),
+    (100, 5, 'composite', False, 0.3),
+    (200, 5, 'composite', False, 0.3),
+    (290, 5, 'composite', False, 0.3),
+    (100, 5, 'composite', False, 0.4),
+    (200, 5, 'composite', False, 0.4),
+    (290, 5, 'composite', False, 0.4),
+    (200, 5, 'composite', False, 0.5),
+    (290, 5, 'composite', False, 0.5),
+]
+
+
+def variant_config(nodes, layers, method, balance=False, gov_cap=None):
+    return {"nodes": nodes, "layers": layers, "method": method, "balance": balance, "gov_cap": gov_cap}
+
+
+def variant_filename(config):
+    """graph_XXXXn_YYl_<method>[_balanced|_govcapNN].json"""
+    name = f"graph_{config['nodes']:04d}n_{config['layers']:02d}l_{config['method']}"
+    if config['balance']:
+        name += "_balanced"
+    if config['gov_cap'] is not None:
+        name += f"_govcap{round(config['gov_cap'] * 100)}"
+    return name + ".json"
+
+
+def load_context(viz_file=VIZ_FILE, betweenness_samples=None, max_nodes=None):
+    """
+    Everything the variants share: node table, causal edges, layers and every ranking.
+
+    Each ranking's selection heads cover variants of up to max_nodes nodes
+    (every node when None).
+    """
+    print("Loading data...")
+    with open(viz_file) as f:
+        viz_data = json.load(f)
+    graph = build_causal_graph(viz_data)
+    print(f"  Causal graph: {graph.num_nodes} nodes, {graph.num_edges} edges")
+    lags = {(str(e['source']), str(e['target'])): e.get('lag', 0) or 0
+            for e in viz_data['edges'] if e.get('relationship') == 'causal'}
+
+    nodes_by_id = {str(n['id']): n for n in viz_data['nodes']}
+    print("Computing centrality...")
+    shap = [nodes_by_id[node_id].get('importance', 0) or 0 for node_id in graph.ids]
+    print(f"  Betweenness: {describe_betweenness(graph.num_nodes, betweenness_samples)}")
+    metrics = compute_all(graph, shap, betweenness_samples=betweenness_samples)
+    layering = longest_path_layers(graph)
+    causal_layer = layering.layer.tolist()
+    print(f"  Causal layers: {layering.num_layers}")
+    if len(layering.cyclic):
+        cycle = ' -> '.join(graph.ids[row] for row in layering.cycle + layering.cycle[:1])
+        print(f"  WARNING: {len(layering.cyclic)} nodes on or below causal cycles, e.g. {cycle}")
+
+    in_degree = graph.in_degree.tolist()
+    out_degree = graph.out_degree.tolist()
+    nodes = {}
+    for row, node_id in enumerate(graph.ids):
+        node = nodes_by_id[node_id]
+        nodes[node_id] = {
+            "id": node_id,
+            "label": node['label'],
+            "causal_layer": causal_layer[row],
+            "domain": node.get('domain') or "Mixed",
+            "is_outcome": out_degree[row] == 0,
+            "in_degree": in_degree[row],
+            "out_degree": out_degree[row],
+        }
+
+    ids = graph.ids
+    metrics = {name: dict(zip(ids, values.tolist())) for name, values in metrics.items()}
+    domains = {node_id: node['domain'] for node_id, node in nodes.items()}
+    limit = len(ids) if max_nodes is None else max_nodes
+    return {
+        "ids": ids,
+        "nodes": nodes,
+        "edges": [
+            (ids[s], ids[t], w, lags[ids[s], ids[t]])
+            for s, t, w in zip(graph.edge_sources().tolist(), graph.indices.tolist(), graph.weights.tolist())
+        ],
+        "metrics": metrics,
+        "selections": {name: rank_nodes(ids, scores, domains, limit) for name, scores in metrics.items()},
+        "num_causal_layers": layering.num_layers,
+    }
+
+
+def select_nodes(context, config):
+    """Pick node ids for a variant, best score first (see node_selection)."""
+    selection = context['selections'][config['method']]
+    n = config['nodes']
+    if config['balance']:
+        return selection.balanced(n)
+    if config['gov_cap'] is not None:
+        # Cap Governance within the top-N; the dropped slots are not refilled
+        return selection.capped(n, GOVERNANCE_DOMAIN, config['gov_cap'])
+    return selection.top(n)
+
+
+def uncapped_filename(config):
+    return variant_filename(dict(config, gov_cap=None))
+
+
+def cap_binds(context, config):
+    """Whether the Governance cap drops any node from the variant's top N."""
+    selection = context['selections'][config['method']]
+    return len(select_nodes(context, config)) < len(selection.top(config['nodes']))
+
+
+def build_variant(context, config):
+    """Assemble one variant's JSON payload."""
+    selected = select_nodes(context, config)
+    chosen = set(selected)
+    scores = context['metrics'][config['method']]
+
+    layer_sizes = Counter(context['nodes'][node_id]['causal_layer'] for node_id in selected)
+    bands = balanced_bands([layer_sizes[layer] for layer in range(context['num_causal_layers'])],
+                           config['layers'])
+    band_of = {layer: i for i, band in enumerate(bands) for layer in band}
+
+    out_nodes = []
+    for node_id in selected:
+        node = dict(context['nodes'][node_id])
+        band = band_of[node['causal_layer']]
+        node['score'] = scores[node_id]
+        node['display_layer'] = band
+        node['band_size'] = len(bands[band])
+        out_nodes.append({key: node[key] for key in (
+            "id", "label", "causal_layer", "domain", "score", "is_outcome",
+            "in_degree", "out_degree", "display_layer", "band_size"
+        )})
+
+    out_edges = [
+        {"source": s, "target": t, "weight": w, "lag": lag}
+        for s, t, w, lag in context['edges'] if s in chosen and t in chosen
+    ]
+
+    distribution = Counter(n['domain'] for n in out_nodes)
+    total = len(out_nodes)
+    percentages = {d: round(100 * c / total, 1) for d, c in distribution.items()} if total else {}
+
+    return position_variant({
+        "metadata": {
+            "config": config,
+            "node_count": total,
+            "edge_count": len(out_edges),
+            "domain_distribution": dict(distribution),
+            "domain_percentages": percentages,
+            "governance_pct": percentages.get(GOVERNANCE_DOMAIN, 0.0),
+            "layer_bands": bands,
+        },
+        "nodes": out_nodes,
+        "edges": out_edges,
+    })
+
+
+def summary_entry(filename, payload):
+    meta = payload['metadata']
+    return {
+        "filename": filename,
+        "nodes": meta['node_count'],
+        "edges": meta['edge_count'],
+        "governance_pct": meta['governance_pct'],
+        "config": meta['config'],
+    }
+
+
+def config_hash(config, input_hash):
+    payload = json.dumps({"config": config, "input": input_hash, "version": GENERATOR_VERSION}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Set once per worker process by _init_worker so the context is not re-sent per task
+_context = None
+
+
+def _init_worker(context):
+    global _context
+    _context = context
+
+
+def _build_and_write(config, output_dir, grid_files):
+    filename = variant_filename(config)
+    payload = build_variant(_context, config)
+    entry = summary_entry(filename, payload)
+    if config['gov_cap'] is not None:
+        entry['cap_binds'] = cap_binds(_context, config)
+        if not entry['cap_binds'] and uncapped_filename(config) in grid_files:
+            # Same nodes as the uncapped variant, which the grid writes anyway
+            return filename, dict(entry, filename=uncapped_filename(config), same_as=uncapped_filename(config))
+    write_atomic(Path(output_dir) / filename, [json.dumps(payload, indent=2)])
+    return filename, entry
+
+
+def load_manifest():
+    if MANIFEST_FILE.exists():
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def save_manifest(manifest):
+    MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    write_atomic(MANIFEST_FILE, [json.dumps(manifest, indent=2)])
+
+
+def run_precompute(grid=VARIANT_GRID, output_dir=OUTPUT_DIR, workers=None, force=False, viz_file=VIZ_FILE,
+                   betweenness_samples=None):
+    """Build every variant in the grid and rewrite SUMMARY.json. Returns the summary."""
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    configs = [variant_config(*row) for row in grid]
+    input_hash = file_hash(viz_file)
+    if betweenness_samples is not None:
+        input_hash += f":betweenness_samples={betweenness_samples}"
+    manifest = load_manifest()
+    key_prefix = str(output_dir.resolve())
+
+    summary = {}
+    pending = []
+    for config in configs:
+        filename = variant_filename(config)
+        entry = manifest.get(f"{key_prefix}/{filename}")
+        if (not force and entry and entry['hash'] == config_hash(config, input_hash)
+                and (output_dir / entry['summary']['filename']).exists()):
+            summary[filename] = entry['summary']
+        else:
+            pending.append(config)
+
+    print(f"Variants: {len(configs)} total, {len(configs) - len(pending)} up to date, {len(pending)} to build")
+
+    if pending:
+        grid_files = {variant_filename(config) for config in configs}
+        context = load_context(viz_file, betweenness_samples, max(config['nodes'] for config in pending))
+        print("\nBuilding variants...")
+        if workers == 1 or len(pending) == 1:
+            _init_worker(context)
+            built = [_build_and_write(config, output_dir, grid_files) for config in pending]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(context,)) as pool:
+                built = list(pool.map(_build_and_write, pending, [output_dir] * len(pending),
+                                      [grid_files] * len(pending)))
+
+        for config, (filename, entry) in zip(pending, built):
+            summary[filename] = entry
+            manifest[f"{key_prefix}/{filename}"] = {"hash": config_hash(config, input_hash), "summary": entry}
+            if 'same_as' in entry:
+                print(f"  Skipped {filename}: Governance cap does not bind, same as {entry['same_as']}")
+            else:
+                print(f"  Wrote {filename}: {entry['nodes']} nodes, {entry['edges']} edges")
+        save_manifest(manifest)
+
+    ordered = [summary[variant_filename(config)] for config in configs]
+    written = write_atomic(output_dir / "SUMMARY.json", [json.dumps(ordered, indent=2)])
+    print(f"\n{'Updated' if written else 'Unchanged'}: {output_dir / 'SUMMARY.json'}")
+    return ordered
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate precompute graph variants")
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count, 1 = serial)')
+    parser.add_argument('--force', action='store_true', help='Rebuild every variant even if unchanged')
+    parser.add_argument('--output-dir', type=Path, default=OUTPUT_DIR, help='Where to write the variants')
+    parser.add_argument('--betweenness-samples', type=int, default=None,
+                        help='Estimate betweenness from this many sampled sources (default: exact)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Precompute Graph Variants")
+    print("=" * 60)
+    run_precompute(output_dir=args.output_dir, workers=args.workers, force=args.force,
+                   betweenness_samples=args.betweenness_samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Load-test the query service and report latency percentiles.
+
+Opens --concurrency keep-alive connections and sends --requests GET
+requests between them, drawn from a fixed mix of subtree, neighbour and
+importance queries over random node ids (a --revalidate share resends a
+query with the ETag it got back, expecting 304). Node ids come from the same
+data file the service loads. Latency is measured per request from send to
+the end of the response body, and reported per query type as p50 / p90 /
+p99 / max, with throughput, status codes and the service's cache hit rate.
+
+With --start the service is launched as a subprocess on --port first and
+stopped afterwards; otherwise it must already be running.
+
+Usage:
+    python scripts/query_load_test.py --start [--requests 20000] [--concurrency 32]
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from data_cache import CACHE_DIR as COLUMNAR_CACHE_DIR, VIZ_FILE, load_viz_columns
+from query_service import DEFAULT_HOST, DEFAULT_PORT
+
+DEFAULT_REQUESTS = 20000
+DEFAULT_CONCURRENCY = 32
+REVALIDATE_SHARE = 0.1  # Share of requests repeated with If-None-Match
+STARTUP_TIMEOUT = 120  # Seconds to wait for a started service to answer /health
+
+# (query type, share of requests)
+QUERY_MIX = (
+    ('neighbours', 0.45),
+    ('importance', 0.35),
+    ('subtree', 0.20),
+)
+
+
+def query_paths(ids: List[str], layers: np.ndarray, count: int, seed: int) -> List[Tuple[str, str]]:
+    """(query type, path) for count random queries following QUERY_MIX."""
+    rng = random.Random(seed)
+    inner = [node_id for node_id, layer in zip(ids, layers.tolist()) if 1 <= layer <= 3]  # Non-trivial subtrees
+    kinds = rng.choices([kind for kind, _ in QUERY_MIX], weights=[share for _, share in QUERY_MIX], k=count)
+    paths = []
+    for kind in kinds:
+        if kind == 'neighbours':
+            direction = rng.choice(('out', 'in', 'both'))
+            paths.append((kind, f"/neighbours/{quote(rng.choice(ids), safe='')}?k={rng.choice((5, 10, 25))}"
+                                f"&direction={direction}"))
+        elif kind == 'importance':
+            batch = ','.join(quote(node_id, safe='') for node_id in rng.sample(ids, rng.choice((1, 1, 1, 5))))
+            paths.append((kind, f"/importance/{batch}"))
+        else:
+            paths.append((kind, f"/subtree/{quote(rng.choice(inner or ids), safe='')}?depth={rng.choice((1, 2))}"))
+    return paths
+
+
+async def fetch(reader, writer, host: str, path: str, etag: Optional[str] = None):
+    """One keep-alive GET. Returns (status, headers, body)."""
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+    if etag:
+        request += f"If-None-Match: {etag}\r\n"
+    writer.write((request + "\r\n").encode('latin-1'))
+    await writer.drain()
+    head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+    headers = {}
+    for line in head[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return int(head[0].split(' ')[1]), headers, body
+
+
+async def worker(host: str, port: int, queue: asyncio.Queue, revalidate: float, seed: int, results: list):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            try:
+                kind, path = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            status, headers, _body = await fetch(reader, writer, host, path)
+            results.append((kind, status, headers.get('x-cache'), time.perf_counter() - start))
+            if status == 200 and 'etag' in headers and rng.random() < revalidate:
+                start = time.perf_counter()
+                status, headers, _body = await fetch(reader, writer, host, path, headers['etag'])
+                results.append(('revalidate', status, headers.get('x-cache'), time.perf_counter() - start))
+    finally:
+        writer.close()
+
+
+async def run_load(host: str, port: int, paths: List[Tuple[str, str]], concurrency: int, revalidate: float,
+                   seed: int):
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in paths:
+        queue.put_nowait(item)
+    results: list = []
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(host, port, queue, revalidate, seed + i, results) for i in range(concurrency)))
+    return results, time.perf_counter() - start
+
+
+async def wait_for_service(host: str, port: int, timeout: float, process: Optional[subprocess.Popen] = None):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"service exited with code {process.returncode}")
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+        except OSError:
+            await asyncio.sleep(0.2)
+            continue
+        try:
+            status, _headers, body = await fetch(reader, writer, host, "/health")
+        finally:
+            writer.close()
+        if status == 200:
+            return json.loads(body)
+    raise TimeoutError(f"no answer from http://{host}:{port}/health within {timeout}s")
+
+
+def percentiles_ms(latencies: List[float]) -> Dict[str, float]:
+    values = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {'count': len(values), 'p50': p50, 'p90': p90, 'p99': p99, 'max': values.max()}
+
+
+def print_report(results, seconds: float):
+    by_kind = defaultdict(list)
+    for kind, _status, _cache, latency in results:
+        by_kind[kind].append(latency)
+    by_kind['all'] = [latency for _kind, _status, _cache, latency in results]
+
+    print(f"\n{len(results)} requests in {seconds:.2f}s ({len(results) / seconds:.0f} req/s)")
+    print(f"{'Query':<12} {'Count':>7} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    print("-" * 56)
+    for kind in [kind for kind, _ in QUERY_MIX] + ['revalidate', 'all']:
+        if by_kind.get(kind):
+            s = percentiles_ms(by_kind[kind])
+            print(f"{kind:<12} {s['count']:>7} {s['p50']:>8.2f} {s['p90']:>8.2f} {s['p99']:>8.2f} {s['max']:>8.2f}")
+
+    statuses = Counter(status for _kind, status, _cache, _latency in results)
+    cache = Counter(c for kind, status, c, _latency in results if status == 200)
+    print(f"\nStatus codes: {dict(sorted(statuses.items()))}")
+    served = cache['hit'] + cache['miss']
+    if served:
+        print(f"Response cache: {cache['hit']} hits / {served} ({100 * cache['hit'] / served:.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the query service and report latency percentiles")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON (node ids to query)')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Service address')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Service port')
+    parser.add_argument('--requests', type=int, default=DEFAULT_REQUESTS, help='Requests to send')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Keep-alive connections')
+    parser.add_argument('--revalidate', type=float, default=REVALIDATE_SHARE,
+                        help='Share of requests repeated with If-None-Match')
+    parser.add_argument('--seed', type=int, default=0, help='Query mix seed')
+    parser.add_argument('--start', action='store_true', help='Start the service (and stop it afterwards)')
+    args = parser.parse_args()
+
+    columns = load_viz_columns(args.viz, COLUMNAR_CACHE_DIR)
+    paths = query_paths(columns.node_ids.tolist(), np.asarray(columns.layer), args.requests, args.seed)
+
+    process = None
+    if args.start:
+        print(f"Starting the service on port {args.port}...")
+        process = subprocess.Popen(
+            [sys.executable, str(Path(__file__).parent / "query_service.py"), '--viz', str(args.viz),
+             '--host', args.host, '--port', str(args.port)],
+            stdout=subprocess.DEVNULL,
+        )
+    try:
+        health = asyncio.run(wait_for_service(args.host, args.port, STARTUP_TIMEOUT if process else 5, process))
+        print(f"Service: {health['nodes']} nodes, {health['causal_edges']} causal edges")
+        results, seconds = asyncio.run(run_load(args.host, args.port, paths, args.concurrency, args.revalidate,
+                                                args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print_report(results, seconds)
+    return all(status in (200, 304) for _kind, status, _cache, _latency in results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
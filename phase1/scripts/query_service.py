@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Local HTTP query service over the visualization dataset.
+
+Loads v2_1_visualization_final.json once (through the columnar cache) into
+the compiled hierarchy and the CSR neighbour index, and answers:
+- GET /subtree/<id>[?depth=N]      nodes under <id>, depth-first, optionally
+                                   only N levels down
+- GET /neighbours/<id>[?k=10&direction=out|in|both]
+                                   heaviest causal neighbours
+- GET /importance/<id>[,<id>...]   importance, SHAP, degrees and rank in layer
+- GET /health                      dataset summary and cache counters
+
+Responses are JSON. Successful ones are kept in an LRU cache keyed by the
+normalized request and carry an ETag (a hash of the body), so a client
+sending If-None-Match gets 304 Not Modified. The data file is polled; when
+it changes the dataset is rebuilt off the event loop and swapped in, and the
+cache is dropped. Connections are kept alive (HTTP/1.1).
+
+Only the standard library and NumPy are used; the server is meant for local
+tools, not for exposure beyond localhost.
+
+Usage:
+    python scripts/query_service.py [--viz FILE] [--host 127.0.0.1] [--port 8765]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sys
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from data_cache import CACHE_DIR as COLUMNAR_CACHE_DIR, VIZ_FILE, load_viz_columns
+from hierarchy import hierarchy_from_columns
+from neighbour_index import index_arrays
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+RESPONSE_CACHE_SIZE = 4096  # Responses kept in the LRU cache
+RELOAD_INTERVAL = 2.0  # Seconds between checks of the data file
+DEFAULT_TOP_K = 10
+MAX_TOP_K = 1000
+MAX_HEADER_BYTES = 16384
+DIRECTIONS = ('out', 'in', 'both')
+
+STATUS_TEXT = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class QueryError(Exception):
+    """A request that cannot be answered; carries the HTTP status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Dataset:
+    """Every index the queries need, built once per version of the data file."""
+
+    def __init__(self, columns):
+        self.data_hash = columns.source_hash
+        self.hierarchy = hierarchy_from_columns(columns)
+        self.depth = self.hierarchy.depth
+        self.ids: List[str] = columns.node_ids.tolist()
+        self.index: Dict[str, int] = columns.index  # id -> file row
+        self.layer = np.asarray(columns.layer, dtype=np.int64)
+        self.importance = np.asarray(columns.importance, dtype=float)
+        self.shap_raw = np.asarray(columns.shap_raw, dtype=float)
+        self.in_degree = np.asarray(columns.in_degree, dtype=np.int64)
+        self.out_degree = np.asarray(columns.out_degree, dtype=np.int64)
+        self.neighbours = index_arrays(columns)  # float64 weights, as in the file (the .bin index is float32)
+
+        # 1-based importance rank within each layer (ties by file order)
+        order = np.lexsort((np.arange(len(self.ids)), -self.importance, self.layer))
+        self.layer_rank = np.empty(len(self.ids), dtype=np.int64)
+        first = np.searchsorted(self.layer[order], self.layer[order], side='left')
+        self.layer_rank[order] = np.arange(len(order)) - first + 1
+
+    @classmethod
+    def load(cls, viz_file=VIZ_FILE, cache_dir=COLUMNAR_CACHE_DIR) -> 'Dataset':
+        return cls(load_viz_columns(viz_file, cache_dir))
+
+    def _row(self, node_id: str) -> int:
+        if node_id not in self.index:
+            raise QueryError(404, f"unknown node: {node_id}")
+        return self.index[node_id]
+
+    def summary(self) -> dict:
+        return {
+            'data_hash': self.data_hash,
+            'nodes': len(self.ids),
+            'causal_edges': int(self.neighbours['out_indptr'][-1]),
+            'hierarchy_nodes': self.hierarchy.num_nodes,
+        }
+
+    def subtree(self, node_id: str, depth: Optional[int] = None) -> dict:
+        """node_id and its descendants in depth-first order (down to `depth` levels below it)."""
+        self._row(node_id)
+        tree = self.hierarchy
+        if node_id not in tree.index:
+            raise QueryError(404, f"node outside the hierarchy: {node_id}")
+        row = tree.index[node_id]
+        rows = tree.preorder[tree.entry[row]:tree.exit[row]]
+        if depth is not None:
+            rows = rows[self.depth[rows] - self.depth[row] <= depth]
+        nodes = []
+        for r, parent in zip(rows.tolist(), tree.parent[rows].tolist()):
+            node = tree.ids[r]
+            file_row = self.index[node]
+            nodes.append({
+                'id': node,
+                'layer': int(self.layer[file_row]),
+                'parent': tree.ids[parent] if parent >= 0 else None,
+                'importance': float(self.importance[file_row]),
+            })
+        return {'id': node_id, 'subtree_size': tree.subtree_size(node_id), 'depth': depth, 'nodes': nodes}
+
+    def _direction(self, direction: str, row: int, k: int) -> List[Tuple[int, float]]:
+        indptr = self.neighbours[f'{direction}_indptr']
+        start, stop = int(indptr[row]), int(indptr[row + 1])
+        stop = min(stop, start + k)
+        return list(zip(self.neighbours[f'{direction}_indices'][start:stop].tolist(),
+                        self.neighbours[f'{direction}_weights'][start:stop].tolist()))
+
+    def top_neighbours(self, node_id: str, k: int = DEFAULT_TOP_K, direction: str = 'both') -> dict:
+        """The k heaviest causal neighbours; 'both' merges in- and out-edges by weight."""
+        row = self._row(node_id)
+        directions = ('out', 'in') if direction == 'both' else (direction,)
+        found = [(weight, d, other) for d in directions for other, weight in self._direction(d, row, k)]
+        found.sort(key=lambda item: -item[0])  # Stable: out before in on equal weights
+        totals = {d: int(self.neighbours[f'{d}_indptr'][row + 1] - self.neighbours[f'{d}_indptr'][row])
+                  for d in directions}
+        return {
+            'id': node_id,
+            'direction': direction,
+            'k': k,
+            'degree': totals,
+            'neighbours': [
+                {'id': self.ids[other], 'weight': weight, 'direction': d}
+                for weight, d, other in found[:k]
+            ],
+        }
+
+    def node_importance(self, node_ids: List[str]) -> dict:
+        results = []
+        for node_id in node_ids:
+            row = self._row(node_id)
+            results.append({
+                'id': node_id,
+                'layer': int(self.layer[row]),
+                'importance': float(self.importance[row]),
+                'shap_raw': float(self.shap_raw[row]),
+                'in_degree': int(self.in_degree[row]),
+                'out_degree': int(self.out_degree[row]),
+                'layer_rank': int(self.layer_rank[row]),
+            })
+        return {'nodes': results}
+
+
+def _int_param(params: Dict[str, List[str]], name: str, default: Optional[int], low: int, high: int):
+    if name not in params:
+        return default
+    try:
+        value = int(params[name][-1])
+    except ValueError:
+        raise QueryError(400, f"{name} must be an integer")
+    if not low <= value <= high:
+        raise QueryError(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+def route(dataset: Dataset, path: str, params: Dict[str, List[str]]) -> dict:
+    """Answer one GET request path (already URL-decoded per segment)."""
+    parts = [unquote(part) for part in path.strip('/').split('/')]
+    if parts == ['health']:
+        return dataset.summary()
+    if len(parts) != 2 or not parts[1]:
+        raise QueryError(404, f"no such endpoint: {path}")
+    endpoint, argument = parts
+    if endpoint == 'subtree':
+        return dataset.subtree(argument, _int_param(params, 'depth', None, 0, 1 << 20))
+    if endpoint == 'neighbours':
+        direction = params.get('direction', ['both'])[-1]
+        if direction not in DIRECTIONS:
+            raise QueryError(400, f"direction must be one of {', '.join(DIRECTIONS)}")
+        return dataset.top_neighbours(argument, _int_param(params, 'k', DEFAULT_TOP_K, 1, MAX_TOP_K), direction)
+    if endpoint == 'importance':
+        return dataset.node_importance(argument.split(','))
+    raise QueryError(404, f"no such endpoint: {path}")
+
+
+class QueryService:
+    """The HTTP front end: LRU response cache, ETags and hot reload around a Dataset."""
+
+    def __init__(self, viz_file=VIZ_FILE, cache_dir=COLUMNAR_CACHE_DIR, cache_size: int = RESPONSE_CACHE_SIZE,
+                 reload_interval: float = RELOAD_INTERVAL):
+        self.viz_file = Path(viz_file)
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+        self.signature = self._signature()
+        self.dataset = Dataset.load(self.viz_file, self.cache_dir)
+        self.cache: 'OrderedDict[str, Tuple[bytes, str]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _signature(self):
+        stat = self.viz_file.stat()
+        return stat.st_mtime_ns, stat.st_size
+
+    def respond(self, target: str) -> Tuple[int, bytes, Optional[str], bool]:
+        """(status, body, etag, served from cache) for a GET target."""
+        split = urlsplit(target)
+        params = parse_qs(split.query)
+        key = split.path + '?' + '&'.join(f"{k}={v}" for k in sorted(params) for v in params[k])
+        cached = self.cache.get(key)
+        if cached is not None and split.path != '/health':
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return 200, cached[0], cached[1], True
+
+        self.misses += 1
+        try:
+            payload = route(self.dataset, split.path, params)
+        except QueryError as e:
+            return e.status, json.dumps({'error': str(e)}).encode(), None, False
+        if split.path == '/health':
+            payload = dict(payload, cache={'entries': len(self.cache), 'hits': self.hits, 'misses': self.misses},
+                           reloads=self.reloads)
+            return 200, json.dumps(payload).encode(), None, False
+
+        body = json.dumps(payload, separators=(',', ':')).encode()
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.cache[key] = (body, etag)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return 200, body, etag, False
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until the client closes it or asks to."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    return
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ')
+                except ValueError:
+                    await self._send(writer, 400, b'{"error":"malformed request line"}', None, False, False)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._send(writer, 400, b'{"error":"malformed Content-Length"}', None, False, False)
+                    return
+                if length:
+                    try:
+                        await reader.readexactly(length)  # Bodies are never used
+                    except asyncio.IncompleteReadError:
+                        return
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+
+                if method not in ('GET', 'HEAD'):
+                    status, body, etag, hit = 405, b'{"error":"only GET and HEAD are supported"}', None, False
+                else:
+                    try:
+                        status, body, etag, hit = self.respond(target)
+                    except Exception as e:  # Keep serving other requests
+                        status, body, etag, hit = 500, json.dumps({'error': repr(e)}).encode(), None, False
+                if etag is not None and etag in headers.get('if-none-match', ''):
+                    status, body = 304, b''
+                await self._send(writer, status, b'' if method == 'HEAD' else body, etag, hit, keep_alive,
+                                 len(body))
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+
+    async def _send(self, writer, status, body, etag, hit, keep_alive, length=None):
+        headers = [
+            f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body) if length is None else length}",
+            "Cache-Control: no-cache",
+            f"X-Cache: {'hit' if hit else 'miss'}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        if etag is not None:
+            headers.append(f"ETag: {etag}")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+    async def watch(self):
+        """Poll the data file; rebuild the dataset in a worker thread when it changes."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                signature = self._signature()
+            except FileNotFoundError:
+                continue
+            if signature == self.signature:
+                continue
+            started = time.perf_counter()
+            try:
+                dataset = await loop.run_in_executor(None, Dataset.load, self.viz_file, self.cache_dir)
+            except Exception as e:  # A bad file keeps the old dataset; retried on the next change
+                print(f"Reload failed, keeping the previous data: {e!r}")
+                self.signature = signature
+                continue
+            self.signature = signature
+            if dataset.data_hash != self.dataset.data_hash:
+                self.dataset = dataset
+                self.cache.clear()
+                self.reloads += 1
+                print(f"Reloaded {self.viz_file.name} in {time.perf_counter() - started:.2f}s "
+                      f"({len(dataset.ids)} nodes)")
+
+    async def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        watcher = asyncio.create_task(self.watch())
+        print(f"Serving {self.viz_file.name} ({len(self.dataset.ids)} nodes) on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve subtree, neighbour and importance queries over HTTP")
+    parser.add_argument('--viz', type=Path, default=VIZ_FILE, help='Visualization JSON')
+    parser.add_argument('--host', default=DEFAULT_HOST, help='Address to bind')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to listen on')
+    parser.add_argument('--cache-size', type=int, default=RESPONSE_CACHE_SIZE, help='Responses kept in the LRU cache')
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help='Seconds between checks of the data file')
+    args = parser.parse_args()
+
+    print("Loading data...")
+    service = QueryService(args.viz, COLUMNAR_CACHE_DIR, args.cache_size, args.reload_interval)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\nStopped")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
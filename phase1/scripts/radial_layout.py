@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Radial layout engine: the vectorized Python twin of src/layouts/RadialLayout.ts.
+
+Works on a hierarchy flattened into breadth-first arrays (optimize_layout's
+LayoutData): ring radii come from computeOptimalRingRadii (fixed or auto,
+with padding scaled by node size), each subtree's required angular extent
+from its per-layer node counts, and angles are handed out one depth level at
+a time in the same order as the recursive positionSubtree, so positions
+agree with the browser to floating point rounding.
+
+bake_layout.py uses this to write x/y into the data files; optimize_layout.py
+uses the same extent and angle passes for its collision sweep.
+"""
+
+import math
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Defaults from App.tsx (generateRingConfigs + the LayoutConfig in loadData)
+DEFAULT_RING_GAP = 150
+BASE_NODE_SIZES = [12, 18, 14, 12, 10, 8]  # BASE_SIZE_RANGES[i].max
+DEFAULT_SIZE_MULTIPLIERS = [1.0, 1.5, 2.4, 1.4, 0.8, 0.7]
+DEFAULT_NODE_PADDING = 7
+MIN_RING_GAP = 80
+
+REFERENCE_NODE_SIZE = 6  # Padding is defined relative to this node size
+ANGLE_EPSILON = 0.0001  # Floor on a parent's total required extent
+
+
+@dataclass
+class LayoutConfig:
+    """LayoutConfig from RadialLayout.ts, with the rings split into parallel lists."""
+    ring_radii: List[float]
+    node_sizes: List[float]
+    node_padding: float = DEFAULT_NODE_PADDING
+    start_angle: float = -math.pi / 2
+    total_angle: float = 2 * math.pi
+    min_ring_gap: float = MIN_RING_GAP
+    scale_padding: bool = True
+    use_fixed_radii: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+@dataclass
+class ComputedRing:
+    radius: float
+    node_size: float
+    node_count: int
+    required_radius: float
+
+
+@dataclass
+class RadialLayout:
+    """Positions per row of the hierarchy arrays, plus the rings they were computed for."""
+    x: np.ndarray
+    y: np.ndarray
+    angle: np.ndarray
+    extent: np.ndarray
+    rings: List[ComputedRing] = field(default_factory=list)
+
+
+def default_layout_config(gap: float = DEFAULT_RING_GAP,
+                          multipliers: List[float] = DEFAULT_SIZE_MULTIPLIERS) -> LayoutConfig:
+    """The configuration App.tsx lays the data out with on load (fixed radii at N * gap)."""
+    return LayoutConfig(
+        ring_radii=[i * gap for i in range(len(BASE_NODE_SIZES))],
+        node_sizes=[size * (multipliers[i] or 1) for i, size in enumerate(BASE_NODE_SIZES)],
+        use_fixed_radii=True,
+    )
+
+
+def effective_padding(node_size: float, base_padding: float, scale_padding: bool = True) -> float:
+    """getEffectivePadding: padding grows with node size relative to REFERENCE_NODE_SIZE."""
+    if not scale_padding:
+        return base_padding
+    return base_padding * (node_size / REFERENCE_NODE_SIZE)
+
+
+def min_arc_distance(node_size: float, config: LayoutConfig) -> float:
+    """Minimum arc length between adjacent node centers on a ring."""
+    return node_size * 2 + effective_padding(node_size, config.node_padding, config.scale_padding)
+
+
+def required_radius_for_even_distribution(node_count: int, node_size: float, config: LayoutConfig) -> float:
+    if node_count <= 1:
+        return 0
+    return node_count * min_arc_distance(node_size, config) / (2 * math.pi)
+
+
+def compute_ring_radii(nodes_per_layer: Dict[int, int], config: LayoutConfig,
+                       first_level_counts: Optional[np.ndarray] = None) -> List[ComputedRing]:
+    """
+    computeOptimalRingRadii: fixed radii, or auto radii scaled so the subtrees fit.
+
+    first_level_counts holds the per-layer node counts of each first-level
+    subtree (the root's children); without it the overcommitment pass is
+    skipped, which is what unrelated rings (the precompute bands) need.
+    """
+    if config.use_fixed_radii:
+        return [
+            ComputedRing(radius, size, nodes_per_layer.get(layer, 0),
+                         required_radius_for_even_distribution(nodes_per_layer.get(layer, 0), size, config))
+            for layer, (radius, size) in enumerate(zip(config.ring_radii, config.node_sizes))
+        ]
+
+    # First pass: even distribution, configured radius and minimum gap
+    base = []
+    current = 0
+    for layer, (ring_radius, size) in enumerate(zip(config.ring_radii, config.node_sizes)):
+        count = nodes_per_layer.get(layer, 0)
+        required = required_radius_for_even_distribution(count, size, config)
+        radius = max(required, ring_radius, 0 if layer == 0 else current + config.min_ring_gap)
+        if layer == 0 and count <= 1:
+            radius = 0
+        base.append(ComputedRing(radius, size, count, required))
+        current = radius
+
+    # Second pass: how far the subtrees' widest rings overcommit the circle
+    total_required = 0
+    max_layer = max(nodes_per_layer) if nodes_per_layer else 0
+    for counts in (first_level_counts if first_level_counts is not None else []):
+        max_extent = 0
+        for layer in range(min(max_layer + 1, len(base), len(counts))):
+            ring = base[layer]
+            if ring.radius > 0 and counts[layer] > 0:
+                max_extent = max(max_extent, (int(counts[layer]) * min_arc_distance(ring.node_size, config)) / ring.radius)
+        total_required += max_extent
+    scale = max(1, total_required / (2 * math.pi))
+
+    # Third pass: scale and keep the gaps
+    rings = []
+    current = 0
+    for layer, ring in enumerate(base):
+        radius = ring.radius * scale
+        if layer > 0:
+            radius = max(radius, current + config.min_ring_gap)
+        if layer == 0 and ring.node_count <= 1:
+            radius = 0
+        rings.append(ComputedRing(radius, ring.node_size, ring.node_count, ring.required_radius * scale))
+        current = radius
+    return rings
+
+
+def required_extents(subtree_counts: np.ndarray, radii: np.ndarray, spacing: np.ndarray) -> np.ndarray:
+    """
+    computeRequiredAngularExtent for every subtree at once.
+
+    The widest ring wins: count * (spacing / radius) per ring, rings without
+    a radius (or beyond the configured rings) adding nothing.
+    """
+    n_rings = min(subtree_counts.shape[1], len(radii))
+    radii = np.asarray(radii[:n_rings], dtype=float)
+    angular = np.where(radii > 0, np.asarray(spacing[:n_rings], dtype=float) / np.where(radii > 0, radii, 1), 0)
+    return (subtree_counts[:, :n_rings] * angular).max(axis=1, initial=0)
+
+
+def allocate_angles(parent: np.ndarray, child_rank: np.ndarray, level_offsets: List[int],
+                    required: np.ndarray, start_angle: float, total_angle: float):
+    """
+    Split each parent's extent among its children in proportion to their required extents.
+
+    Returns (start, extent) per row. Sibling totals and start angles are
+    accumulated in child order, so the results are the ones the recursive
+    positionSubtree computes.
+    """
+    n = len(parent)
+    start = np.empty(n)
+    extent = np.empty(n)
+    start[0] = start_angle
+    extent[0] = total_angle
+
+    for depth in range(len(level_offsets) - 2):
+        lo, hi = level_offsets[depth + 1], level_offsets[depth + 2]
+        parents = parent[lo:hi]
+        ranks = child_rank[lo:hi]
+        child_required = required[lo:hi]
+
+        # Siblings are adjacent in rank order, so bincount sums each parent's children in child order
+        total = np.bincount(parents, weights=child_required, minlength=n)
+        scale = extent[parents] / np.maximum(total[parents], ANGLE_EPSILON)
+        extent[lo:hi] = child_required * scale
+
+        # Rows of each child rank, in row order, from one stable sort of the level
+        order = np.argsort(ranks, kind='stable')
+        bounds = np.searchsorted(ranks[order], np.arange(int(ranks.max()) + 2))
+        by_rank = [order[bounds[k]:bounds[k + 1]] for k in range(len(bounds) - 1)]
+        start[lo + by_rank[0]] = start[parents[by_rank[0]]]
+        for rows in by_rank[1:]:
+            rows = rows + lo
+            start[rows] = start[rows - 1] + extent[rows - 1]
+    return start, extent
+
+
+def radial_layout(hierarchy, config: LayoutConfig) -> RadialLayout:
+    """
+    computeRadialLayout for a single-root hierarchy (optimize_layout.LayoutData).
+
+    Uses hierarchy.layer, parent, child_rank, level_offsets, subtree_counts
+    and nodes_per_layer (over every node in the file, as the TS counts them).
+    """
+    offsets = hierarchy.level_offsets
+    first_level = slice(offsets[1], offsets[2]) if len(offsets) > 2 else slice(0, 1)
+    rings = compute_ring_radii(hierarchy.nodes_per_layer, config, hierarchy.subtree_counts[first_level])
+
+    radii = np.array([ring.radius for ring in rings])
+    spacing = np.array([min_arc_distance(ring.node_size, config) for ring in rings])
+    required = required_extents(hierarchy.subtree_counts, radii, spacing)
+    start, extent = allocate_angles(hierarchy.parent, hierarchy.child_rank, offsets, required,
+                                    config.start_angle, config.total_angle)
+
+    angle = start + extent / 2
+    node_radius = radii[np.minimum(hierarchy.layer, len(rings) - 1)]
+    return RadialLayout(node_radius * np.cos(angle), node_radius * np.sin(angle), angle, extent, rings)
+
+
+def band_layout(band: np.ndarray, config: LayoutConfig) -> RadialLayout:
+    """
+    Concentric rings for unrelated nodes (the precompute variants' display bands).
+
+    Band b sits on ring b and its nodes share the full circle evenly, in row
+    order, as computeRadialLayout spreads parentless nodes. Radii use the
+    first and third passes of compute_ring_radii only, since no hierarchy
+    ties the bands' angles together.
+    """
+    band = np.asarray(band, dtype=np.int64)
+    counts = np.bincount(band, minlength=len(config.ring_radii)) if len(band) else np.zeros(0, dtype=np.int64)
+    rings = compute_ring_radii({b: int(c) for b, c in enumerate(counts)}, config)
+
+    # Position of each row within its band, in row order
+    order = np.argsort(band, kind='stable')
+    rank = np.empty(len(band), dtype=np.int64)
+    band_starts = np.concatenate([[0], np.cumsum(counts)[:-1]]) if len(counts) else counts
+    rank[order] = np.arange(len(band)) - band_starts[band[order]]
+
+    per_band = config.total_angle / np.maximum(counts, 1)
+    extent = per_band[band]
+    angle = config.start_angle + rank * extent + extent / 2
+    radii = np.array([ring.radius for ring in rings])
+    node_radius = radii[np.minimum(band, len(rings) - 1)]
+    return RadialLayout(node_radius * np.cos(angle), node_radius * np.sin(angle), angle, extent, rings)
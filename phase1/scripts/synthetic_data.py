@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic hierarchies shaped like v2_1_visualization_final.json.
+
+Generates a 6-layer hierarchy (root -> outcomes -> coarse domains -> fine
+domains -> indicator groups -> indicators) whose per-layer proportions and
+causal edge density follow the real data, at any size. Used by the benchmark
+suite; the output has the same node/edge fields the pipeline scripts read.
+
+Usage:
+    python scripts/synthetic_data.py 100000 --output /tmp/synthetic.json [--seed 0]
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+# Per-layer node counts and causal edge count of the real data
+REAL_LAYER_COUNTS = [1, 9, 45, 196, 569, 1763]
+REAL_CAUSAL_EDGES = 7368
+NODE_TYPES = ['root', 'outcome_category', 'coarse_domain', 'fine_domain', 'indicator', 'indicator']
+DOMAINS = ['Health', 'Education', 'Economic', 'Governance', 'Environment', 'Development', 'Security']
+ID_PREFIX = ['root', 'outcome', 'coarse', 'fine', 'group', 'ind']
+
+
+def layer_counts(total_nodes):
+    """Scale the real per-layer counts to roughly total_nodes (root and outcomes stay fixed)."""
+    fixed = sum(REAL_LAYER_COUNTS[:2])
+    scale = max(total_nodes - fixed, 0) / sum(REAL_LAYER_COUNTS[2:])
+    return REAL_LAYER_COUNTS[:2] + [max(1, round(c * scale)) for c in REAL_LAYER_COUNTS[2:]]
+
+
+def generate_viz_data(total_nodes, seed=0, edge_ratio=REAL_CAUSAL_EDGES / sum(REAL_LAYER_COUNTS)):
+    """
+    Build a synthetic visualization dataset with about total_nodes nodes.
+
+    Every node below the outcomes picks a random parent one layer up, so the
+    branching factors follow the real layer ratios (with some childless
+    groups, as in the real data). Causal edges run between layer 4/5 nodes
+    and always point forward in a random order, so the causal graph is a DAG.
+    """
+    rng = np.random.default_rng(seed)
+    counts = layer_counts(total_nodes)
+
+    nodes = []
+    layer_ids = []
+    for layer, count in enumerate(counts):
+        ids = ['root'] if layer == 0 else [f"{ID_PREFIX[layer]}_{i + 1}" for i in range(count)]
+        if layer == 0:
+            parents = [None]
+        elif layer == 1:
+            parents = ['root'] * count
+        else:
+            # Every parent gets at least one child, the rest are spread at random
+            above = layer_ids[layer - 1]
+            picks = np.concatenate([
+                np.arange(min(len(above), count)),
+                rng.integers(0, len(above), size=max(count - len(above), 0)),
+            ])
+            parents = [above[i] for i in np.sort(picks)]
+        layer_ids.append(ids)
+
+        domains = rng.integers(0, len(DOMAINS), size=count)
+        for node_id, parent, domain in zip(ids, parents, domains):
+            node = {
+                "id": node_id,
+                "label": node_id.replace('_', ' ').title(),
+                "layer": layer,
+                "node_type": NODE_TYPES[layer],
+                "domain": None if layer == 0 else DOMAINS[domain],
+                "subdomain": None,
+                "shap_importance": 0.0,
+                "in_degree": 0,
+                "out_degree": 0,
+                "label_source": "synthetic",
+            }
+            if parent is not None:
+                node["parent"] = parent
+            nodes.append(node)
+
+    nodes_by_id = {n['id']: n for n in nodes}
+    for n in nodes:
+        if 'parent' in n:
+            nodes_by_id[n['parent']].setdefault('children', []).append(n['id'])
+
+    # Heavy-tailed indicator SHAP, summed up the tree like compute_shap_importance
+    shap_scores = {}
+    for node_id, value in zip(layer_ids[5], rng.lognormal(-6, 1.5, size=len(layer_ids[5]))):
+        shap_scores[node_id] = {"shap_normalized": float(value)}
+    raw = {node_id: 0.0 for node_id in nodes_by_id}
+    raw.update({k: v['shap_normalized'] for k, v in shap_scores.items()})
+    for layer in range(4, -1, -1):
+        for node_id in layer_ids[layer]:
+            children = nodes_by_id[node_id].get('children')
+            if children:
+                raw[node_id] = sum(raw[c] for c in children)
+    max_raw = max(raw.values())
+    for n in nodes:
+        n['shap_raw'] = raw[n['id']]
+        n['importance'] = raw[n['id']] / max_raw if max_raw > 0 else 0
+
+    # Causal edges among indicator-level nodes, forward in a random order (acyclic)
+    hierarchical = [
+        {"source": n['parent'], "target": n['id'], "weight": 1.0, "relationship": "hierarchical"}
+        for n in nodes if 'parent' in n
+    ]
+    candidates = np.array(layer_ids[4] + layer_ids[5])
+    order = rng.permutation(len(candidates))
+    num_edges = int(round(edge_ratio * len(nodes)))
+    a = rng.integers(0, len(candidates), size=num_edges * 2)
+    b = rng.integers(0, len(candidates), size=num_edges * 2)
+    keep = a != b
+    a, b = a[keep], b[keep]
+    src = np.where(order[a] < order[b], a, b)
+    dst = np.where(order[a] < order[b], b, a)
+    pairs = np.unique(np.stack([src, dst], axis=1), axis=0)
+    pairs = pairs[rng.permutation(len(pairs))[:num_edges]]
+    weights = np.round(rng.uniform(0.05, 0.9, size=len(pairs)), 4)
+
+    causal = []
+    for (s, t), w in zip(pairs.tolist(), weights.tolist()):
+        source, target = str(candidates[s]), str(candidates[t])
+        nodes_by_id[source]['out_degree'] += 1
+        nodes_by_id[target]['in_degree'] += 1
+        causal.append({"source": source, "target": target, "weight": w, "relationship": "causal"})
+
+    viz_data = {
+        "nodes": nodes,
+        "edges": hierarchical + causal,
+        "hierarchy": {n['id']: n['children'] for n in nodes if n.get('children')},
+        "metadata": {
+            "version": "2.1",
+            "generated": "synthetic",
+            "statistics": {
+                "total_nodes": len(nodes),
+                "total_edges": len(hierarchical) + len(causal),
+                "causal_edges": len(causal),
+                "hierarchical_edges": len(hierarchical),
+                "layers": {str(layer): count for layer, count in enumerate(counts)},
+            },
+            "seed": seed,
+        },
+    }
+    return viz_data, shap_scores
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic visualization dataset")
+    parser.add_argument('nodes', type=int, help='Approximate total node count')
+    parser.add_argument('--output', type=Path, required=True, help='Where to write the JSON')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    viz_data, _ = generate_viz_data(args.nodes, seed=args.seed)
+    with open(args.output, 'w') as f:
+        json.dump(viz_data, f, indent=2)
+    stats = viz_data['metadata']['statistics']
+    print(f"Wrote {args.output}: {stats['total_nodes']} nodes, {stats['causal_edges']} causal edges")
+
+
+if __name__ == "__main__":
+    main()
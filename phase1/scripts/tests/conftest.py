@@ -0,0 +1,6 @@
+"""The scripts import each other as top-level modules; make them importable from the tests."""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,45 @@
+"""The benchmark regression gate (scripts/benchmark.py)."""
+
+from benchmark import DEFAULT_REPEAT, REFERENCE_STAGE, REGRESSION_THRESHOLD, benchmark_size, find_regressions
+
+
+def stage(seconds, stdev, peak_mb=10.0):
+    return {'seconds': seconds, 'stdev': stdev, 'peak_mb': peak_mb}
+
+
+def test_rerun_against_fresh_baseline_has_no_regressions():
+    baseline = {'2500': benchmark_size(2500, seed=0, repeat=DEFAULT_REPEAT, measure_memory=True)}
+    rerun = {'2500': benchmark_size(2500, seed=0, repeat=DEFAULT_REPEAT, measure_memory=True)}
+    assert find_regressions(rerun, baseline, REGRESSION_THRESHOLD) == []
+
+
+def test_slowdown_past_the_noise_is_reported():
+    baseline = {'10': {'a': stage(0.100, 0.002)}}
+    results = {'10': {'a': stage(0.150, 0.003)}}
+    assert find_regressions(results, baseline, REGRESSION_THRESHOLD) == [('10', 'a', 'seconds', 0.100, 0.150)]
+
+
+def test_slowdown_within_the_noise_is_ignored():
+    baseline = {'10': {'a': stage(0.100, 0.002)}}
+    results = {'10': {'a': stage(0.150, 0.020)}}  # 4 sigma = 80 ms > 50 ms slower
+    assert find_regressions(results, baseline, REGRESSION_THRESHOLD) == []
+
+
+def test_memory_growth_is_reported():
+    baseline = {'10': {'a': stage(0.1, 0.0, peak_mb=10.0)}}
+    results = {'10': {'a': stage(0.1, 0.0, peak_mb=20.0)}}
+    assert find_regressions(results, baseline, REGRESSION_THRESHOLD) == [('10', 'a', 'peak_mb', 10.0, 20.0)]
+
+
+def test_baseline_without_spread_uses_the_current_run():
+    baseline = {'10': {'a': {'seconds': 0.100, 'peak_mb': None}}}
+    results = {'10': {'a': stage(0.150, 0.020, peak_mb=None), 'new_stage': stage(9.0, 0.0)}}
+    assert find_regressions(results, baseline, REGRESSION_THRESHOLD) == []
+
+
+def test_slower_machine_is_not_a_regression():
+    baseline = {'10': {REFERENCE_STAGE: stage(0.010, 0.0), 'a': stage(0.100, 0.002)}}
+    results = {'10': {REFERENCE_STAGE: stage(0.016, 0.0), 'a': stage(0.160, 0.003)}}
+    assert find_regressions(results, baseline, REGRESSION_THRESHOLD) == []
+    results['10'][REFERENCE_STAGE] = stage(0.010, 0.0)
+    assert [r[:3] for r in find_regressions(results, baseline, REGRESSION_THRESHOLD)] == [('10', 'a', 'seconds')]
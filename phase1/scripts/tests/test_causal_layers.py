@@ -0,0 +1,152 @@
+"""Longest-path layering and display bands in scripts/causal_layers.py against brute force."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from causal_layers import balanced_bands, longest_path_layers
+from centrality import csr_from_edges
+
+
+def graph_from_edges(n, edges):
+    sources, targets = (np.array(column, dtype=np.int64) for column in zip(*edges)) if edges else (
+        np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    return csr_from_edges([f"n{i}" for i in range(n)], sources, targets, np.ones(len(sources)))
+
+
+def random_edges(n, m, seed, acyclic):
+    rng = np.random.default_rng(seed)
+    edges = set()
+    for u, v in zip(rng.integers(0, n, m).tolist(), rng.integers(0, n, m).tolist()):
+        if u != v:
+            edges.add((min(u, v), max(u, v)) if acyclic else (u, v))
+    return sorted(edges)
+
+
+def brute_force_layers(n, edges):
+    """
+    Longest path over the condensation, by reachability: (layer, cyclic mask).
+
+    Rows in a component get one past the deepest predecessor outside it;
+    cyclic rows are those reachable from a component with a cycle.
+    """
+    out = [[] for _ in range(n)]
+    for u, v in edges:
+        out[u].append(v)
+
+    def reachable(start):
+        seen, todo = {start}, [start]
+        while todo:
+            for w in out[todo.pop()]:
+                if w not in seen:
+                    seen.add(w)
+                    todo.append(w)
+        return seen
+
+    reach = [reachable(v) for v in range(n)]
+    component = [frozenset(u for u in reach[v] if v in reach[u]) for v in range(n)]
+    on_cycle = [len(component[v]) > 1 for v in range(n)]
+
+    memo = {}
+
+    def depth(comp):
+        if comp not in memo:
+            preds = {component[u] for u, v in edges if v in comp and u not in comp}
+            memo[comp] = max((depth(p) + 1 for p in preds), default=0)
+        return memo[comp]
+
+    layer = np.array([depth(component[v]) for v in range(n)])
+    cyclic = np.array([any(on_cycle[u] and v in reach[u] for u in range(n)) for v in range(n)])
+    return layer, cyclic
+
+
+def assert_valid_cycle(graph, cycle):
+    assert len(cycle) >= 2
+    for u, v in zip(cycle, cycle[1:] + cycle[:1]):
+        assert v in graph.indices[graph.indptr[u]:graph.indptr[u + 1]].tolist()
+
+
+@pytest.mark.parametrize('seed', range(15))
+def test_dag_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(5, 60))
+    edges = random_edges(n, int(rng.integers(n, 4 * n)), seed, acyclic=True)
+    layering = longest_path_layers(graph_from_edges(n, edges))
+    expected, _ = brute_force_layers(n, edges)
+    np.testing.assert_array_equal(layering.layer, expected)
+    assert len(layering.cyclic) == 0 and layering.cycle == []
+
+
+@pytest.mark.parametrize('seed', range(15))
+def test_cyclic_graph_matches_brute_force(seed):
+    rng = np.random.default_rng(100 + seed)
+    n = int(rng.integers(5, 40))
+    edges = random_edges(n, int(rng.integers(n, 2 * n)), seed, acyclic=False)
+    graph = graph_from_edges(n, edges)
+    layering = longest_path_layers(graph)
+    expected, cyclic = brute_force_layers(n, edges)
+    np.testing.assert_array_equal(layering.layer, expected)
+    np.testing.assert_array_equal(layering.cyclic, np.flatnonzero(cyclic))
+    if cyclic.any():
+        assert_valid_cycle(graph, layering.cycle)
+
+
+def test_rows_below_a_cycle_come_after_it():
+    # 0 -> (1 <-> 2) -> 3 -> 4, plus a shortcut 0 -> 4
+    layering = longest_path_layers(graph_from_edges(5, [(0, 1), (1, 2), (2, 1), (2, 3), (3, 4), (0, 4)]))
+    assert layering.layer.tolist() == [0, 1, 1, 2, 3]
+    assert layering.cyclic.tolist() == [1, 2, 3, 4]
+    assert sorted(layering.cycle) == [1, 2]
+
+
+def test_cycle_without_sources():
+    layering = longest_path_layers(graph_from_edges(4, [(0, 1), (1, 2), (2, 0), (2, 3)]))
+    assert layering.layer.tolist() == [0, 0, 0, 1]
+
+
+def test_shared_targets_join_the_frontier_once():
+    # Every source points at every target: each target is freed by the last of many edges in one round
+    edges = [(u, v) for u in range(5) for v in range(5, 9)] + [(v, 9) for v in range(5, 9)]
+    layering = longest_path_layers(graph_from_edges(10, edges))
+    assert layering.layer.tolist() == [0] * 5 + [1] * 4 + [2]
+    assert layering.layer_sizes().tolist() == [5, 4, 1]
+
+
+def test_long_chain():
+    n = 5000
+    layering = longest_path_layers(graph_from_edges(n, [(i, i + 1) for i in range(n - 1)] + [(n - 1, n - 2)]))
+    assert layering.layer[-2:].tolist() == [n - 2, n - 2]
+    assert layering.num_layers == n - 1
+
+
+def brute_force_bands(sizes, num_bands):
+    """The cost balanced_bands minimizes, over every split into num_bands contiguous bands."""
+    best = None
+    for cuts in itertools.combinations(range(1, len(sizes)), num_bands - 1):
+        bounds = [0, *cuts, len(sizes)]
+        counts = [sum(sizes[a:b]) for a, b in zip(bounds, bounds[1:])]
+        cost = (max(counts), sum(c * c for c in counts), sum((b - a) ** 2 for a, b in zip(bounds, bounds[1:])))
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def band_cost(sizes, bands):
+    counts = [sum(sizes[layer] for layer in band) for band in bands]
+    return max(counts), sum(c * c for c in counts), sum(len(band) ** 2 for band in bands)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_bands_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(0, 30, int(rng.integers(2, 10))).tolist()
+    num_bands = int(rng.integers(1, len(sizes) + 1))
+    bands = balanced_bands(sizes, num_bands)
+    assert [layer for band in bands for layer in band] == list(range(len(sizes)))
+    assert all(bands) and len(bands) == num_bands
+    assert band_cost(sizes, bands) == brute_force_bands(sizes, num_bands)
+
+
+def test_fewer_layers_than_bands():
+    assert balanced_bands([3, 4], 5) == [[0], [1]]
+    assert balanced_bands([], 3) == [[]]
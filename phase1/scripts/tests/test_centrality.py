@@ -0,0 +1,76 @@
+"""Betweenness in scripts/centrality.py against a brute-force shortest-path count."""
+
+from collections import deque
+
+import numpy as np
+import pytest
+
+from centrality import betweenness, csr_from_edges, describe_betweenness, sampling_betweenness
+
+
+def random_graph(n, m, seed):
+    rng = np.random.default_rng(seed)
+    sources, targets = rng.integers(0, n, m), rng.integers(0, n, m)
+    keep = sources != targets
+    pairs = sorted(set(zip(sources[keep].tolist(), targets[keep].tolist())))
+    sources, targets = (np.array(column, dtype=np.int64) for column in zip(*pairs))
+    return csr_from_edges([f"n{i}" for i in range(n)], sources, targets, np.ones(len(sources)))
+
+
+def brute_force_betweenness(graph):
+    """Share of s-t shortest paths through each v, summed over ordered pairs, normalized by (n-1)(n-2)."""
+    n = graph.num_nodes
+    out = [graph.indices[graph.indptr[i]:graph.indptr[i + 1]].tolist() for i in range(n)]
+
+    def bfs(source):
+        dist, paths = {source: 0}, {source: 1}
+        queue = deque([source])
+        while queue:
+            v = queue.popleft()
+            for w in out[v]:
+                if w not in dist:
+                    dist[w], paths[w] = dist[v] + 1, 0
+                    queue.append(w)
+                if dist[w] == dist[v] + 1:
+                    paths[w] += paths[v]
+        return dist, paths
+
+    reach = [bfs(source) for source in range(n)]
+    score = np.zeros(n)
+    for s in range(n):
+        dist_s, paths_s = reach[s]
+        for t in dist_s:
+            if t == s:
+                continue
+            for v in dist_s:
+                dist_v, paths_v = reach[v]
+                if v not in (s, t) and t in dist_v and dist_s[v] + dist_v[t] == dist_s[t]:
+                    score[v] += paths_s[v] * paths_v[t] / paths_s[t]
+    return score / ((n - 1) * (n - 2))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_exact_matches_brute_force(seed):
+    graph = random_graph(30, 70, seed)
+    np.testing.assert_allclose(betweenness(graph), brute_force_betweenness(graph), atol=1e-12)
+
+
+def test_samples_not_below_node_count_is_exact():
+    graph = random_graph(30, 70, 0)
+    assert not sampling_betweenness(graph.num_nodes, 30)
+    np.testing.assert_array_equal(betweenness(graph, samples=30), betweenness(graph))
+    assert describe_betweenness(30, 40) == "exact (40 samples requested, graph has only 30 sources)"
+    assert describe_betweenness(30, None) == "exact (30 sources)"
+
+
+def test_sampled_estimate_is_unbiased():
+    graph = random_graph(40, 120, 1)
+    exact = betweenness(graph)
+    assert describe_betweenness(40, 10) == "sampled from 10 of 40 sources"
+    mean = np.mean([betweenness(graph, samples=10, seed=seed) for seed in range(400)], axis=0)
+    assert np.abs(mean - exact).max() < 0.05 * exact.max()
+
+
+def test_rejects_non_positive_samples():
+    with pytest.raises(ValueError):
+        betweenness(random_graph(10, 20, 0), samples=0)
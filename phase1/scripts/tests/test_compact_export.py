@@ -0,0 +1,170 @@
+"""Round trips through the compact columnar format (scripts/compact_export.py)."""
+
+import json
+import os
+
+import pytest
+
+from bake_layout import ts_runner_available
+from compact_export import (OUTPUT_NAME, browser_parse_times, decode_viz, decode_viz_ts, encode_viz,
+                            export_compact, read_compact, round_trip_errors)
+from synthetic_data import generate_viz_data
+
+
+def round_trip(viz_data):
+    """Encode, serialize as export_compact does, parse and decode."""
+    document = encode_viz(viz_data)
+    decoded = decode_viz(json.loads(json.dumps(document, separators=(',', ':'), ensure_ascii=False)))
+    return document, decoded
+
+
+def sample_viz():
+    return {
+        'nodes': [
+            {'id': 'root', 'layer': 0, 'parent': None, 'domain': 'Mixed', 'importance': 1.0},
+            {'id': 'a', 'layer': 1, 'parent': 'root', 'domain': 'Education', 'importance': 5.2e-05,
+             'shap_raw': 2.4764534171116717e-18, 'children': ['a1']},
+            {'id': 'a1', 'layer': 2, 'parent': 'a', 'domain': 'Education', 'importance': 0.0,
+             'label': 'Leaf'},
+        ],
+        'edges': [
+            {'source': 'root', 'target': 'a', 'weight': 1.0, 'relationship': 'hierarchical'},
+            {'source': 'a', 'target': 'a1', 'weight': 0.1227, 'relationship': 'causal'},
+        ],
+        'hierarchy': {'root': ['a'], 'a': ['a1']},
+        'metadata': {'version': '2.1'},
+    }
+
+
+def test_round_trip_keeps_document():
+    viz = sample_viz()
+    _, decoded = round_trip(viz)
+    assert round_trip_errors(viz, decoded) == []
+    assert list(decoded) == list(viz)
+    assert decoded['metadata'] == viz['metadata']
+
+
+def test_partial_fields_keep_rows():
+    viz = sample_viz()
+    document, decoded = round_trip(viz)
+    columns = document['tables']['nodes']['columns']
+    assert columns['label']['rows'] == [2]
+    assert columns['children']['rows'] == [1]
+    assert 'rows' not in columns['id']
+    assert 'label' not in decoded['nodes'][0]
+    assert 'shap_raw' not in decoded['nodes'][2]
+    assert [list(node) for node in decoded['nodes']] == [list(node) for node in viz['nodes']]
+
+
+def test_small_values_keep_significant_digits():
+    viz = sample_viz()
+    viz['nodes'][2]['importance'] = 6.744615824333899e-19
+    document, decoded = round_trip(viz)
+    assert document['tables']['nodes']['columns']['importance']['kind'] == 'rounded'
+    assert decoded['nodes'][2]['importance'] == pytest.approx(6.74462e-19, rel=1e-12)
+    assert decoded['nodes'][1]['shap_raw'] == pytest.approx(2.47645e-18, rel=1e-12)
+    assert round_trip_errors(viz, decoded) == []
+
+
+def test_quantized_weight_within_half_step():
+    viz = sample_viz()
+    viz['edges'][1]['weight'] = 0.12345678
+    document, decoded = round_trip(viz)
+    assert document['tables']['edges']['columns']['weight']['kind'] == 'quantized'
+    assert decoded['edges'][1]['weight'] == 0.123457
+    assert round_trip_errors(viz, decoded) == []
+
+
+@pytest.mark.parametrize('ids', [
+    [0, 1, 2],                 # not strings
+    ['root', 'a', 'a'],        # duplicated
+])
+def test_unusable_ids_are_not_references(ids):
+    viz = sample_viz()
+    for node, node_id in zip(viz['nodes'], ids):
+        node['id'] = node_id
+    document, decoded = round_trip(viz)
+    for table, field in (('nodes', 'parent'), ('nodes', 'children'), ('edges', 'source'), ('hierarchy', 'parent')):
+        assert document['tables'][table]['columns'][field]['kind'] not in ('ref', 'ref_list')
+    assert round_trip_errors(viz, decoded) == []
+
+
+def test_dangling_refs_stay_ids():
+    viz = sample_viz()
+    viz['edges'].append({'source': 'GHOST', 'target': 'a', 'weight': 5.0, 'relationship': 'causal'})
+    viz['nodes'][1]['children'] = ['a1', 'GHOST']
+    document, decoded = round_trip(viz)
+    columns = document['tables']['edges']['columns']
+    assert columns['source']['kind'] != 'ref'
+    assert columns['target']['kind'] == 'ref'
+    assert document['tables']['nodes']['columns']['children']['kind'] != 'ref_list'
+    assert decoded['edges'][-1]['source'] == 'GHOST'
+    assert round_trip_errors(viz, decoded) == []
+
+
+def test_empty_tables():
+    viz = {'nodes': [], 'edges': [], 'hierarchy': {}, 'metadata': {}}
+    document, decoded = round_trip(viz)
+    assert document['tables']['nodes'] == {'count': 0, 'fields': [], 'columns': {}}
+    assert decoded == viz
+
+
+def test_hierarchy_map():
+    viz = sample_viz()
+    viz['hierarchy']['a1'] = []
+    document, decoded = round_trip(viz)
+    table = document['tables']['hierarchy']
+    assert table['columns']['parent']['kind'] == 'ref'
+    assert table['columns']['children']['kind'] == 'ref_list'
+    assert decoded['hierarchy'] == viz['hierarchy']
+    assert list(decoded['hierarchy']) == list(viz['hierarchy'])
+
+
+def test_hierarchy_with_non_list_values_is_copied():
+    viz = sample_viz()
+    viz['hierarchy'] = {'root': 'a'}
+    document, decoded = round_trip(viz)
+    assert 'hierarchy' not in document['tables']
+    assert decoded['hierarchy'] == {'root': 'a'}
+
+
+def test_export_reads_back_from_gzip(tmp_path):
+    viz = sample_viz()
+    viz_file = tmp_path / 'viz.json'
+    viz_file.write_text(json.dumps(viz))
+    sizes = export_compact(viz_file, tmp_path / 'out')
+
+    compact = tmp_path / 'out' / OUTPUT_NAME
+    gz = compact.with_name(compact.name + '.gz')
+    assert sizes[compact] == compact.stat().st_size
+    assert sizes[gz] == gz.stat().st_size
+    assert read_compact(gz) == read_compact(compact)
+    assert round_trip_errors(viz, read_compact(gz)) == []
+
+
+def test_rejects_other_documents():
+    with pytest.raises(ValueError):
+        decode_viz({'format': 'compact-viz', 'version': 0, 'keys': [], 'tables': {}, 'other': {}})
+
+
+@pytest.fixture
+def ts_runner():
+    if not ts_runner_available():
+        if os.environ.get('CI'):
+            pytest.fail("CI needs node 22.18+ or the frontend's TypeScript (npm install) for the reader check")
+        pytest.skip("needs node 22.18+ or the frontend's TypeScript (npm install)")
+
+
+@pytest.mark.parametrize('viz', [sample_viz(), generate_viz_data(2500, seed=0)[0]], ids=['sample', 'synthetic'])
+def test_frontend_reader_matches_decode_viz(ts_runner, viz):
+    document, decoded = round_trip(viz)
+    assert decode_viz_ts(document) == json.loads(json.dumps(decoded))
+
+
+def test_browser_parse_times(ts_runner, tmp_path):
+    viz_file = tmp_path / "viz.json"
+    viz_file.write_text(json.dumps(generate_viz_data(2500, seed=0)[0], indent=2))
+    export_compact(viz_file, tmp_path)
+    times = browser_parse_times(viz_file, tmp_path / OUTPUT_NAME, repeat=2)
+    assert set(times) == {'original', 'compact_parse', 'compact_decoded'}
+    assert all(t > 0 for t in times.values())
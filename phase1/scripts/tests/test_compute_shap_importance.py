@@ -0,0 +1,133 @@
+"""Hierarchical aggregation in scripts/compute_shap_importance.py against the original per-layer loop."""
+
+import contextlib
+import io
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+import compute_shap_importance as csi
+from synthetic_data import generate_viz_data
+
+
+def per_layer_shap(shap_scores, viz_data):
+    """compute_hierarchical_shap as it was before the array engine (printing removed)."""
+    nodes_by_id = {str(n['id']): n for n in viz_data['nodes']}
+    children_by_parent = defaultdict(list)
+    for node in viz_data['nodes']:
+        if node.get('parent') is not None:
+            children_by_parent[str(node['parent'])].append(str(node['id']))
+
+    node_shap = {}
+    for node_id, node in nodes_by_id.items():
+        if node['layer'] == 5:
+            node_shap[node_id] = shap_scores[node_id].get('shap_normalized', 0) if node_id in shap_scores else 0
+    for layer in [4, 3, 2, 1, 0]:
+        for node in [n for n in nodes_by_id.values() if n['layer'] == layer]:
+            node_id = str(node['id'])
+            children = children_by_parent.get(node_id, [])
+            if children:
+                node_shap[node_id] = sum(node_shap.get(c, 0) for c in children)
+            else:
+                node_shap[node_id] = node_shap.get(node_id, 0)
+    return node_shap
+
+
+def fixture_viz():
+    """Small irregular hierarchy: skipped layers, childless aggregates, an orphan, a missing score."""
+    nodes = [
+        ('root', 0, None), ('o1', 1, 'root'), ('o2', 1, 'root'), ('o3', 1, 'root'),
+        ('c1', 2, 'o1'), ('f1', 3, 'c1'), ('g1', 4, 'f1'), ('i1', 5, 'g1'), ('i2', 5, 'g1'),
+        ('g2', 4, 'f1'), ('i3', 5, 'g2'),
+        ('c2', 2, 'o2'), ('i4', 5, 'c2'),      # indicator straight under a coarse domain
+        ('g3', 4, 'o3'),                        # aggregate without children
+        ('orphan', 3, 'gone'), ('i5', 5, 'orphan'),
+        ('i6', 5, 'g2'),                        # no SHAP score
+    ]
+    viz_data = {'nodes': [{'id': node_id, 'layer': layer, 'parent': parent} for node_id, layer, parent in nodes]}
+    shap_scores = {node_id: {'shap_normalized': 0.1 * (i + 1)} for i, node_id in enumerate(['i1', 'i2', 'i3', 'i4', 'i5'])}
+    return shap_scores, viz_data
+
+
+def hierarchical_shap(shap_scores, viz_data):
+    nodes_by_id, hierarchy = csi.build_hierarchy(viz_data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return csi.compute_hierarchical_shap(shap_scores, nodes_by_id, hierarchy)
+
+
+def test_fixture_matches_per_layer_loop():
+    shap_scores, viz_data = fixture_viz()
+    expected = per_layer_shap(shap_scores, viz_data)
+    result = hierarchical_shap(shap_scores, viz_data)
+    assert result.keys() == expected.keys()
+    for node_id, value in expected.items():
+        assert result[node_id] == pytest.approx(value, rel=1e-12, abs=1e-15), node_id
+
+
+@pytest.mark.parametrize('size,seed', [(2500, 0), (10000, 3)])
+def test_synthetic_matches_per_layer_loop(size, seed):
+    viz_data, shap_scores = generate_viz_data(size, seed=seed)
+    expected = per_layer_shap(shap_scores, viz_data)
+    result = hierarchical_shap(shap_scores, viz_data)
+    assert result.keys() == expected.keys()
+    np.testing.assert_allclose([result[k] for k in expected], list(expected.values()), rtol=1e-12, atol=1e-15)
+
+
+def test_metric_columns_aggregate_independently():
+    viz_data, shap_scores = generate_viz_data(2500, seed=1)
+    _, hierarchy = csi.build_hierarchy(viz_data)
+    rng = np.random.default_rng(0)
+    leaves = [str(n['id']) for n in viz_data['nodes'] if n['layer'] == csi.LEAF_LAYER]
+    leaf_metrics = {name: dict(zip(leaves, rng.random(len(leaves)).tolist()))
+                    for name in ('shap', 'pagerank', 'betweenness', 'degree', 'composite')}
+
+    together = csi.compute_hierarchical_metrics(leaf_metrics, hierarchy)
+    for name, leaf_values in leaf_metrics.items():
+        assert together[name] == csi.compute_hierarchical_metrics({name: leaf_values}, hierarchy)[name]
+
+
+def run_importance(monkeypatch, data_dir, shap_scores, viz_data, *argv):
+    """main() on in-memory inputs, writing under data_dir; returns {file name: bytes}."""
+    monkeypatch.setattr(csi, 'DATA_DIR', data_dir)
+    monkeypatch.setattr(csi, 'OUTPUT_DIR', data_dir / "importance")
+    monkeypatch.setattr(csi, 'load_data', lambda: (shap_scores, viz_data))
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        csi.main(list(argv))
+    files = [data_dir / "v2_1_visualization_final.json", *sorted((data_dir / "importance").iterdir())]
+    return {path.name: path.read_bytes() for path in files}, log.getvalue()
+
+
+def edit_leaves(shap_scores, viz_data, count, seed):
+    rng = np.random.default_rng(seed)
+    leaves = [str(n['id']) for n in viz_data['nodes'] if n['layer'] == csi.LEAF_LAYER and str(n['id']) in shap_scores]
+    edited = {node_id: dict(scores) for node_id, scores in shap_scores.items()}
+    for node_id in rng.choice(leaves, size=count, replace=False).tolist():
+        edited[node_id]['shap_normalized'] *= rng.uniform(0.3, 1.7)
+    return edited
+
+
+def move_leaf(viz_data):
+    """Copy of viz_data with one indicator re-parented under another indicator group."""
+    nodes = [dict(node) for node in viz_data['nodes']]
+    leaf = next(node for node in nodes if node['layer'] == csi.LEAF_LAYER)
+    leaf['parent'] = next(node['id'] for node in nodes if node['layer'] == 4 and node['id'] != leaf['parent'])
+    return {**viz_data, 'nodes': nodes}
+
+
+@pytest.mark.parametrize('change', ['leaf_edit', 'parent_move'])
+def test_incremental_outputs_match_full_recompute(tmp_path, monkeypatch, change):
+    viz_data, shap_scores = generate_viz_data(2500, seed=2)
+    run_importance(monkeypatch, tmp_path / "incremental", shap_scores, viz_data)
+
+    if change == 'leaf_edit':
+        new_scores, new_viz = edit_leaves(shap_scores, viz_data, count=25, seed=0), viz_data
+    else:
+        new_scores, new_viz = shap_scores, move_leaf(viz_data)
+    incremental, log = run_importance(monkeypatch, tmp_path / "incremental", new_scores, new_viz, '--incremental')
+    full, _ = run_importance(monkeypatch, tmp_path / "full", new_scores, new_viz)
+
+    assert ('falling back to full recompute' in log) == (change == 'parent_move')
+    assert incremental.keys() == full.keys()
+    for name in full:
+        assert incremental[name] == full[name], name
@@ -0,0 +1,114 @@
+"""Lowest common ancestors, bundle paths and straightening in scripts/edge_bundling.py against brute force."""
+
+import json
+
+import numpy as np
+import pytest
+
+from edge_bundling import (ancestor_table, bundle_paths, compute_bundles, lod_levels, lowest_common_ancestors,
+                           straighten)
+from optimize_layout import load_layout_data
+from radial_layout import default_layout_config, radial_layout
+from synthetic_data import generate_viz_data
+
+
+def random_tree(n, seed):
+    """Parent array of a random single-rooted tree (row 0) and the depth of every row."""
+    rng = np.random.default_rng(seed)
+    parent = np.array([-1] + [int(rng.integers(0, i)) for i in range(1, n)], dtype=np.int64)
+    depth = np.zeros(n, dtype=np.int64)
+    for row in range(1, n):
+        depth[row] = depth[parent[row]] + 1
+    return parent, depth
+
+
+def path_to_root(parent, row):
+    path = [row]
+    while parent[path[-1]] >= 0:
+        path.append(int(parent[path[-1]]))
+    return path
+
+
+def brute_force_path(parent, source, target):
+    """Source up to the first ancestor the target shares, then down to the target."""
+    up = path_to_root(parent, source)
+    down = path_to_root(parent, target)
+    lca = next(row for row in up if row in set(down))
+    return up[:up.index(lca) + 1] + down[:down.index(lca)][::-1], lca
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_paths_and_lcas_match_parent_walks(seed):
+    parent, depth = random_tree(int(np.random.default_rng(seed).integers(2, 300)), seed)
+    rng = np.random.default_rng(100 + seed)
+    source = rng.integers(0, len(parent), 200)
+    target = rng.integers(0, len(parent), 200)
+    ancestors = ancestor_table(parent, int(depth.max()))
+    lca = lowest_common_ancestors(source, target, depth, ancestors)
+    offsets, rows = bundle_paths(source, target, lca, depth, ancestors)
+
+    for i, (s, t) in enumerate(zip(source.tolist(), target.tolist())):
+        path, expected_lca = brute_force_path(parent, s, t)
+        assert lca[i] == expected_lca
+        assert rows[offsets[i]:offsets[i + 1]].tolist() == path
+
+
+def test_ancestor_table_ends_past_the_root():
+    parent, depth = random_tree(50, 0)
+    table = ancestor_table(parent, int(depth.max()))
+    for row in range(len(parent)):
+        chain = path_to_root(parent, row)
+        assert table[row].tolist() == chain + [-1] * (table.shape[1] - len(chain))
+
+
+@pytest.mark.parametrize('beta', [0.0, 0.4, 0.85, 1.0])
+def test_straighten_blends_each_polygon_with_its_chord(beta):
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(1, 9, 40)
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    points = rng.uniform(-500, 500, (offsets[-1], 2))
+    result = straighten(points, offsets, beta)
+
+    for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist()):
+        first, last = points[start], points[end - 1]
+        for k in range(end - start):
+            t = k / max(end - start - 1, 1)
+            expected = beta * points[start + k] + (1 - beta) * (first + t * (last - first))
+            np.testing.assert_allclose(result[start + k], expected, rtol=1e-12, atol=1e-9)
+        # The endpoints stay on the nodes whatever the strength
+        np.testing.assert_allclose(result[[start, end - 1]], points[[start, end - 1]], atol=1e-9)
+
+
+def test_lod_levels_are_prefixes_ending_with_every_edge():
+    assert lod_levels(0) == []
+    assert lod_levels(120, (250, 1000)) == [120]
+    assert lod_levels(3000, (250, 1000, 2500, 5000)) == [250, 1000, 2500, 3000]
+
+
+def test_bundles_follow_the_laid_out_hierarchy(tmp_path):
+    viz_data, _ = generate_viz_data(1500, seed=3)
+    viz_data['edges'].append({'source': 'missing', 'target': viz_data['nodes'][1]['id'], 'weight': 9.0,
+                              'relationship': 'causal'})
+    viz_file = tmp_path / "synthetic.json"
+    viz_file.write_text(json.dumps(viz_data))
+    hierarchy = load_layout_data(viz_file, tmp_path / "columnar")
+    layout = radial_layout(hierarchy, default_layout_config())
+    bundles = compute_bundles(hierarchy, layout.x, layout.y, beta=1.0)
+
+    causal = [edge for edge in viz_data['edges'] if edge['relationship'] == 'causal']
+    assert bundles.skipped == 1
+    assert len(bundles.weight) == len(causal) - 1
+    assert np.all(np.diff(bundles.weight) <= 0)
+    expected = sorted(((edge['weight'], edge['source'], edge['target']) for edge in causal[:-1]),
+                      key=lambda edge: -edge[0])
+    ids = hierarchy.ids
+    assert [(w, ids[s], ids[t]) for w, s, t in zip(bundles.weight.tolist(), bundles.source.tolist(),
+                                                   bundles.target.tolist())] == expected
+
+    parent = hierarchy.hierarchy.parent
+    for i, (s, t) in enumerate(zip(bundles.source.tolist(), bundles.target.tolist())):
+        path, lca = brute_force_path(parent, s, t)
+        assert bundles.lca[i] == lca
+        # beta=1 leaves the control points on the tree nodes
+        np.testing.assert_array_equal(bundles.points[bundles.offsets[i]:bundles.offsets[i + 1]],
+                                      np.column_stack([layout.x[path], layout.y[path]]))
@@ -0,0 +1,81 @@
+"""Chord counting and crossing estimates in scripts/edge_crossings.py against pairwise segment tests."""
+
+import itertools
+
+import numpy as np
+import pytest
+
+from edge_crossings import chord_crossings, count_crossings, increasing_pairs
+
+
+def segments_cross(p, q, r, s):
+    """Proper intersection of p-q and r-s: each segment strictly separates the other's endpoints."""
+    def orient(a, b, c):
+        return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+    return orient(p, q, r) * orient(p, q, s) < 0 and orient(r, s, p) * orient(r, s, q) < 0
+
+
+def pairwise_crossings(radius, angle, source, target):
+    points = list(zip((radius * np.cos(angle)).tolist(), (radius * np.sin(angle)).tolist()))
+    edges = [(s, t) for s, t in zip(source.tolist(), target.tolist()) if s != t]
+    return sum(segments_cross(points[a], points[b], points[c], points[d])
+               for (a, b), (c, d) in itertools.combinations(edges, 2))
+
+
+def random_layout(seed):
+    """Nodes on a few rings (ring 0 is the centre) and edges, most of them chords of one ring."""
+    rng = np.random.default_rng(seed)
+    num_rings = int(rng.integers(2, 6))
+    ring = np.concatenate([[0], rng.integers(1, num_rings, int(rng.integers(10, 120)))])
+    radius = ring * 100.0
+    angle = rng.uniform(-np.pi, np.pi, len(ring))
+    num_edges = int(rng.integers(2, 150))
+    source = rng.integers(0, len(ring), num_edges)
+    same_ring = rng.random(num_edges) < 0.7
+    target = np.array([rng.choice(np.flatnonzero(ring == ring[s])) if chord else rng.integers(0, len(ring))
+                       for s, chord in zip(source.tolist(), same_ring.tolist())])
+    return radius, angle, ring, source, target
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_random_layouts_match_pairwise_segment_tests(seed):
+    radius, angle, ring, source, target = random_layout(seed)
+    result = count_crossings(radius, angle, ring, source, target)
+    assert result.exact and result.stderr == 0.0
+    assert result.count == pairwise_crossings(radius, angle, source, target)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_sampled_estimate_brackets_the_exact_count(seed):
+    radius, angle, ring, source, target = random_layout(100 + seed)
+    exact = count_crossings(radius, angle, ring, source, target).count
+    estimate = count_crossings(radius, angle, ring, source, target, max_pairs=0, samples=20_000, seed=seed)
+    assert not estimate.exact
+    assert abs(estimate.count - exact) <= 5 * estimate.stderr + 1e-9
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_increasing_pairs_match_nested_loop(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.integers(0, int(rng.integers(1, 40)), int(rng.integers(0, 200)))
+    expected = sum(1 for i, j in itertools.combinations(range(len(values)), 2) if values[i] < values[j])
+    assert increasing_pairs(values) == expected
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_chord_crossings_match_interleaving(seed):
+    rng = np.random.default_rng(seed)
+    num_points = int(rng.integers(2, 30))
+    chords = {tuple(sorted(rng.choice(num_points, 2, replace=False).tolist())) for _ in range(60)}
+    first, second = (np.array(side) for side in zip(*sorted(chords)))
+    expected = sum(1 for (a, b), (c, d) in itertools.combinations(chords, 2) if a < c < b < d or c < a < d < b)
+    assert chord_crossings(first, second) == expected
+
+
+def test_shared_endpoints_and_self_loops_do_not_cross():
+    angle = np.array([0.0, np.pi / 2, np.pi, 3 * np.pi / 2])
+    radius = np.full(4, 100.0)
+    ring = np.ones(4, dtype=np.int64)
+    # A fan from node 0, a self loop and the one crossing pair 1-3 / 0-2
+    source, target = np.array([0, 0, 0, 2, 1]), np.array([1, 2, 3, 2, 3])
+    assert count_crossings(radius, angle, ring, source, target).count == 1
@@ -0,0 +1,106 @@
+"""Per-subtree shards in scripts/export_shards.py against a parent-link walk."""
+
+import json
+
+import pytest
+
+from export_shards import SHARD_LAYER, build_shards, shard_filename, write_shards
+from synthetic_data import generate_viz_data
+
+
+@pytest.fixture(scope='module')
+def viz_data():
+    return generate_viz_data(2500, seed=4)[0]
+
+
+def shard_root(nodes_by_id, node_id):
+    """The SHARD_LAYER ancestor of node_id (itself included), walking parent links."""
+    while node_id is not None and node_id in nodes_by_id:
+        if nodes_by_id[node_id]['layer'] == SHARD_LAYER:
+            return node_id
+        node_id = nodes_by_id[node_id].get('parent')
+    return None
+
+
+def test_every_node_lands_in_its_ancestors_shard(viz_data):
+    nodes_by_id = {n['id']: n for n in viz_data['nodes']}
+    manifest, shards = build_shards(viz_data)
+    placed = {n['id']: payload['root'] for payload in shards.values() for n in payload['nodes']}
+    expected = {node_id: shard_root(nodes_by_id, node_id) for node_id in nodes_by_id}
+    assert placed == {node_id: root for node_id, root in expected.items() if root is not None}
+
+    for filename, payload in shards.items():
+        assert filename == shard_filename(payload['root'])
+        assert payload['nodes'][0]['id'] == payload['root']
+        entry = manifest['shards'][payload['root']]
+        assert (entry['file'], entry['node_count'], entry['edge_count']) == (
+            filename, len(payload['nodes']), len(payload['edges']))
+
+
+def test_subtree_order_is_depth_first(viz_data):
+    _, shards = build_shards(viz_data)
+    for payload in shards.values():
+        # Preorder: every node's parent is on the path from the root to the previous node
+        stack = [payload['root']]
+        for node in payload['nodes'][1:]:
+            while stack[-1] != node['parent']:
+                stack.pop()
+            stack.append(node['id'])
+
+
+def test_causal_edges_go_to_both_endpoint_shards(viz_data):
+    nodes_by_id = {n['id']: n for n in viz_data['nodes']}
+    _, shards = build_shards(viz_data)
+    by_root = {payload['root']: {(e['source'], e['target']) for e in payload['edges']} for payload in shards.values()}
+    expected = {root: set() for root in by_root}
+    for e in viz_data['edges']:
+        if e['relationship'] != 'causal':
+            continue
+        for root in {shard_root(nodes_by_id, e['source']), shard_root(nodes_by_id, e['target'])} - {None}:
+            expected[root].add((e['source'], e['target']))
+    assert by_root == expected
+
+
+def test_manifest_holds_the_top_layers(viz_data):
+    manifest, _ = build_shards(viz_data)
+    top = [n for n in viz_data['nodes'] if n['layer'] <= SHARD_LAYER]
+    assert [entry['id'] for entry in manifest['nodes']] == [n['id'] for n in top]
+    for entry in manifest['nodes']:
+        children = [n for n in viz_data['nodes'] if n.get('parent') == entry['id']]
+        assert entry['child_count'] == len(children)
+        if entry['layer'] == SHARD_LAYER:
+            assert entry['descendant_count'] == manifest['shards'][entry['id']]['node_count'] - 1
+
+
+def test_write_removes_stale_shards_and_refuses_foreign_dirs(viz_data, tmp_path):
+    manifest, shards = build_shards(viz_data)
+    output_dir = tmp_path / "shards"
+    output_dir.mkdir()
+    (output_dir / "shard_gone.json").write_text("{}")
+    (output_dir / "manifest.json").write_text("{}")
+    (output_dir / "notes.txt").write_text("kept")
+    total = write_shards(manifest, shards, output_dir)
+
+    files = {path.name: path for path in output_dir.iterdir()}
+    assert set(files) == set(shards) | {"manifest.json", "notes.txt"}
+    assert total == sum(path.stat().st_size for name, path in files.items() if name != "notes.txt")
+    written = json.loads(files["manifest.json"].read_text())
+    assert all(entry['bytes'] == files[entry['file']].stat().st_size for entry in written['shards'].values())
+
+    foreign = tmp_path / "other"
+    foreign.mkdir()
+    (foreign / "data.json").write_text("{}")
+    with pytest.raises(ValueError):
+        write_shards(manifest, shards, foreign)
+
+
+def test_parent_cycle_is_left_out():
+    nodes = [
+        {'id': 'root', 'layer': 0, 'parent': None},
+        {'id': 'c', 'layer': SHARD_LAYER, 'parent': 'root'},
+        {'id': 'x', 'layer': 3, 'parent': 'c'},
+        {'id': 'a', 'layer': SHARD_LAYER, 'parent': 'b'},
+        {'id': 'b', 'layer': 3, 'parent': 'a'},
+    ]
+    _, shards = build_shards({'nodes': nodes, 'edges': []})
+    assert {payload['root']: [n['id'] for n in payload['nodes']] for payload in shards.values()} == {'c': ['c', 'x']}
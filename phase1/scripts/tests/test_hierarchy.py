@@ -0,0 +1,154 @@
+"""Breadth-first rows, Euler tour and subtree queries in scripts/hierarchy.py against brute force."""
+
+import json
+from collections import deque
+
+import numpy as np
+import pytest
+
+from data_cache import load_viz_columns
+from hierarchy import build_hierarchy, hierarchy_from_columns, hierarchy_from_viz
+from synthetic_data import generate_viz_data
+
+
+def random_forest(n, seed, roots=3):
+    """Parent positions of a shuffled forest, plus a two-node parent cycle with a child hanging off it."""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(n)  # order[k] is the source position of the k-th node created
+    parent = np.full(n + 3, -1, dtype=np.int64)
+    for k in range(roots, n):
+        parent[order[k]] = order[rng.integers(0, k)]
+    parent[n], parent[n + 1], parent[n + 2] = n + 1, n, n + 1
+    ids = [f'n{i}' for i in range(n + 3)]
+    layer = rng.integers(0, 5, n + 3)
+    return ids, parent, layer
+
+
+def children_lists(parent):
+    children = [[] for _ in parent]
+    for position, p in enumerate(parent.tolist()):
+        if p >= 0:
+            children[p].append(position)
+    return children
+
+
+def brute_force(parent):
+    """Breadth-first order from the roots (source order) and the depth-first preorder."""
+    children = children_lists(parent)
+    roots = [position for position, p in enumerate(parent.tolist()) if p < 0]
+    breadth_first, queue = [], deque(roots)
+    while queue:
+        position = queue.popleft()
+        breadth_first.append(position)
+        queue.extend(children[position])
+    preorder = []
+
+    def visit(position):
+        preorder.append(position)
+        for child in children[position]:
+            visit(child)
+
+    for root in roots:
+        visit(root)
+    return breadth_first, preorder, children
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_rows_and_euler_tour_match_traversals(seed):
+    ids, parent, layer = random_forest(int(np.random.default_rng(seed).integers(5, 300)), seed)
+    tree = build_hierarchy(ids, parent, layer)
+    breadth_first, preorder, children = brute_force(parent)
+
+    # Rows are breadth-first; the cycle and the node under it are left out
+    assert tree.source_row.tolist() == breadth_first
+    assert tree.ids == [ids[p] for p in breadth_first]
+    assert all(tree.index[node_id] == row for row, node_id in enumerate(tree.ids))
+    np.testing.assert_array_equal(tree.layer, layer[breadth_first])
+    assert tree.preorder.tolist() == [tree.index[ids[p]] for p in preorder]
+    np.testing.assert_array_equal(tree.preorder[tree.entry], np.arange(tree.num_nodes))
+
+    row_of = {p: row for row, p in enumerate(breadth_first)}
+    depth = np.zeros(tree.num_nodes, dtype=np.int64)
+    for row, position in enumerate(breadth_first):
+        p = int(parent[position])
+        assert tree.parent[row] == (row_of[p] if p >= 0 else -1)
+        depth[row] = depth[row_of[p]] + 1 if p >= 0 else 0
+        kids = [row_of[c] for c in children[position]]
+        assert list(range(tree.child_start[row], tree.child_start[row] + tree.child_count[row])) == kids
+        assert tree.children(ids[position]) == [ids[c] for c in children[position]]
+        for rank, kid in enumerate(kids):
+            assert tree.child_rank[kid] == rank
+    np.testing.assert_array_equal(tree.depth, depth)
+    assert tree.children_by_parent() == {ids[p]: [ids[c] for c in children[p]]
+                                         for p in breadth_first if children[p]}
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_subtree_queries_match_descendant_walks(seed):
+    ids, parent, layer = random_forest(120, seed)
+    tree = build_hierarchy(ids, parent, layer)
+    _, _, children = brute_force(parent)
+
+    def descendants(position):
+        found = [position]
+        for child in children[position]:
+            found.extend(descendants(child))
+        return found
+
+    num_layers = int(layer.max()) + 1
+    counts = tree.subtree_layer_counts()
+    assert counts.shape == (tree.num_nodes, num_layers)
+    rows = np.arange(tree.num_nodes)
+    for row, position in enumerate(tree.source_row.tolist()):
+        below = descendants(position)
+        below_rows = {tree.index[ids[p]] for p in below}
+        assert tree.subtree_size(ids[position]) == tree.subtree_sizes[row] == len(below)
+        assert set(np.flatnonzero(tree.is_descendant(rows, row)).tolist()) == below_rows
+        assert tree.contains(ids[position], ids[below[-1]])
+        for level in range(num_layers):
+            expected = sum(1 for p in below if layer[p] == level)
+            assert tree.layer_count(ids[position], level) == counts[row, level] == expected
+        ancestors, p = [], int(parent[position])
+        while p >= 0:
+            ancestors.append(tree.index[ids[p]])
+            p = int(parent[p])
+        assert tree.ancestors(ids[position]) == ancestors
+    np.testing.assert_array_equal(tree.subtree_layer_counts(2), counts[:, :2])
+
+
+def test_subtree_keeps_source_positions():
+    ids, parent, layer = random_forest(200, 5, roots=1)
+    tree = build_hierarchy(ids, parent, layer)
+    node_id = tree.ids[tree.level_offsets[1]]  # The root's first child
+    sub = tree.subtree(node_id)
+    assert sub.ids[0] == node_id and sub.parent[0] == -1
+    assert sub.num_nodes == tree.subtree_size(node_id)
+    assert [ids[p] for p in sub.source_row.tolist()] == sub.ids
+    for row in range(1, sub.num_nodes):
+        assert ids[int(parent[sub.source_row[row]])] == sub.ids[sub.parent[row]]
+    to_row = sub.source_rows(len(ids))
+    assert sorted(row for row in to_row.tolist() if row >= 0) == list(range(sub.num_nodes))
+    assert all(sub.ids[to_row[p]] == ids[p] for p in np.flatnonzero(to_row >= 0).tolist())
+
+
+def test_viz_and_columns_compile_the_same_hierarchy(tmp_path):
+    viz_data, _ = generate_viz_data(600, seed=1)
+    viz_data['nodes'].append({'id': 'orphan', 'layer': 3, 'parent': 'unknown'})
+    path = tmp_path / "viz.json"
+    path.write_text(json.dumps(viz_data))
+    from_viz = hierarchy_from_viz(viz_data)
+    from_columns = hierarchy_from_columns(load_viz_columns(path, tmp_path / "columnar"))
+
+    assert from_viz.ids == from_columns.ids
+    assert from_viz.level_offsets == from_columns.level_offsets
+    for name in ('source_row', 'layer', 'parent', 'child_start', 'child_count', 'entry', 'exit', 'preorder'):
+        np.testing.assert_array_equal(getattr(from_viz, name), getattr(from_columns, name))
+    # A parent missing from the node list makes a root
+    assert from_viz.parent[from_viz.index['orphan']] == -1
+    assert from_viz.level_offsets[1] == 2
+
+
+def test_empty_hierarchy():
+    tree = build_hierarchy([], np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    assert tree.num_nodes == 0 and tree.level_offsets == [0]
+    assert tree.subtree_layer_counts().shape == (0, 0)
@@ -0,0 +1,93 @@
+"""Chunked encoding and atomic writes in scripts/json_stream.py."""
+
+import json
+import os
+
+import pytest
+
+import json_stream
+from json_stream import StreamDict, StreamList, iter_json, same_contents, write_atomic
+
+
+def sample(stream):
+    """A generate_outputs-shaped document, with its large containers optionally streamed."""
+    nodes = [{'id': f"n{i}", 'layer': i % 6, 'importance': i / 7, 'tags': ['a'] * (i % 3)} for i in range(40)]
+    ranks = [(f"n{i}", {'rank': i, 'pct': i / 40}) for i in range(40)]
+    if stream:
+        nodes, ranks = StreamList(iter(nodes)), StreamDict(iter(ranks))
+    else:
+        ranks = dict(ranks)
+    return {'metadata': {'version': '2.1', 'empty': []}, 'nodes': nodes,
+            'nested': StreamDict([('ranks', ranks), ('none', StreamList([]))]) if stream
+            else {'ranks': ranks, 'none': []}}
+
+
+@pytest.fixture(params=[1, 3, 512])
+def batch(request, monkeypatch):
+    monkeypatch.setattr(json_stream, 'STREAM_BATCH', request.param)
+    return request.param
+
+
+def as_stream(document):
+    return StreamDict(list(document.items()))
+
+
+def test_indented_output_matches_json_dumps(batch):
+    assert ''.join(iter_json(as_stream(sample(True)))) == json.dumps(sample(False), indent=2)
+
+
+def test_compact_output_round_trips_one_entry_per_line(batch):
+    text = ''.join(iter_json(as_stream(sample(True)), indent=None))
+    assert json.loads(text) == sample(False)
+    assert len(text.splitlines()) == len(sample(False)) + 2
+
+
+@pytest.mark.parametrize('value,plain', [
+    (StreamList([]), []), (StreamDict([]), {}), (StreamList([[1, {'a': None}]]), [[1, {'a': None}]]), ('text', 'text'),
+])
+def test_small_values_match_json_dumps(value, plain):
+    assert ''.join(iter_json(value)) == json.dumps(plain, indent=2)
+    assert json.loads(''.join(iter_json(value, indent=None))) == plain
+
+
+def test_write_atomic_skips_unchanged_files(tmp_path):
+    path = tmp_path / "out.json"
+    assert write_atomic(path, ['{"a": ', '1}'])
+    mtime = path.stat().st_mtime_ns
+    assert not write_atomic(path, ['{"a": 1}'])
+    assert path.stat().st_mtime_ns == mtime
+    assert write_atomic(path, ['{"a": 2}'])
+    assert path.read_text() == '{"a": 2}'
+    assert os.listdir(tmp_path) == ["out.json"]
+
+
+def test_write_atomic_keeps_the_old_file_when_interrupted(tmp_path):
+    path = tmp_path / "out.json"
+    write_atomic(path, ['{"a": 1}'])
+
+    def chunks():
+        yield '{"a": '
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        write_atomic(path, chunks())
+    assert path.read_text() == '{"a": 1}'
+    assert os.listdir(tmp_path) == ["out.json"]
+
+
+def test_volatile_line_ignores_only_that_line(tmp_path):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_text('{\n"generated": "2026-01-01",\n"x": 1\n}')
+    b.write_text('{\n"generated": "2026-02-02",\n"x": 1\n}')
+    assert same_contents(a, b, volatile_line=(1, '"generated"'))
+    assert not same_contents(a, b)
+    b.write_text('{\n"generated": "2026-02-02",\n"x": 2\n}')
+    assert not same_contents(a, b, volatile_line=(1, '"generated"'))
+    assert not write_atomic(a, ['{\n"generated": "2026-03-03",\n"x": 1\n}'], volatile_line=(1, '"generated"'))
+
+
+def test_write_atomic_binary(tmp_path):
+    path = tmp_path / "out.bin"
+    assert write_atomic(path, [b'\x00\x01', b'\x02'], binary=True)
+    assert not write_atomic(path, [b'\x00\x01\x02'], binary=True)
+    assert path.read_bytes() == b'\x00\x01\x02'
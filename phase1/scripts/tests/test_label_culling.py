@@ -0,0 +1,122 @@
+"""Label boxes, overlap tests and greedy zoom culling in scripts/label_culling.py against brute force."""
+
+import itertools
+import math
+
+import numpy as np
+import pytest
+
+from label_culling import (LABEL_PADDING_PX, MIN_READABLE_FONT_SIZE, GridIndex, boxes_overlap, label_boxes,
+                           min_visible_zoom)
+
+
+def corners(rect, pad):
+    cx, cy, cos_t, sin_t, hw, hh = rect
+    hw, hh = hw + pad, hh + pad
+    return [(cx + sx * hw * cos_t - sy * hh * sin_t, cy + sx * hw * sin_t + sy * hh * cos_t)
+            for sx, sy in ((-1, -1), (1, -1), (1, 1), (-1, 1))]
+
+
+def polygons_intersect(p, q):
+    """Convex polygons intersect iff two edges cross or one holds a vertex of the other."""
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    def inside(point, poly):
+        signs = [cross(poly[i], poly[(i + 1) % 4], point) for i in range(4)]
+        return all(s >= 0 for s in signs) or all(s <= 0 for s in signs)
+
+    for i, j in itertools.product(range(4), range(4)):
+        a, b, c, d = p[i], p[(i + 1) % 4], q[j], q[(j + 1) % 4]
+        if cross(a, b, c) * cross(a, b, d) < 0 and cross(c, d, a) * cross(c, d, b) < 0:
+            return True
+    return inside(p[0], q) or inside(q[0], p)
+
+
+def random_rects(n, seed, spread=40.0):
+    rng = np.random.default_rng(seed)
+    angle = rng.uniform(-math.pi, math.pi, n)
+    return [(float(x), float(y), math.cos(t), math.sin(t), float(hw), float(hh))
+            for x, y, t, hw, hh in zip(rng.uniform(0, spread, n), rng.uniform(0, spread, n), angle,
+                                       rng.uniform(1, 12, n), rng.uniform(0.5, 4, n))]
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_boxes_overlap_matches_polygon_intersection(seed):
+    rects = random_rects(40, seed)
+    for a, b in itertools.combinations(rects, 2):
+        for pad in (0.0, 1.5):
+            assert boxes_overlap(a, b, pad) == polygons_intersect(corners(a, pad), corners(b, pad))
+
+
+def test_grid_query_returns_every_overlapping_box():
+    rng = np.random.default_rng(0)
+    lo = rng.uniform(-50, 50, (200, 2))
+    boxes = np.column_stack([lo, lo + rng.uniform(0.1, 15, (200, 2))]).tolist()
+    grid = GridIndex(7.0)
+    for i, box in enumerate(boxes):
+        grid.insert(i, box)
+    for query in boxes[:50]:
+        overlapping = {i for i, box in enumerate(boxes)
+                       if box[0] <= query[2] and query[0] <= box[2] and box[1] <= query[3] and query[1] <= box[3]}
+        assert overlapping <= grid.query(query)
+
+
+def brute_force_zoom(center, axis, half_w, half_h, font, importance, ring, zoom_levels):
+    """The same greedy placement, checking every accepted label instead of a grid."""
+    rects = [(cx, cy, math.cos(t), math.sin(t), hw, hh)
+             for (cx, cy), t, hw, hh in zip(center.tolist(), axis.tolist(), half_w.tolist(), half_h.tolist())]
+    order = sorted(range(len(rects)), key=lambda i: (-importance[i], ring[i], i))
+    result = [math.nan] * len(rects)
+    accepted = []
+    for zoom in sorted(zoom_levels):
+        pad = LABEL_PADDING_PX / zoom / 2
+        for i in order:
+            if not math.isnan(result[i]) or font[i] * zoom < MIN_READABLE_FONT_SIZE:
+                continue
+            if not any(boxes_overlap(rects[i], rects[j], pad) for j in accepted):
+                accepted.append(i)
+                result[i] = zoom
+    return np.array(result)
+
+
+def random_labels(n, seed):
+    """Nodes on six rings with App.tsx-like sizes and label lengths."""
+    rng = np.random.default_rng(seed)
+    ring = rng.integers(0, 6, n)
+    radius = np.array([0, 120, 260, 420, 600, 800])[ring] * rng.uniform(0.95, 1.05, n)
+    theta = rng.uniform(-math.pi, math.pi, n)
+    size = rng.uniform(2, 20, n)
+    labels = ["x" * int(k) for k in rng.integers(3, 30, n)]
+    importance = np.round(rng.random(n), 2)  # Ties exercise the ring / row order
+    return label_boxes(radius * np.cos(theta), radius * np.sin(theta), ring, size, labels), importance, ring
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_zoom_matches_brute_force_greedy(seed):
+    boxes, importance, ring = random_labels(300, seed)
+    zoom_levels = (0.05, 0.2, 0.5, 1, 2, 4)
+    result = min_visible_zoom(*boxes, importance, ring, zoom_levels)
+    np.testing.assert_array_equal(result, brute_force_zoom(*boxes, importance, ring, zoom_levels))
+
+
+def test_shown_labels_never_overlap():
+    (center, axis, half_w, half_h, font), importance, ring = random_labels(400, 11)
+    result = min_visible_zoom(center, axis, half_w, half_h, font, importance, ring)
+    rects = [(cx, cy, math.cos(t), math.sin(t), hw, hh)
+             for (cx, cy), t, hw, hh in zip(center.tolist(), axis.tolist(), half_w.tolist(), half_h.tolist())]
+    for zoom in (0.2, 1, 4):
+        shown = np.flatnonzero(result <= zoom).tolist()
+        pad = LABEL_PADDING_PX / zoom / 2
+        assert not any(boxes_overlap(rects[i], rects[j], pad) for i, j in itertools.combinations(shown, 2))
+        assert (font[shown] * zoom >= MIN_READABLE_FONT_SIZE).all()
+
+
+def test_inner_rings_are_horizontal_outer_rings_radial():
+    x, y = np.array([0.0, 0.0, 300.0]), np.array([0.0, 150.0, 300.0])
+    ring, size = np.array([0, 1, 3]), np.array([15.0, 12.0, 6.0])
+    center, axis, half_w, _half_h, _font = label_boxes(x, y, ring, size, ["root", "outcome", "domain"])
+    assert axis[:2].tolist() == [0.0, 0.0]
+    assert axis[2] == pytest.approx(math.pi / 4)
+    # The radial label starts just past the node, so its center is farther out by half its width
+    assert np.hypot(*center[2]) > np.hypot(300, 300) + half_w[2]
@@ -0,0 +1,35 @@
+"""The Python layout engine against src/layouts/RadialLayout.ts (scripts/bake_layout.py --check)."""
+
+import json
+import os
+
+import pytest
+
+from bake_layout import PARITY_FIXTURE, fixture_parity_results, parity_results, ts_layout_hash, ts_runner_available
+
+
+def assert_parity(results):
+    assert results
+    failed = [r for r in results if not r.ok]
+    assert not failed, "\n".join(
+        f"{r.name}: max |dxy|={r.error:.2e}, max |dradius|={r.radius_error:.2e}, id mismatches={r.missing}"
+        for r in failed
+    )
+
+
+def test_positions_match_committed_ts_output():
+    assert_parity(fixture_parity_results())
+
+
+def test_committed_ts_output_is_current():
+    with open(PARITY_FIXTURE) as f:
+        recorded = json.load(f)["radial_layout_ts_sha256"]
+    assert recorded == ts_layout_hash(), "RadialLayout.ts changed: run bake_layout.py --write-fixture"
+
+
+def test_positions_match_radial_layout_ts():
+    if not ts_runner_available():
+        if os.environ.get('CI'):
+            pytest.fail("CI needs node 22.18+ or the frontend's TypeScript (npm install) for the parity check")
+        pytest.skip("needs node 22.18+ or the frontend's TypeScript (npm install)")
+    assert_parity(parity_results())
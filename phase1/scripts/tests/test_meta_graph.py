@@ -0,0 +1,118 @@
+"""Collapsed-subtree edge aggregation in scripts/meta_graph.py against per-edge brute force."""
+
+import json
+import math
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+from data_cache import load_viz_columns
+from hierarchy import hierarchy_from_columns
+from json_stream import iter_json
+from meta_graph import LEVELS, build_meta_graph, meta_graph_payload
+from synthetic_data import generate_viz_data
+
+
+@pytest.fixture(params=[0, 1, 2])
+def dataset(request, tmp_path):
+    """Synthetic data plus an edge to a missing node and edges into a parent cycle."""
+    viz_data, _ = generate_viz_data(900, seed=request.param)
+    nodes = viz_data['nodes']
+    nodes.append({'id': 'loop_a', 'layer': 2, 'parent': 'loop_b'})
+    nodes.append({'id': 'loop_b', 'layer': 2, 'parent': 'loop_a'})
+    some = nodes[len(nodes) // 2]['id']
+    viz_data['edges'] += [
+        {'source': 'missing', 'target': some, 'weight': 1.0, 'relationship': 'causal'},
+        {'source': 'loop_a', 'target': some, 'weight': 1.0, 'relationship': 'causal'},
+        {'source': some, 'target': nodes[-3]['id'], 'weight': 0.25, 'relationship': 'causal'},
+    ]
+    path = tmp_path / "viz.json"
+    path.write_text(json.dumps(viz_data))
+    columns = load_viz_columns(path, tmp_path / "columnar")
+    return viz_data, columns, hierarchy_from_columns(columns)
+
+
+def brute_force_level(viz_data, level):
+    """Walk each causal endpoint up to its layer-`level` ancestor and sum edges per group pair."""
+    nodes = {node['id']: node for node in viz_data['nodes']}
+
+    def group(node_id):
+        seen = set()
+        while nodes[node_id]['layer'] > level and nodes[node_id].get('parent') in nodes:
+            seen.add(node_id)
+            node_id = nodes[node_id]['parent']
+            if node_id in seen:
+                return None
+        return node_id
+
+    def in_hierarchy(node_id):
+        seen = set()
+        while node_id in nodes and node_id not in seen:
+            seen.add(node_id)
+            parent = nodes[node_id].get('parent')
+            if parent not in nodes:
+                return True
+            node_id = parent
+        return False
+
+    edges = defaultdict(lambda: [0.0, 0])
+    internal = defaultdict(int)
+    skipped = 0
+    for edge in viz_data['edges']:
+        if edge['relationship'] != 'causal':
+            continue
+        if not (in_hierarchy(edge['source']) and in_hierarchy(edge['target'])):
+            skipped += 1
+            continue
+        a, b = group(edge['source']), group(edge['target'])
+        if a == b:
+            internal[a] += 1
+        else:
+            edges[a, b][0] += edge['weight']
+            edges[a, b][1] += 1
+    return edges, internal, skipped
+
+
+def test_levels_match_brute_force(dataset):
+    viz_data, columns, hierarchy = dataset
+    levels, skipped = build_meta_graph(columns, hierarchy)
+    assert [m.level for m in levels] == list(LEVELS)
+
+    for m in levels:
+        edges, internal, expected_skipped = brute_force_level(viz_data, m.level)
+        assert skipped == expected_skipped == 2
+        ids = [hierarchy.ids[row] for row in m.groups.tolist()]
+        got = {(ids[s], ids[t]): (w, c) for s, t, w, c in zip(m.source.tolist(), m.target.tolist(),
+                                                                m.weight.tolist(), m.count.tolist())}
+        assert len(got) == len(m.weight) == len(edges)
+        for pair, (weight, count) in edges.items():
+            assert got[pair][1] == count
+            assert math.isclose(got[pair][0], weight, rel_tol=1e-12)
+        assert np.all(np.diff(m.weight) <= 0)
+        assert dict(zip(ids, m.internal.tolist())) == {group: internal.get(group, 0) for group in ids}
+        assert set(ids) == {group for pair in edges for group in pair} | set(internal)
+        assert int(m.count.sum() + m.internal.sum()) == sum(
+            1 for edge in viz_data['edges'] if edge['relationship'] == 'causal') - skipped
+
+
+def test_groups_sit_on_their_level(dataset):
+    _, columns, hierarchy = dataset
+    for m in build_meta_graph(columns, hierarchy)[0]:
+        layers = hierarchy.layer[m.groups]
+        deeper = layers > m.level
+        # Only nodes whose ancestors stop short of the level (a root) are left deeper than it
+        assert np.all(hierarchy.parent[m.groups[deeper]] == -1)
+
+
+def test_payload_lists_each_level(dataset):
+    _, columns, hierarchy = dataset
+    levels, skipped = build_meta_graph(columns, hierarchy)
+    document = json.loads(''.join(iter_json(meta_graph_payload(levels, hierarchy, columns.source_hash, skipped),
+                                            indent=None)))
+    assert document['metadata']['skipped_edges'] == skipped
+    for m in levels:
+        level = document['levels'][str(m.level)]
+        assert level['nodes'] == [hierarchy.ids[row] for row in m.groups.tolist()]
+        assert level['count'] == m.count.tolist()
+        assert len(level['source']) == len(level['target']) == len(level['weight']) == len(m.weight)
@@ -0,0 +1,128 @@
+"""CSR order, hop counts and the binary round trip in scripts/neighbour_index.py against brute force."""
+
+import json
+from collections import defaultdict
+
+import numpy as np
+import pytest
+
+import neighbour_index
+from data_cache import load_viz_columns
+from neighbour_index import (ALIGNMENT, ARRAY_DTYPES, NeighbourIndex, build_index, hop_counts, index_arrays,
+                             weighted_csr, write_index)
+from synthetic_data import generate_viz_data
+
+
+def random_edges(num_nodes, num_edges, seed):
+    """Edges with hubs, duplicates, self-loops and tied weights."""
+    rng = np.random.default_rng(seed)
+    hubs = rng.integers(0, num_nodes, 3)
+    sources = np.where(rng.random(num_edges) < 0.2, rng.choice(hubs, num_edges),
+                       rng.integers(0, num_nodes, num_edges))
+    targets = rng.integers(0, num_nodes, num_edges)
+    weights = np.round(rng.uniform(0, 1, num_edges), 1)
+    return sources.astype(np.int64), targets.astype(np.int64), weights
+
+
+def brute_force_hops(num_nodes, sources, targets):
+    adjacent = defaultdict(set)
+    for s, t in zip(sources.tolist(), targets.tolist()):
+        if s != t:
+            adjacent[s].add(t)
+            adjacent[t].add(s)
+    hop1, hop2 = [], []
+    for node in range(num_nodes):
+        within_two = set(adjacent[node])
+        for neighbour in adjacent[node]:
+            within_two |= adjacent[neighbour]
+        within_two.discard(node)
+        hop1.append(len(adjacent[node]))
+        hop2.append(len(within_two))
+    return hop1, hop2
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_hop_counts_match_set_expansion(seed):
+    num_nodes = int(np.random.default_rng(seed).integers(1, 200))
+    sources, targets, _ = random_edges(num_nodes, 3 * num_nodes, seed)
+    hop1, hop2 = hop_counts(num_nodes, sources, targets)
+    assert (hop1.tolist(), hop2.tolist()) == brute_force_hops(num_nodes, sources, targets)
+
+
+def test_hop_counts_split_into_small_blocks(monkeypatch):
+    sources, targets, _ = random_edges(150, 600, 0)
+    expected = brute_force_hops(150, sources, targets)
+    monkeypatch.setattr(neighbour_index, 'HOP_BLOCK_PAIRS', 7)
+    hop1, hop2 = hop_counts(150, sources, targets)
+    assert (hop1.tolist(), hop2.tolist()) == expected
+
+
+def test_hop_counts_without_edges():
+    hop1, hop2 = hop_counts(4, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    assert hop1.tolist() == hop2.tolist() == [0, 0, 0, 0]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_weighted_csr_rows_sorted_by_weight_then_column(seed):
+    sources, targets, weights = random_edges(60, 400, seed)
+    indptr, indices, sorted_weights = weighted_csr(60, sources, targets, weights)
+    for row in range(60):
+        expected = sorted(((-w, t) for s, t, w in zip(sources.tolist(), targets.tolist(), weights.tolist())
+                           if s == row))
+        got = list(zip((-sorted_weights[indptr[row]:indptr[row + 1]]).tolist(),
+                       indices[indptr[row]:indptr[row + 1]].tolist()))
+        assert got == expected
+
+
+@pytest.fixture
+def columns(tmp_path):
+    viz_data, _ = generate_viz_data(400, seed=2)
+    viz_data['edges'].append({'source': 'missing', 'target': 'root', 'weight': 1.0, 'relationship': 'causal'})
+    path = tmp_path / "viz.json"
+    path.write_text(json.dumps(viz_data))
+    return viz_data, load_viz_columns(path, tmp_path / "columnar")
+
+
+def test_index_arrays_match_the_edge_list(columns):
+    viz_data, cols = columns
+    ids = cols.node_ids.tolist()
+    arrays = index_arrays(cols)
+    out_edges, in_edges = defaultdict(list), defaultdict(list)
+    for edge in viz_data['edges']:
+        if edge['relationship'] == 'causal' and edge['source'] in ids and edge['target'] in ids:
+            out_edges[edge['source']].append((-edge['weight'], ids.index(edge['target'])))
+            in_edges[edge['target']].append((-edge['weight'], ids.index(edge['source'])))
+
+    for direction, edges in (('out', out_edges), ('in', in_edges)):
+        indptr, indices, weights = (arrays[f'{direction}_{name}'] for name in ('indptr', 'indices', 'weights'))
+        for row, node_id in enumerate(ids):
+            got = list(zip((-weights[indptr[row]:indptr[row + 1]]).tolist(),
+                           indices[indptr[row]:indptr[row + 1]].tolist()))
+            assert got == sorted(edges[node_id])
+
+
+def test_written_index_round_trips(columns, tmp_path):
+    _, cols = columns
+    ids = cols.node_ids.tolist()
+    arrays = build_index(cols)
+    assert list(arrays) == list(ARRAY_DTYPES)
+    output_dir = tmp_path / "neighbours"
+    assert write_index(arrays, ids, cols.source_hash, output_dir) == (True, True)
+    assert write_index(arrays, ids, cols.source_hash, output_dir) == (False, False)
+
+    index = NeighbourIndex(output_dir)
+    assert index.manifest['data_hash'] == cols.source_hash
+    assert index.manifest['num_edges'] == int(arrays['out_indptr'][-1])
+    for name, values in arrays.items():
+        assert index.manifest['arrays'][name]['offset'] % ALIGNMENT == 0
+        np.testing.assert_array_equal(getattr(index, name), values)
+
+    full = index_arrays(cols)
+    for row, node_id in enumerate(ids):
+        start, stop = full['out_indptr'][row], full['out_indptr'][row + 1]
+        expected = [(ids[i], float(np.float32(w))) for i, w in zip(full['out_indices'][start:stop].tolist(),
+                                                                    full['out_weights'][start:stop].tolist())]
+        assert index.out_neighbours(node_id) == expected
+        assert index.out_neighbours(node_id, limit=2) == expected[:2]
+        start, stop = full['in_indptr'][row], full['in_indptr'][row + 1]
+        assert [i for i, _ in index.in_neighbours(node_id)] == [ids[i] for i in full['in_indices'][start:stop]]
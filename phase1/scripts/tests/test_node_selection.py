@@ -0,0 +1,80 @@
+"""Top-k, domain-capped and balanced selections in scripts/node_selection.py against full sorts."""
+
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from node_selection import rank_nodes
+
+
+def random_ranking(n, num_domains, seed):
+    """Ids, scores with many ties, and uneven domains."""
+    rng = np.random.default_rng(seed)
+    ids = [f'node_{i}' for i in range(n)]
+    scores = dict(zip(ids, np.round(rng.exponential(1.0, n), 1).tolist()))
+    weights = rng.dirichlet(np.full(num_domains, 0.5))
+    domains = dict(zip(ids, (f'domain_{d}' for d in rng.choice(num_domains, n, p=weights).tolist())))
+    return ids, scores, domains
+
+
+def sorted_ids(ids, scores):
+    """Descending score, ties in input order."""
+    return sorted(ids, key=lambda node_id: -scores[node_id])
+
+
+def brute_force_capped(ordered, domains, n, domain, cap):
+    limit, kept, selected = int(cap * n), 0, []
+    for node_id in ordered[:n]:
+        if domains[node_id] == domain:
+            if kept >= limit:
+                continue
+            kept += 1
+        selected.append(node_id)
+    return selected
+
+
+def brute_force_balanced(ordered, domains, n):
+    quota = math.ceil(n / len(set(domains[node_id] for node_id in ordered)))
+    taken, selected = Counter(), []
+    for node_id in ordered:
+        if taken[domains[node_id]] < quota:
+            taken[domains[node_id]] += 1
+            selected.append(node_id)
+            if len(selected) == n:
+                break
+    return selected
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_selections_match_full_sorts(seed):
+    rng = np.random.default_rng(seed)
+    n, num_domains = int(rng.integers(1, 400)), int(rng.integers(1, 12))
+    max_nodes = int(rng.integers(1, n + 20))
+    ids, scores, domains = random_ranking(n, num_domains, seed)
+    ordered = sorted_ids(ids, scores)
+    selection = rank_nodes(ids, scores, domains, max_nodes)
+
+    assert selection.num_domains == len(set(domains.values()))
+    for size in sorted({1, max_nodes // 3, max_nodes // 2, max_nodes} - {0}):
+        assert selection.top(size) == ordered[:size]
+        assert selection.balanced(size) == brute_force_balanced(ordered, domains, size)
+        for domain in sorted(set(domains.values()))[:3]:
+            for cap in (0.0, 0.1, 0.35, 1.0):
+                assert selection.capped(size, domain, cap) == brute_force_capped(ordered, domains, size, domain, cap)
+
+
+def test_selection_beyond_max_nodes_is_rejected():
+    ids, scores, domains = random_ranking(50, 3, 0)
+    selection = rank_nodes(ids, scores, domains, 20)
+    for select in (selection.top, selection.balanced):
+        with pytest.raises(ValueError):
+            select(21)
+    with pytest.raises(ValueError):
+        selection.capped(21, 'domain_0', 0.5)
+
+
+def test_empty_ranking():
+    selection = rank_nodes([], {}, {}, 10)
+    assert selection.top(10) == selection.balanced(5) == []
@@ -0,0 +1,143 @@
+"""Ring collisions and the per-ring caches in scripts/optimize_layout.py."""
+
+import json
+import math
+
+import numpy as np
+import pytest
+
+import optimize_layout as layout
+from optimize_layout import OVERLAP_TOLERANCE, find_ring_collisions
+from synthetic_data import generate_viz_data
+
+
+def pairwise_collisions(x, y, size, tolerance=OVERLAP_TOLERANCE):
+    """The original nested loop over every pair."""
+    found = []
+    for i in range(len(x)):
+        for j in range(i + 1, len(x)):
+            dist = math.sqrt((x[i] - x[j]) ** 2 + (y[i] - y[j]) ** 2)
+            min_dist = size[i] + size[j] - tolerance
+            if dist < min_dist:
+                found.append((i, j, dist, min_dist))
+    return found
+
+
+def random_ring(n, radius, max_size, seed, jitter=0.0, clustered=False):
+    rng = np.random.default_rng(seed)
+    if clustered:
+        theta = rng.normal(rng.uniform(-math.pi, math.pi), 0.05, n)
+    else:
+        theta = rng.uniform(-math.pi, math.pi, n)
+    r = radius * (1 + jitter * rng.uniform(-1, 1, n))
+    size = rng.uniform(0.5, max_size, n)
+    return r * np.cos(theta), r * np.sin(theta), size
+
+
+def assert_matches_pairwise(x, y, size):
+    i, j, dist, min_dist = find_ring_collisions(x, y, size)
+    expected = pairwise_collisions(x, y, size)
+    assert list(zip(i.tolist(), j.tolist())) == [(a, b) for a, b, _, _ in expected]
+    np.testing.assert_allclose(dist, [d for _, _, d, _ in expected], rtol=1e-12)
+    np.testing.assert_allclose(min_dist, [m for _, _, _, m in expected], rtol=1e-12)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_rings_match_pairwise(seed):
+    rng = np.random.default_rng(1000 + seed)
+    n = int(rng.integers(2, 400))
+    assert_matches_pairwise(*random_ring(n, rng.uniform(50, 2000), rng.uniform(1, 30), seed,
+                                         jitter=rng.choice([0.0, 0.05])))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_dense_clustered_rings_match_pairwise(seed):
+    assert_matches_pairwise(*random_ring(300, 400, 12, seed, clustered=True))
+
+
+def test_wide_window_falls_back_to_every_pair():
+    assert_matches_pairwise(*random_ring(60, 10, 20, 0))
+
+
+def test_shared_angles_and_wraparound():
+    theta = np.array([-math.pi, -math.pi, math.pi - 1e-3, 0.0, 0.0, 1e-4, math.pi / 2])
+    x, y = 300 * np.cos(theta), 300 * np.sin(theta)
+    assert_matches_pairwise(x, y, np.full(len(theta), 5.0))
+
+
+@pytest.mark.parametrize('n', [0, 1])
+def test_fewer_than_two_nodes(n):
+    i, j, dist, min_dist = find_ring_collisions(np.zeros(n), np.zeros(n), np.ones(n))
+    assert len(i) == len(j) == len(dist) == len(min_dist) == 0
+
+
+@pytest.fixture
+def synthetic_layout(tmp_path, monkeypatch):
+    """optimize_layout pointed at a seeded synthetic dataset."""
+    viz_data, _ = generate_viz_data(2500, seed=0)
+    viz_file = tmp_path / "synthetic.json"
+    viz_file.write_text(json.dumps(viz_data))
+    monkeypatch.setattr(layout, '_layout_data', layout.load_layout_data(viz_file, tmp_path / "columnar"))
+    monkeypatch.setattr(layout, '_crossing_counts', {})
+    layout._subtree_extents.cache_clear()
+    yield layout.get_layout_data()
+    layout._subtree_extents.cache_clear()
+
+
+def sweep(size_ranges, cache_dir, gaps=(100, 150, 250, 400)):
+    runner = layout.SweepRunner(size_ranges, workers=1, cache_dir=cache_dir)
+    return runner.evaluate(list(gaps)), runner
+
+
+def test_sweep_recounts_only_the_edited_ring(synthetic_layout, tmp_path):
+    cache_dir = tmp_path / "sweep"
+    num_rings = synthetic_layout.max_layer + 1
+    first, runner = sweep(layout.SIZE_RANGES, cache_dir)
+    assert runner.rings_computed > 0
+
+    rerun, runner = sweep(layout.SIZE_RANGES, cache_dir)
+    assert rerun == first
+    assert (runner.rings_computed, runner.rings_cached) == (0, 4 * num_rings)
+
+    # A smaller min size on the outer ring leaves every angle alone
+    edited = layout.SIZE_RANGES[:-1] + [(0.5, layout.SIZE_RANGES[-1][1])]
+    cached, runner = sweep(edited, cache_dir)
+    assert runner.rings_computed == 4
+    assert cached == sweep(edited, None)[0]
+
+
+def test_sweep_matches_collision_count(synthetic_layout):
+    results, _ = sweep(layout.SIZE_RANGES, None)
+    for result in results:
+        configs = layout.equal_spacing_configs(result['gap'], layout.SIZE_RANGES)
+        assert result['collisions'] == layout.compute_collisions_with_actual_sizes(configs)[0]
+
+
+def test_ring_evaluator_matches_fresh_scores(synthetic_layout):
+    evaluator = layout.RingEvaluator(synthetic_layout)
+    start = layout.equal_spacing_configs(150, layout.SIZE_RANGES)
+    evaluator.accept(evaluator.evaluate(start))
+    rng = np.random.default_rng(0)
+    for step in (0.2, 0.05, 0.2):
+        candidates = list(layout.ring_candidates(evaluator.base.configs, step, layout.SIZE_RANGES, 80))
+        for index in rng.choice(len(candidates), size=6, replace=False).tolist():
+            score = evaluator.evaluate(candidates[index])
+            fresh = layout.RingEvaluator(synthetic_layout).evaluate(candidates[index])
+            assert score.ring_collisions == fresh.ring_collisions
+            assert score.collisions == layout.compute_collisions_with_actual_sizes(candidates[index])[0]
+        evaluator.accept(score)
+
+
+def test_ring_evaluator_memoizes_revisited_states(synthetic_layout):
+    evaluator = layout.RingEvaluator(synthetic_layout)
+    start = layout.equal_spacing_configs(150, layout.SIZE_RANGES)
+    base = evaluator.evaluate(start)
+    evaluator.accept(base)
+    wider = start[:-1] + [layout.RingConfig(start[-1].radius, start[-1].min_size, start[-1].max_size * 1.5)]
+    moved = evaluator.evaluate(wider)
+    evaluator.accept(moved)
+
+    # Stepping back recounts nothing: every ring state was counted before
+    back = evaluator.evaluate(start)
+    assert back.rescored == []
+    assert back.ring_collisions == base.ring_collisions
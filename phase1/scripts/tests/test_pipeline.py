@@ -0,0 +1,164 @@
+"""Stage keys, skipping and reruns in scripts/pipeline.py."""
+
+import ast
+import contextlib
+import io
+import json
+from pathlib import Path
+
+import pytest
+
+import pipeline
+from pipeline import Pipeline, Stage
+
+SCRIPTS_DIR = Path(pipeline.__file__).parent
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Pipeline state, artifacts and scripts under tmp_path."""
+    cache = tmp_path / "cache"
+    monkeypatch.setattr(pipeline, 'STATE_FILE', cache / "state.json")
+    monkeypatch.setattr(pipeline, 'ARTIFACT_DIR', cache / "artifacts")
+    monkeypatch.setattr(pipeline, 'LOG_DIR', cache / "logs")
+    monkeypatch.setattr(pipeline, 'SCRIPTS_DIR', tmp_path)
+    for name in ('read.py', 'double.py', 'write.py'):
+        (tmp_path / name).write_text(f"# {name}\n")
+    (tmp_path / "input.json").write_text(json.dumps({'value': 2, 'note': 'a'}))
+    return tmp_path
+
+
+def toy_stages(workdir, calls):
+    """read -> double -> write, recording every stage that runs in calls."""
+    def read(_upstream):
+        calls.append('read')
+        return json.loads((workdir / "input.json").read_text())['value']
+
+    def double(upstream):
+        calls.append('double')
+        return upstream['read'] * 2
+
+    def write(upstream):
+        calls.append('write')
+        (workdir / "output.txt").write_text(str(upstream['double']))
+        return upstream['double']
+
+    def value_only(path):
+        return str(json.loads(path.read_text())['value'])
+
+    return [
+        Stage('read', read, digests=((workdir / "input.json", value_only),), code=('read.py',)),
+        Stage('double', double, after=('read',), code=('double.py',)),
+        Stage('write', write, outputs=(workdir / "output.txt",), after=('double',), code=('write.py',)),
+    ]
+
+
+def run(workdir, **kwargs):
+    calls = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        ran = Pipeline(toy_stages(workdir, calls)).run(**kwargs)
+    assert ran == calls or kwargs.get('dry_run')
+    return ran
+
+
+def set_input(workdir, **fields):
+    data = json.loads((workdir / "input.json").read_text())
+    (workdir / "input.json").write_text(json.dumps({**data, **fields}))
+
+
+def test_second_run_skips_everything(workdir):
+    assert run(workdir) == ['read', 'double', 'write']
+    assert run(workdir) == []
+    assert (workdir / "output.txt").read_text() == "4"
+
+
+def test_input_change_reruns_downstream(workdir):
+    run(workdir)
+    set_input(workdir, value=5)
+    assert run(workdir) == ['read', 'double', 'write']
+    assert (workdir / "output.txt").read_text() == "10"
+
+
+def test_digest_ignores_other_fields(workdir):
+    run(workdir)
+    set_input(workdir, note='b')
+    assert run(workdir) == []
+
+
+def test_unchanged_result_stops_the_rerun(workdir):
+    run(workdir)
+    (workdir / "read.py").write_text("# read.py, edited\n")
+    assert run(workdir) == ['read']
+
+
+def test_code_change_reruns_from_that_stage(workdir):
+    run(workdir)
+    (workdir / "double.py").write_text("# double.py, edited\n")
+    assert run(workdir) == ['double']
+
+
+def test_modified_output_reruns_its_stage(workdir):
+    run(workdir)
+    (workdir / "output.txt").write_text("stale")
+    assert run(workdir) == ['write']
+    assert (workdir / "output.txt").read_text() == "4"
+
+
+def test_missing_artifact_reruns_its_stage(workdir):
+    run(workdir)
+    (pipeline.ARTIFACT_DIR / "double.pkl").unlink()
+    assert run(workdir) == ['double']
+
+
+def test_dry_run_changes_nothing(workdir):
+    run(workdir)
+    set_input(workdir, value=5)
+    assert run(workdir, dry_run=True) == ['read', 'double', 'write']
+    assert (workdir / "output.txt").read_text() == "4"
+    assert run(workdir) == ['read', 'double', 'write']
+
+
+def test_force_reruns_everything(workdir):
+    run(workdir)
+    assert run(workdir, force=True) == ['read', 'double', 'write']
+
+
+def test_stages_must_follow_their_upstream():
+    stages = [Stage('b', lambda upstream: 0, after=('a',)), Stage('a', lambda upstream: 0)]
+    with pytest.raises(ValueError):
+        pipeline.check_stages(stages)
+
+
+def test_viz_digest_ignores_importance_fields(tmp_path):
+    path = tmp_path / "viz.json"
+    nodes = [{'id': 'a', 'layer': 0, 'parent': None, 'label': 'A'}]
+    path.write_text(json.dumps({'nodes': nodes}))
+    source = pipeline.viz_source_digest(path)
+
+    path.write_text(json.dumps({'nodes': [{**nodes[0], 'importance': 0.5, 'shap_raw': 0.1}]}, indent=2))
+    assert pipeline.viz_source_digest(path) == source
+    path.write_text(json.dumps({'nodes': [{**nodes[0], 'label': 'B'}]}))
+    assert pipeline.viz_source_digest(path) != source
+
+
+def local_imports(name, seen=None):
+    """name plus every scripts/ module it imports, directly or not."""
+    seen = set() if seen is None else seen
+    seen.add(name)
+    for node in ast.walk(ast.parse((SCRIPTS_DIR / name).read_text())):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            script = module.split('.')[0] + ".py"
+            if (SCRIPTS_DIR / script).exists() and script not in seen:
+                local_imports(script, seen)
+    return seen
+
+
+@pytest.mark.parametrize('stage', pipeline.STAGES, ids=lambda stage: stage.name)
+def test_stage_code_covers_every_import(stage):
+    assert local_imports(stage.code[0]) <= set(stage.code)
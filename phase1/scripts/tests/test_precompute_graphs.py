@@ -0,0 +1,63 @@
+"""Variant building, skipping and SUMMARY.json in scripts/precompute_graphs.py."""
+
+import contextlib
+import io
+import json
+
+import pytest
+
+import centrality
+import precompute_graphs as pg
+from synthetic_data import generate_viz_data
+
+GRID = [
+    (50, 3, 'composite', False, None),
+    (50, 3, 'composite', False, 0.9),   # Governance already under 90%: never binds
+    (50, 3, 'composite', False, 0.05),
+]
+
+
+@pytest.fixture
+def viz_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(pg, 'MANIFEST_FILE', tmp_path / "manifest.json")
+    monkeypatch.setattr(centrality, 'CACHE_DIR', tmp_path / "centrality")
+    path = tmp_path / "viz.json"
+    path.write_text(json.dumps(generate_viz_data(2500, seed=0)[0]))
+    return path
+
+
+def precompute(viz_file, output_dir, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as log:
+        summary = pg.run_precompute(GRID, output_dir, workers=1, viz_file=viz_file, betweenness_samples=200, **kwargs)
+    return summary, log.getvalue()
+
+
+def test_non_binding_cap_is_an_explicit_alias(viz_file, tmp_path):
+    summary, _ = precompute(viz_file, tmp_path / "out")
+    uncapped, loose, tight = summary
+    assert 'same_as' not in uncapped and 'same_as' not in tight
+    assert (loose['cap_binds'], tight['cap_binds']) == (False, True)
+    assert loose['same_as'] == loose['filename'] == uncapped['filename']
+    assert not (tmp_path / "out" / pg.variant_filename(pg.variant_config(*GRID[1]))).exists()
+    assert json.loads((tmp_path / "out" / "SUMMARY.json").read_text()) == summary
+
+
+def test_rerun_rewrites_nothing(viz_file, tmp_path):
+    output_dir = tmp_path / "out"
+    first, _ = precompute(viz_file, output_dir)
+    stamps = {path.name: path.stat().st_mtime_ns for path in [*output_dir.iterdir(), pg.MANIFEST_FILE]}
+
+    second, log = precompute(viz_file, output_dir)
+    assert second == first
+    assert "3 up to date, 0 to build" in log
+    assert {path.name: path.stat().st_mtime_ns for path in [*output_dir.iterdir(), pg.MANIFEST_FILE]} == stamps
+    assert not list(output_dir.glob(".*")), "temp files left behind"
+
+
+def test_missing_variant_is_rebuilt(viz_file, tmp_path):
+    output_dir = tmp_path / "out"
+    first, _ = precompute(viz_file, output_dir)
+    (output_dir / first[2]['filename']).unlink()
+    second, log = precompute(viz_file, output_dir)
+    assert second == first
+    assert "2 up to date, 1 to build" in log
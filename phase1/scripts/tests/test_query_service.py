@@ -0,0 +1,205 @@
+"""Queries, routing, response cache, ETags and reload in scripts/query_service.py."""
+
+import asyncio
+import json
+import os
+from collections import defaultdict
+
+import pytest
+
+import query_service as qs
+from synthetic_data import generate_viz_data
+
+
+@pytest.fixture
+def viz_file(tmp_path):
+    path = tmp_path / "viz.json"
+    path.write_text(json.dumps(generate_viz_data(300, seed=0)[0]))
+    return path
+
+
+@pytest.fixture
+def service(viz_file, tmp_path):
+    return qs.QueryService(viz_file, tmp_path / "columnar", cache_size=3, reload_interval=0.01)
+
+
+def viz(service):
+    return json.loads(service.viz_file.read_text())
+
+
+def get(service, target):
+    status, body, etag, hit = service.respond(target)
+    return status, json.loads(body) if body else None, etag, hit
+
+
+def test_subtree_matches_parent_links(service):
+    nodes = viz(service)['nodes']
+    children = defaultdict(list)
+    for node in nodes:
+        if node.get('parent') is not None:
+            children[node['parent']].append(node['id'])
+
+    def below(node_id, depth, limit):
+        found = {node_id: depth}
+        if limit is None or depth < limit:
+            for child in children[node_id]:
+                found.update(below(child, depth + 1, limit))
+        return found
+
+    for node_id in ('root', 'outcome_1', 'coarse_5'):
+        for depth in (None, 0, 1, 2):
+            result = service.dataset.subtree(node_id, depth)
+            assert {n['id'] for n in result['nodes']} == set(below(node_id, 0, depth))
+            assert result['nodes'][0]['id'] == node_id
+
+
+def test_neighbours_match_edges_at_full_precision(service):
+    edges = [e for e in viz(service)['edges'] if e['relationship'] == 'causal']
+    degree = defaultdict(int)
+    for e in edges:
+        degree[e['source']] += 1
+    node_id = max(degree, key=degree.get)
+
+    expected = sorted(((e['weight'], 'out', e['target']) for e in edges if e['source'] == node_id),
+                      key=lambda item: -item[0])
+    result = service.dataset.top_neighbours(node_id, k=1000, direction='out')
+    assert [(n['weight'], n['direction'], n['id']) for n in result['neighbours']] == expected
+    assert all(type(n['weight']) is float for n in result['neighbours'])
+
+    both = service.dataset.top_neighbours(node_id, k=3, direction='both')
+    weights = [n['weight'] for n in both['neighbours']]
+    assert len(weights) == 3 and weights == sorted(weights, reverse=True)
+
+
+def test_importance_rank_within_layer(service):
+    nodes = viz(service)['nodes']
+    result = service.dataset.node_importance([n['id'] for n in nodes])['nodes']
+    for layer in {n['layer'] for n in nodes}:
+        in_layer = [(r['layer_rank'], -r['importance']) for r in result if r['layer'] == layer]
+        assert sorted(rank for rank, _ in in_layer) == list(range(1, len(in_layer) + 1))
+        assert [imp for _, imp in sorted(in_layer)] == sorted(imp for _, imp in in_layer)
+
+
+@pytest.mark.parametrize('target,status', [
+    ('/health', 200),
+    ('/subtree/root?depth=1', 200),
+    ('/neighbours/root?k=5&direction=in', 200),
+    ('/importance/root,outcome_1', 200),
+    ('/subtree/missing', 404),
+    ('/importance/root,missing', 404),
+    ('/nothing/root', 404),
+    ('/subtree', 404),
+    ('/subtree/root?depth=x', 400),
+    ('/neighbours/root?k=0', 400),
+    ('/neighbours/root?direction=up', 400),
+])
+def test_routing(service, target, status):
+    assert get(service, target)[0] == status
+
+
+def test_cache_normalizes_queries_and_skips_errors(service):
+    first = get(service, '/neighbours/root?k=5&direction=out')
+    second = get(service, '/neighbours/root?direction=out&k=5')
+    assert (first[3], second[3]) == (False, True)
+    assert first[:3] == second[:3]
+    get(service, '/subtree/missing')
+    assert get(service, '/subtree/missing')[3] is False
+    assert get(service, '/health')[1]['cache']['hits'] == 1
+
+
+def test_lru_evicts_least_recently_used(service):
+    for node_id in ('root', 'outcome_1', 'outcome_2'):
+        get(service, f'/importance/{node_id}')
+    get(service, '/importance/root')          # Refresh root
+    get(service, '/importance/outcome_3')     # Evicts outcome_1
+    assert len(service.cache) == 3
+    assert get(service, '/importance/root')[3] is True
+    assert get(service, '/importance/outcome_1')[3] is False
+
+
+async def exchange(port, requests):
+    """Send raw requests on one connection; returns [(status, headers, body)]."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    for request in requests:
+        writer.write(request.encode('latin-1'))
+        await writer.drain()
+        head = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+        headers = dict(line.split(': ', 1) for line in head[1:] if line)
+        body = await reader.readexactly(int(headers['Content-Length'])) if not request.startswith('HEAD') else b''
+        responses.append((int(head[0].split(' ')[1]), headers, body))
+    writer.close()
+    return responses
+
+
+def run_server(service, client):
+    async def main():
+        server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+        async with server:
+            return await client(server.sockets[0].getsockname()[1])
+    return asyncio.run(main())
+
+
+def test_http_etag_and_keep_alive(service):
+    async def client(port):
+        (status, headers, body), = await exchange(port, ["GET /subtree/root?depth=1 HTTP/1.1\r\n\r\n"])
+        etag = headers['ETag']
+        return (status, headers, body), await exchange(port, [
+            f"GET /subtree/root?depth=1 HTTP/1.1\r\nIf-None-Match: {etag}\r\n\r\n",
+            "GET /subtree/root?depth=1 HTTP/1.1\r\nIf-None-Match: \"other\"\r\n\r\n",
+            "HEAD /subtree/root?depth=1 HTTP/1.1\r\n\r\n",
+            "POST /subtree/root HTTP/1.1\r\nContent-Length: 2\r\n\r\n{}",
+            "GET /health HTTP/1.1\r\nConnection: close\r\n\r\n",
+        ])
+
+    (status, headers, body), rest = run_server(service, client)
+    assert status == 200 and headers['X-Cache'] == 'miss'
+    assert json.loads(body)['id'] == 'root'
+    not_modified, modified, head, post, health = rest
+    assert (not_modified[0], not_modified[2], not_modified[1]['ETag']) == (304, b'', headers['ETag'])
+    assert (modified[0], modified[2], modified[1]['X-Cache']) == (200, body, 'hit')
+    assert head[0] == 200 and int(head[1]['Content-Length']) == len(body)
+    assert post[0] == 405
+    assert health[0] == 200 and health[1]['Connection'] == 'close'
+
+
+def test_reload_swaps_dataset_and_drops_cache(service, viz_file):
+    get(service, '/importance/root')
+    data = json.loads(viz_file.read_text())
+    data['nodes'][0]['importance'] = 0.123
+    viz_file.write_text(json.dumps(data))
+    stat = viz_file.stat()
+    os.utime(viz_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    async def wait_for_reload():
+        watcher = asyncio.create_task(service.watch())
+        try:
+            for _ in range(500):
+                await asyncio.sleep(0.01)
+                if service.reloads:
+                    return
+        finally:
+            watcher.cancel()
+
+    asyncio.run(wait_for_reload())
+    assert service.reloads == 1 and not service.cache
+    assert get(service, '/importance/root')[1]['nodes'][0]['importance'] == 0.123
+
+
+def test_reload_keeps_dataset_when_file_is_broken(service, viz_file, capsys):
+    before = service.dataset
+    viz_file.write_text("{not json")
+
+    async def poll():
+        watcher = asyncio.create_task(service.watch())
+        try:
+            for _ in range(500):
+                await asyncio.sleep(0.01)
+                if service.signature == service._signature():
+                    return
+        finally:
+            watcher.cancel()
+
+    asyncio.run(poll())
+    assert service.dataset is before and service.reloads == 0
+    assert "Reload failed" in capsys.readouterr().out
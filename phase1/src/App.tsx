@@ -15,6 +15,7 @@ import {
   type LayoutNode
 } from './layouts/RadialLayout'
 import LayoutControls from './components/LayoutControls'
+import { fetchGraphData } from './data/compactViz'
 
 /**
  * Semantic hierarchy visualization with concentric rings - v2.1 only
@@ -82,6 +83,7 @@ const DOMAIN_COLORS: Record<string, string> = {
 }
 
 const DATA_FILE = '/data/v2_1_visualization_final.json'
+const COMPACT_DATA_FILE = '/data/compact/visualization.compact.json'  // scripts/compact_export.py
 
 const DEFAULT_NODE_PADDING = 7
 const MIN_RING_GAP = 80
@@ -300,9 +302,7 @@ function App() {
     setError(null)
 
     try {
-      const response = await fetch(DATA_FILE)
-      if (!response.ok) throw new Error(`Failed to load: ${response.status}`)
-      const data: GraphDataV21 = await response.json()
+      const data: GraphDataV21 = await fetchGraphData(COMPACT_DATA_FILE, DATA_FILE)
 
       // Build layout config from current state
       // useFixedRadii: true ensures sliders directly control ring positions
@@ -0,0 +1,126 @@
+/**
+ * compactViz - Reader for the compact columnar visualization format
+ *
+ * scripts/compact_export.py writes v2_1_visualization_final.json as
+ * columns: dictionary-coded strings, quantized floats and node row numbers
+ * instead of ids. The file is a fraction of the size of the original and
+ * parses faster; decodeCompactViz rebuilds the same GraphDataV21 the
+ * original file holds (quantized and rounded fields to their stored
+ * precision), matching decode_viz in compact_export.py.
+ */
+
+import type { GraphDataV21 } from '../types'
+
+export const COMPACT_FORMAT = 'compact-viz'
+export const COMPACT_VERSION = 2
+
+type Value = unknown
+
+/**
+ * One encoded column; rows lists the records that have the field when
+ * some lack it
+ */
+export type CompactColumn = { rows?: number[] } & (
+  | { kind: 'int' | 'rounded' | 'raw'; values: Value[] }
+  | { kind: 'quantized'; decimals: number; values: number[] }
+  | { kind: 'dict'; dictionary: Value[]; codes: number[] }
+  | { kind: 'ref'; values: number[] }
+  | { kind: 'ref_list'; offsets: number[]; values: number[] }
+)
+
+export interface CompactTable {
+  count: number
+  fields: string[]
+  columns: Record<string, CompactColumn>
+}
+
+export interface CompactVizDocument {
+  format: string
+  version: number
+  source_hash: string | null
+  keys: string[]
+  tables: Record<string, CompactTable>
+  other: Record<string, Value>
+}
+
+function decodeColumn(column: CompactColumn, ids: string[] | null): Value[] {
+  switch (column.kind) {
+    case 'ref':
+      return column.values.map(row => (row < 0 ? null : ids![row]))
+    case 'ref_list': {
+      const { offsets, values } = column
+      const out: Value[] = new Array(offsets.length - 1)
+      for (let i = 0; i < out.length; i++) {
+        const children = new Array(offsets[i + 1] - offsets[i])
+        for (let j = 0; j < children.length; j++) children[j] = ids![values[offsets[i] + j]]
+        out[i] = children
+      }
+      return out
+    }
+    case 'quantized': {
+      const scale = 10 ** column.decimals
+      return column.values.map(q => q / scale)
+    }
+    case 'dict': {
+      const { dictionary } = column
+      return column.codes.map(code => dictionary[code])
+    }
+    case 'int':
+    case 'rounded':
+    case 'raw':
+      return column.values
+    default:
+      throw new Error(`unknown column kind: ${(column as { kind: string }).kind}`)
+  }
+}
+
+function decodeTable(table: CompactTable, ids: string[] | null): Record<string, Value>[] {
+  const records: Record<string, Value>[] = new Array(table.count)
+  for (let i = 0; i < table.count; i++) records[i] = {}
+  for (const field of table.fields) {
+    const column = table.columns[field]
+    const values = decodeColumn(column, ids)
+    const rows = column.rows
+    for (let i = 0; i < values.length; i++) records[rows ? rows[i] : i][field] = values[i]
+  }
+  return records
+}
+
+/**
+ * Rebuilds the visualization JSON from a parsed compact document
+ */
+export function decodeCompactViz(document: CompactVizDocument): GraphDataV21 {
+  if (document.format !== COMPACT_FORMAT || document.version !== COMPACT_VERSION) {
+    throw new Error(`not a ${COMPACT_FORMAT} v${COMPACT_VERSION} document`)
+  }
+  const { tables } = document
+  const idColumn = tables.nodes?.columns.id
+  const ids = idColumn ? (decodeColumn(idColumn, null) as string[]) : null
+
+  const viz: Record<string, Value> = {}
+  for (const key of document.keys) {
+    if (key === 'hierarchy' && key in tables) {
+      viz[key] = Object.fromEntries(decodeTable(tables[key], ids).map(r => [r.parent as string, r.children]))
+    } else if (key in tables) {
+      viz[key] = decodeTable(tables[key], ids)
+    } else {
+      viz[key] = document.other[key]
+    }
+  }
+  return viz as unknown as GraphDataV21
+}
+
+/**
+ * Fetches the compact file and decodes it, falling back to the original
+ * JSON when no compact export is deployed (a 404, or the dev server's
+ * index.html fallback)
+ */
+export async function fetchGraphData(compactUrl: string, jsonUrl: string): Promise<GraphDataV21> {
+  const compact = await fetch(compactUrl)
+  if (compact.ok && compact.headers.get('content-type')?.includes('json')) {
+    return decodeCompactViz(await compact.json())
+  }
+  const response = await fetch(jsonUrl)
+  if (!response.ok) throw new Error(`Failed to load: ${response.status}`)
+  return response.json()
+}